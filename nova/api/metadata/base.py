@@ -312,22 +312,8 @@ class InstanceMetadata():
                            CONF.dhcp_domain)
 
     def lookup(self, path):
-        if path == "" or path[0] != "/":
-            path = posixpath.normpath("/" + path)
-        else:
-            path = posixpath.normpath(path)
-
-        # fix up requests, prepending /ec2 to anything that does not match
+        path = normalize_path(path)
         path_tokens = path.split('/')[1:]
-        if path_tokens[0] not in ("ec2", "openstack"):
-            if path_tokens[0] == "":
-                # request for /
-                path_tokens = ["ec2"]
-            else:
-                path_tokens = ["ec2"] + path_tokens
-            path = "/" + "/".join(path_tokens)
-
-        # all values of 'path' input starts with '/' and have no trailing /
 
         # specifically handle the top level request
         if len(path_tokens) == 1:
@@ -347,6 +333,42 @@ class InstanceMetadata():
 
         return data
 
+    def render(self):
+        """Render every document served for this instance.
+
+        Returns a dict mapping each path, as returned by normalize_path,
+        to the output of ec2_md_print for that path; it holds exactly
+        the paths that lookup would answer.
+        """
+        documents = {}
+
+        def add_tree(path, data):
+            documents[path] = ec2_md_print(data)
+            if isinstance(data, dict):
+                for key, value in data.iteritems():
+                    if key != '_name':
+                        add_tree('%s/%s' % (path, key), value)
+
+        documents['/ec2'] = ec2_md_print(VERSIONS + ["latest"])
+        for version in VERSIONS + ["latest"]:
+            add_tree('/ec2/%s' % version, self.get_ec2_metadata(version))
+
+        documents['/openstack'] = ec2_md_print(OPENSTACK_VERSIONS +
+                                               ["latest"])
+        for version in OPENSTACK_VERSIONS + ["latest"]:
+            listing = self.get_openstack_item([version])
+            documents['/openstack/%s' % version] = ec2_md_print(listing)
+            for name in listing:
+                path = '/openstack/%s/%s' % (version, name)
+                documents[path] = ec2_md_print(
+                    self.get_openstack_item([version, name]))
+
+        for (cid, content) in self.content.iteritems():
+            path = '/openstack/%s/%s' % (CONTENT_DIR, cid)
+            documents[path] = ec2_md_print(content)
+
+        return documents
+
     def metadata_for_config_drive(self):
         """Yields (path, value) tuples for metadata elements."""
         # EC2 style metadata
@@ -388,6 +410,30 @@ def get_metadata_by_address(address):
     return InstanceMetadata(instance, address)
 
 
+def normalize_path(path):
+    """Return the canonical form of a metadata request path.
+
+    The result starts with /ec2 or /openstack and has no trailing /;
+    requests that do not name either tree are for /ec2.
+    """
+    if path == "" or path[0] != "/":
+        path = posixpath.normpath("/" + path)
+    else:
+        path = posixpath.normpath(path)
+
+    # fix up requests, prepending /ec2 to anything that does not match
+    path_tokens = path.split('/')[1:]
+    if path_tokens[0] not in ("ec2", "openstack"):
+        if path_tokens[0] == "":
+            # request for /
+            path_tokens = ["ec2"]
+        else:
+            path_tokens = ["ec2"] + path_tokens
+        path = "/" + "/".join(path_tokens)
+
+    return path
+
+
 def _format_instance_mapping(ctxt, instance):
     bdms = db.block_device_mapping_get_all_by_instance(ctxt, instance['uuid'])
     return block_device.instance_block_mapping(instance, bdms)
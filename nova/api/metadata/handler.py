@@ -24,43 +24,36 @@ import webob.exc
 
 from nova.api.metadata import base
 from nova import exception
+from nova import metadata_cache
 from nova.openstack.common import cfg
 from nova.openstack.common import log as logging
 from nova import wsgi
 
 CONF = cfg.CONF
-CONF.import_opt('memcached_servers', 'nova.config')
 CONF.import_opt('use_forwarded_for', 'nova.api.auth')
 
 LOG = logging.getLogger(__name__)
 
-if CONF.memcached_servers:
-    import memcache
-else:
-    from nova.common import memorycache as memcache
-
 
 class MetadataRequestHandler(wsgi.Application):
     """Serve metadata."""
 
-    def __init__(self):
-        self._cache = memcache.Client(CONF.memcached_servers, debug=0)
-
     def get_metadata(self, address):
+        """Return the rendered documents of the instance at a fixed
+        address, or None if there is no such instance."""
         if not address:
             raise exception.FixedIpNotFoundForAddress(address=address)
 
-        cache_key = 'metadata-%s' % address
-        data = self._cache.get(cache_key)
+        data = metadata_cache.get_documents(address)
         if data:
             return data
 
         try:
-            data = base.get_metadata_by_address(address)
+            data = base.get_metadata_by_address(address).render()
         except exception.NotFound:
             return None
 
-        self._cache.set(cache_key, data, 15)
+        metadata_cache.set_documents(address, data)
 
         return data
 
@@ -87,8 +80,6 @@ class MetadataRequestHandler(wsgi.Application):
             raise webob.exc.HTTPNotFound()
 
         try:
-            data = meta_data.lookup(req.path_info)
-        except base.InvalidMetadataPath:
+            return meta_data[base.normalize_path(req.path_info)]
+        except KeyError:
             raise webob.exc.HTTPNotFound()
-
-        return base.ec2_md_print(data)
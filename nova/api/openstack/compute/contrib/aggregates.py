@@ -132,6 +132,7 @@ class AggregateController(object):
             'add_host': self._add_host,
             'remove_host': self._remove_host,
             'set_metadata': self._set_metadata,
+            'prefetch_images': self._prefetch_images,
         }
         for action, data in body.iteritems():
             try:
@@ -198,6 +199,26 @@ class AggregateController(object):
 
         return self._marshall_aggregate(aggregate)
 
+    def _prefetch_images(self, req, id, body):
+        """Downloads images into the image cache of the aggregate's hosts."""
+        context = _get_context(req)
+        authorize(context)
+
+        try:
+            image_ids = body["images"]
+        except (KeyError, TypeError):
+            raise exc.HTTPBadRequest
+        if not isinstance(image_ids, list):
+            raise exc.HTTPBadRequest
+        try:
+            aggregate = self.api.prefetch_images(context, id, image_ids)
+        except exception.AggregateNotFound:
+            LOG.info(_("Cannot prefetch images in aggregate %(id)s")
+                     % locals())
+            raise exc.HTTPNotFound
+
+        return self._marshall_aggregate(aggregate)
+
     def _marshall_aggregate(self, aggregate):
         return {"aggregate": aggregate}
 
@@ -72,7 +72,7 @@ class ImageDiskConfigController(wsgi.Controller):
     def show(self, req, resp_obj, id):
         context = req.environ['nova.context']
         if 'image' in resp_obj.obj and authorize(context):
-            resp_obj.attach(xml=ImageDiskConfigTemplate())
+            resp_obj.attach(xml=ImageDiskConfigTemplate)
             image = resp_obj.obj['image']
             self._add_disk_config(context, [image])
 
@@ -80,7 +80,7 @@ class ImageDiskConfigController(wsgi.Controller):
     def detail(self, req, resp_obj):
         context = req.environ['nova.context']
         if 'images' in resp_obj.obj and authorize(context):
-            resp_obj.attach(xml=ImagesDiskConfigTemplate())
+            resp_obj.attach(xml=ImagesDiskConfigTemplate)
             images = resp_obj.obj['images']
             self._add_disk_config(context, images)
 
@@ -111,7 +111,7 @@ class ServerDiskConfigController(wsgi.Controller):
 
     def _show(self, req, resp_obj):
         if 'server' in resp_obj.obj:
-            resp_obj.attach(xml=ServerDiskConfigTemplate())
+            resp_obj.attach(xml=ServerDiskConfigTemplate)
             server = resp_obj.obj['server']
             self._add_disk_config(req, [server])
 
@@ -125,7 +125,7 @@ class ServerDiskConfigController(wsgi.Controller):
     def detail(self, req, resp_obj):
         context = req.environ['nova.context']
         if 'servers' in resp_obj.obj and authorize(context):
-            resp_obj.attach(xml=ServersDiskConfigTemplate())
+            resp_obj.attach(xml=ServersDiskConfigTemplate)
             servers = resp_obj.obj['servers']
             self._add_disk_config(req, servers)
 
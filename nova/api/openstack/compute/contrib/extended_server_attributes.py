@@ -18,7 +18,6 @@ from nova.api.openstack import extensions
 from nova.api.openstack import wsgi
 from nova.api.openstack import xmlutil
 from nova import compute
-from nova import db
 from nova.openstack.common import log as logging
 
 LOG = logging.getLogger(__name__)
@@ -32,17 +31,19 @@ class ExtendedServerAttributesController(wsgi.Controller):
                                                                  **kwargs)
         self.compute_api = compute.API()
 
-    def _get_hypervisor_hostname(self, context, instance):
-        compute_node = db.compute_node_get_by_host(context, instance["host"])
+    def _get_hypervisor_hostname(self, req, instance):
+        # NOTE(pnavarro): the core API loads the compute nodes of all
+        #                 the hosts at once, see the prefetch below.
+        compute_node = req.get_db_compute_node(instance["host"])
 
         try:
             return compute_node["hypervisor_hostname"]
         except TypeError:
             return
 
-    def _extend_server(self, context, server, instance):
+    def _extend_server(self, req, server, instance):
         key = "%s:hypervisor_hostname" % Extended_server_attributes.alias
-        server[key] = self._get_hypervisor_hostname(context, instance)
+        server[key] = self._get_hypervisor_hostname(req, instance)
 
         for attr in ['host', 'name']:
             if attr == 'name':
@@ -52,31 +53,31 @@ class ExtendedServerAttributesController(wsgi.Controller):
                 key = "%s:%s" % (Extended_server_attributes.alias, attr)
             server[key] = instance[attr]
 
-    @wsgi.extends
+    @wsgi.extends(prefetch=['compute_nodes'])
     def show(self, req, resp_obj, id):
         context = req.environ['nova.context']
         if authorize(context):
             # Attach our slave template to the response object
-            resp_obj.attach(xml=ExtendedServerAttributeTemplate())
+            resp_obj.attach(xml=ExtendedServerAttributeTemplate)
             server = resp_obj.obj['server']
             db_instance = req.get_db_instance(server['id'])
             # server['id'] is guaranteed to be in the cache due to
             # the core API adding it in its 'show' method.
-            self._extend_server(context, server, db_instance)
+            self._extend_server(req, server, db_instance)
 
-    @wsgi.extends
+    @wsgi.extends(prefetch=['compute_nodes'])
     def detail(self, req, resp_obj):
         context = req.environ['nova.context']
         if authorize(context):
             # Attach our slave template to the response object
-            resp_obj.attach(xml=ExtendedServerAttributesTemplate())
+            resp_obj.attach(xml=ExtendedServerAttributesTemplate)
 
             servers = list(resp_obj.obj['servers'])
             for server in servers:
                 db_instance = req.get_db_instance(server['id'])
                 # server['id'] is guaranteed to be in the cache due to
                 # the core API adding it in its 'detail' method.
-                self._extend_server(context, server, db_instance)
+                self._extend_server(req, server, db_instance)
 
 
 class Extended_server_attributes(extensions.ExtensionDescriptor):
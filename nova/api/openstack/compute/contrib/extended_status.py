@@ -39,7 +39,7 @@ class ExtendedStatusController(wsgi.Controller):
         context = req.environ['nova.context']
         if authorize(context):
             # Attach our slave template to the response object
-            resp_obj.attach(xml=ExtendedStatusTemplate())
+            resp_obj.attach(xml=ExtendedStatusTemplate)
             server = resp_obj.obj['server']
             db_instance = req.get_db_instance(server['id'])
             # server['id'] is guaranteed to be in the cache due to
@@ -51,7 +51,7 @@ class ExtendedStatusController(wsgi.Controller):
         context = req.environ['nova.context']
         if authorize(context):
             # Attach our slave template to the response object
-            resp_obj.attach(xml=ExtendedStatusesTemplate())
+            resp_obj.attach(xml=ExtendedStatusesTemplate)
             servers = list(resp_obj.obj['servers'])
             for server in servers:
                 db_instance = req.get_db_instance(server['id'])
@@ -138,7 +138,7 @@ class FlavorActionController(wsgi.Controller):
         context = req.environ['nova.context']
         if authorize(context):
             # Attach our slave template to the response object
-            resp_obj.attach(xml=FlavorextradatumTemplate())
+            resp_obj.attach(xml=FlavorextradatumTemplate)
             db_flavor = req.get_db_flavor(id)
 
             self._extend_flavor(resp_obj.obj['flavor'], db_flavor)
@@ -148,7 +148,7 @@ class FlavorActionController(wsgi.Controller):
         context = req.environ['nova.context']
         if authorize(context):
             # Attach our slave template to the response object
-            resp_obj.attach(xml=FlavorextradataTemplate())
+            resp_obj.attach(xml=FlavorextradataTemplate)
 
             flavors = list(resp_obj.obj['flavors'])
             for flavor_rval in flavors:
@@ -160,7 +160,7 @@ class FlavorActionController(wsgi.Controller):
         context = req.environ['nova.context']
         if authorize(context):
             # Attach our slave template to the response object
-            resp_obj.attach(xml=FlavorextradatumTemplate())
+            resp_obj.attach(xml=FlavorextradatumTemplate)
 
             db_flavor = req.get_db_flavor(resp_obj.obj['flavor']['id'])
 
@@ -33,7 +33,7 @@ class FlavorRxtxController(wsgi.Controller):
         if not authorize(req.environ['nova.context']):
             return
         if 'flavor' in resp_obj.obj:
-            resp_obj.attach(xml=FlavorRxtxTemplate())
+            resp_obj.attach(xml=FlavorRxtxTemplate)
             self._extend_flavors(req, [resp_obj.obj['flavor']])
 
     @wsgi.extends
@@ -48,7 +48,7 @@ class FlavorRxtxController(wsgi.Controller):
     def detail(self, req, resp_obj):
         if not authorize(req.environ['nova.context']):
             return
-        resp_obj.attach(xml=FlavorsRxtxTemplate())
+        resp_obj.attach(xml=FlavorsRxtxTemplate)
         self._extend_flavors(req, list(resp_obj.obj['flavors']))
 
 
@@ -33,7 +33,7 @@ class FlavorSwapController(wsgi.Controller):
         if not authorize(req.environ['nova.context']):
             return
         if 'flavor' in resp_obj.obj:
-            resp_obj.attach(xml=FlavorSwapTemplate())
+            resp_obj.attach(xml=FlavorSwapTemplate)
             self._extend_flavors(req, [resp_obj.obj['flavor']])
 
     @wsgi.extends
@@ -48,7 +48,7 @@ class FlavorSwapController(wsgi.Controller):
     def detail(self, req, resp_obj):
         if not authorize(req.environ['nova.context']):
             return
-        resp_obj.attach(xml=FlavorsSwapTemplate())
+        resp_obj.attach(xml=FlavorsSwapTemplate)
         self._extend_flavors(req, list(resp_obj.obj['flavors']))
 
 
@@ -43,7 +43,7 @@ class FlavorextradataController(wsgi.Controller):
         if not authorize(req.environ['nova.context']):
             return
         if 'flavor' in resp_obj.obj:
-            resp_obj.attach(xml=FlavorextradatumTemplate())
+            resp_obj.attach(xml=FlavorextradatumTemplate)
             self._extend_flavors(req, [resp_obj.obj['flavor']])
 
     @wsgi.extends
@@ -58,7 +58,7 @@ class FlavorextradataController(wsgi.Controller):
     def detail(self, req, resp_obj):
         if not authorize(req.environ['nova.context']):
             return
-        resp_obj.attach(xml=FlavorextradataTemplate())
+        resp_obj.attach(xml=FlavorextradataTemplate)
         self._extend_flavors(req, list(resp_obj.obj['flavors']))
 
 
@@ -211,6 +211,25 @@ class HostController(object):
     def reboot(self, req, id):
         return self._host_power_action(req, host=id, action="reboot")
 
+    @wsgi.response(202)
+    @check_host
+    def prefetch_images(self, req, id, body):
+        """Downloads images into the image cache of the host."""
+        context = req.environ['nova.context']
+        authorize(context)
+        try:
+            image_ids = body['images']
+        except (KeyError, TypeError):
+            raise webob.exc.HTTPBadRequest(
+                    explanation=_("Missing 'images' in request body"))
+        if not isinstance(image_ids, list):
+            raise webob.exc.HTTPBadRequest(
+                    explanation=_("'images' must be a list of image ids"))
+        LOG.audit(_("Prefetching images %(image_ids)s on host %(id)s.")
+                  % locals())
+        self.api.prefetch_images(context, host=id, image_ids=image_ids)
+        return {"host": id, "images": image_ids}
+
     @wsgi.serializers(xml=HostShowTemplate)
     def show(self, req, id):
         """Shows the physical/usage resource given by hosts.
@@ -299,5 +318,5 @@ class Hosts(extensions.ExtensionDescriptor):
                 HostController(),
                 collection_actions={'update': 'PUT'},
                 member_actions={"startup": "GET", "shutdown": "GET",
-                        "reboot": "GET"})]
+                        "reboot": "GET", "prefetch_images": "POST"})]
         return resources
@@ -167,7 +167,7 @@ class Controller(servers.Controller):
 
     def _show(self, req, resp_obj):
         if 'server' in resp_obj.obj:
-            resp_obj.attach(xml=ServerKeyNameTemplate())
+            resp_obj.attach(xml=ServerKeyNameTemplate)
             server = resp_obj.obj['server']
             self._add_key_name(req, [server])
 
@@ -181,7 +181,7 @@ class Controller(servers.Controller):
     def detail(self, req, resp_obj):
         context = req.environ['nova.context']
         if 'servers' in resp_obj.obj and soft_authorize(context):
-            resp_obj.attach(xml=ServersKeyNameTemplate())
+            resp_obj.attach(xml=ServersKeyNameTemplate)
             servers = resp_obj.obj['servers']
             self._add_key_name(req, servers)
 
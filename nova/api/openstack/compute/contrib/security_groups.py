@@ -474,7 +474,7 @@ class SecurityGroupsOutputController(wsgi.Controller):
         if not softauth(req.environ['nova.context']):
             return
         if 'server' in resp_obj.obj:
-            resp_obj.attach(xml=SecurityGroupServerTemplate())
+            resp_obj.attach(xml=SecurityGroupServerTemplate)
             self._extend_servers(req, [resp_obj.obj['server']])
 
     @wsgi.extends
@@ -489,7 +489,7 @@ class SecurityGroupsOutputController(wsgi.Controller):
     def detail(self, req, resp_obj):
         if not softauth(req.environ['nova.context']):
             return
-        resp_obj.attach(xml=SecurityGroupServersTemplate())
+        resp_obj.attach(xml=SecurityGroupServersTemplate)
         self._extend_servers(req, list(resp_obj.obj['servers']))
 
 
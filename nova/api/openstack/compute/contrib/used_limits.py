@@ -41,7 +41,7 @@ class UsedLimitsController(wsgi.Controller):
 
     @wsgi.extends
     def index(self, req, resp_obj):
-        resp_obj.attach(xml=UsedLimitsTemplate())
+        resp_obj.attach(xml=UsedLimitsTemplate)
         context = req.environ['nova.context']
         quotas = QUOTAS.get_project_quotas(context, context.project_id,
                                            usages=True)
@@ -30,14 +30,21 @@ import webob.exc
 from nova.api.openstack.compute.views import limits as limits_views
 from nova.api.openstack import wsgi
 from nova.api.openstack import xmlutil
+from nova.common import memorycache
+from nova.openstack.common import cfg
 from nova.openstack.common import importutils
 from nova.openstack.common import jsonutils
+from nova.openstack.common import log as logging
 from nova import quota
 from nova import wsgi as base_wsgi
 
 
 QUOTAS = quota.QUOTAS
 
+CONF = cfg.CONF
+
+LOG = logging.getLogger(__name__)
+
 
 # Convenience constants for the limits dictionary passed to Limiter().
 PER_SECOND = 1
@@ -128,6 +135,7 @@ class Limit(object):
         self.verb = verb
         self.uri = uri
         self.regex = regex
+        self._regex = None
         self.value = int(value)
         self.unit = unit
         self.unit_string = self.display_unit().lower()
@@ -153,7 +161,12 @@ class Limit(object):
         @param verb: string http verb (POST, GET, etc.)
         @param url: string URL
         """
-        if self.verb != verb or not re.match(self.regex, url):
+        if self.verb != verb:
+            return
+
+        if self._regex is None:
+            self._regex = re.compile(self.regex)
+        if not self._regex.match(url):
             return
 
         now = self._get_time()
@@ -187,6 +200,22 @@ class Limit(object):
         """Retrieve the current time. Broken out for testability."""
         return time.time()
 
+    def is_idle(self):
+        """Return whether the bucket of this limit has drained."""
+        if self.last_request is None:
+            return True
+        return self._get_time() - self.last_request >= self.water_level
+
+    def get_state(self):
+        """Return the bucket state of this limit."""
+        return (self.water_level, self.last_request, self.remaining,
+                self.next_request)
+
+    def set_state(self, state):
+        """Restore a bucket state returned by `get_state`."""
+        (self.water_level, self.last_request, self.remaining,
+         self.next_request) = state
+
     def display_unit(self):
         """Display the string name of the unit."""
         return self.UNITS.get(self.unit, "UNKNOWN")
@@ -283,20 +312,29 @@ class Limiter(object):
     Rate-limit checking class which handles limits in memory.
     """
 
+    # Seconds between passes forgetting users whose buckets have drained
+    IDLE_SWEEP_INTERVAL = 60
+
     def __init__(self, limits, **kwargs):
         """
         Initialize the new `Limiter`.
 
         @param limits: List of `Limit` objects
         """
-        self.limits = copy.deepcopy(limits)
-        self.levels = collections.defaultdict(lambda: copy.deepcopy(limits))
+        # NOTE(pnavarro): limits only hold scalars besides their compiled
+        #                 regex, so shallow copies are enough.
+        self.limits = [copy.copy(limit) for limit in limits]
+        self.levels = collections.defaultdict(
+                lambda: [copy.copy(limit) for limit in limits])
+        self._last_sweep = time.time()
 
         # Pick up any per-user limit information
+        self._configured_users = set()
         for key, value in kwargs.items():
             if key.startswith('user:'):
                 username = key[5:]
                 self.levels[username] = self.parse_limits(value)
+                self._configured_users.add(username)
 
     def get_limits(self, username=None):
         """
@@ -310,9 +348,21 @@ class Limiter(object):
 
         @return: Tuple of delay (in seconds) and error message (or None, None)
         """
+        now = time.time()
+        if now - self._last_sweep >= self.IDLE_SWEEP_INTERVAL:
+            self._last_sweep = now
+            self._evict_idle_users()
+
+        return self._check_limits(self.levels[username], verb, url)
+
+    @staticmethod
+    def _check_limits(limits, verb, url):
+        """Record a request against limits and return the longest delay."""
         delays = []
 
-        for limit in self.levels[username]:
+        for limit in limits:
+            if limit.verb != verb:
+                continue
             delay = limit(verb, url)
             if delay:
                 delays.append((delay, limit.error_message))
@@ -323,6 +373,14 @@ class Limiter(object):
 
         return None, None
 
+    def _evict_idle_users(self):
+        """Forget the limits of users whose buckets have all drained."""
+        for username, limits in self.levels.items():
+            if username in self._configured_users:
+                continue
+            if all(limit.is_idle() for limit in limits):
+                del self.levels[username]
+
     # Note: This method gets called before the class is instantiated,
     # so this must be either a static method or a class method.  It is
     # used to develop a list of limits to feed to the constructor.  We
@@ -384,6 +442,79 @@ class Limiter(object):
         return result
 
 
+class MemcachedLimiter(Limiter):
+    """
+    Rate-limit checking class which keeps the buckets of every user in
+    memcached, so all API workers and hosts share them.
+
+    Uses memcached if the memcached_servers flag is set, otherwise it uses
+    a very simple in-process cache. Buckets are written back with a
+    compare-and-set, so simultaneous requests from one user on different
+    workers are checked again instead of overwriting each other.
+    """
+
+    # Attempts at storing updated buckets before giving up on a request
+    CAS_RETRIES = 10
+
+    def __init__(self, limits, **kwargs):
+        super(MemcachedLimiter, self).__init__(limits, **kwargs)
+        self._cache = memorycache.get_client()
+
+    @staticmethod
+    def _cache_key(username):
+        return str('ratelimit-%s' % username)
+
+    def _load_limits(self, username, states):
+        """Return copies of the limits of a user with the given state."""
+        limits = [copy.copy(limit)
+                  for limit in self.levels.get(username, self.limits)]
+        if states and len(states) == len(limits):
+            for limit, state in zip(limits, states):
+                limit.set_state(state)
+        return limits
+
+    def get_limits(self, username=None):
+        """
+        Return the limits for a given user.
+        """
+        states = self._cache.get(self._cache_key(username))
+        return [limit.display()
+                for limit in self._load_limits(username, states)]
+
+    def check_for_delay(self, verb, url, username=None):
+        """
+        Check the given verb/user/user triplet for limit.
+
+        @return: Tuple of delay (in seconds) and error message (or None, None)
+        """
+        key = self._cache_key(username)
+        with self._cache.reserve() as cache:
+            for attempt in xrange(self.CAS_RETRIES):
+                states = cache.gets(key)
+                limits = self._load_limits(username, states)
+                before = [limit.get_state() for limit in limits]
+                result = self._check_limits(limits, verb, url)
+                after = [limit.get_state() for limit in limits]
+                if after == before:
+                    return result
+
+                # NOTE(pnavarro): every bucket has drained once a full unit
+                #                 has passed, so idle users expire by
+                #                 themselves.
+                ttl = int(max(limit.capacity for limit in limits))
+                if states is None:
+                    stored = cache.add(key, after, time=ttl)
+                else:
+                    stored = cache.cas(key, after, time=ttl)
+                if stored:
+                    return result
+
+        LOG.warn(_('Could not record a request of %(username)s against '
+                   'its rate limits after %(attempts)d attempts'),
+                 {'username': username, 'attempts': self.CAS_RETRIES})
+        return result
+
+
 class WsgiLimiter(object):
     """
     Rate-limit checking from a WSGI application. Uses an in-memory `Limiter`.
@@ -30,6 +30,7 @@ from nova.api.openstack import wsgi
 from nova.api.openstack import xmlutil
 from nova import compute
 from nova.compute import instance_types
+from nova import db
 from nova import exception
 from nova.openstack.common import cfg
 from nova.openstack.common import importutils
@@ -475,6 +476,30 @@ class Controller(wsgi.Controller):
 
         return instances
 
+    def _prefetch(self, req, instances):
+        """Defer loading the related data the extensions declared."""
+        context = req.environ['nova.context']
+        for kind in req.get_prefetch():
+            prefetcher = getattr(self, '_prefetch_%s' % kind, None)
+            if prefetcher is None:
+                LOG.debug(_("Ignoring unknown prefetch of %s"), kind)
+                continue
+            prefetcher(req, context, instances)
+
+    def _prefetch_compute_nodes(self, req, context, instances):
+        hosts = set(instance['host'] for instance in instances
+                    if instance['host'])
+
+        # NOTE(pnavarro): extensions declare their prefetch before their
+        #                 policy is checked, so the query only runs when
+        #                 an extension actually reads a compute node.
+        def load():
+            compute_nodes = db.compute_node_get_by_hosts(context,
+                                                         list(hosts))
+            req.cache_db_compute_nodes(compute_nodes)
+
+        req.defer_db_items('compute_nodes', load)
+
     def _get_servers(self, req, is_detail):
         """Returns a list of servers, based on any search options specified."""
 
@@ -545,6 +570,7 @@ class Controller(wsgi.Controller):
         else:
             response = self._view_builder.index(req, instance_list)
         req.cache_db_instances(instance_list)
+        self._prefetch(req, instance_list)
         return response
 
     def _get_server(self, context, req, instance_uuid):
@@ -717,6 +743,7 @@ class Controller(wsgi.Controller):
             context = req.environ['nova.context']
             instance = self.compute_api.get(context, id)
             req.cache_db_instance(instance)
+            self._prefetch(req, [instance])
             self._add_instance_faults(context, [instance])
             return self._view_builder.show(req, instance)
         except exception.NotFound:
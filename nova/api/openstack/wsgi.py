@@ -66,7 +66,8 @@ class Request(webob.Request):
 
     def __init__(self, *args, **kwargs):
         super(Request, self).__init__(*args, **kwargs)
-        self._extension_data = {'db_items': {}}
+        self._extension_data = {'db_items': {}, 'prefetch': set(),
+                                'loaders': {}}
 
     def cache_db_items(self, key, items, item_key='id'):
         """
@@ -81,6 +82,14 @@ class Request(webob.Request):
         for item in items:
             db_items[item[item_key]] = item
 
+    def defer_db_items(self, key, loader):
+        """
+        Allow API methods to register a loader for objects that are
+        only stored the first time an API extension asks for them, so
+        nothing is queried for extensions that end up not using them.
+        """
+        self._extension_data['loaders'][key] = loader
+
     def get_db_items(self, key):
         """
         Allow an API extension to get previously stored objects within
@@ -88,6 +97,9 @@ class Request(webob.Request):
 
         Note that the object data will be slightly stale.
         """
+        loader = self._extension_data['loaders'].pop(key, None)
+        if loader is not None:
+            loader()
         return self._extension_data['db_items'][key]
 
     def get_db_item(self, key, item_key):
@@ -99,6 +111,21 @@ class Request(webob.Request):
         """
         return self.get_db_items(key).get(item_key)
 
+    def add_prefetch(self, kinds):
+        """
+        Allow API extensions to declare the kinds of data related to
+        the database items they will need, so that the core controller
+        can load each kind in a single query.
+        """
+        self._extension_data['prefetch'].update(kinds)
+
+    def get_prefetch(self):
+        """
+        Allow API methods to get the kinds of related data the API
+        extensions declared for this API request.
+        """
+        return self._extension_data['prefetch']
+
     def cache_db_instances(self, instances):
         self.cache_db_items('instances', instances, 'uuid')
 
@@ -111,6 +138,16 @@ class Request(webob.Request):
     def get_db_instance(self, instance_uuid):
         return self.get_db_item('instances', instance_uuid)
 
+    def cache_db_compute_nodes(self, compute_nodes):
+        db_items = self._extension_data['db_items'].setdefault(
+            'compute_nodes', {})
+        for compute_node in compute_nodes:
+            db_items.setdefault(compute_node['service']['host'],
+                                compute_node)
+
+    def get_db_compute_node(self, host):
+        return self.get_db_item('compute_nodes', host)
+
     def cache_db_flavors(self, flavors):
         self.cache_db_items('flavors', flavors, 'flavorid')
 
@@ -568,10 +605,17 @@ class ResponseObject(object):
         self.serializer = serializer()
 
     def attach(self, **kwargs):
-        """Attach slave templates to serializers."""
+        """Attach slave templates to serializers.
+
+        Templates may be passed as template builder classes, in which
+        case they are only built for the media type being served.
+        """
 
         if self.media_type in kwargs:
-            self.serializer.attach(kwargs[self.media_type])
+            template = kwargs[self.media_type]
+            if isinstance(template, type):
+                template = template()
+            self.serializer.attach(template)
 
     def serialize(self, request, content_type, default_serializers=None):
         """Serializes the wrapped object.
@@ -941,6 +985,10 @@ class Resource(wsgi.Application):
             msg = _("Malformed request url")
             return Fault(webob.exc.HTTPBadRequest(explanation=msg))
 
+        # Let the method know what the extensions will need
+        for ext in extensions:
+            request.add_prefetch(getattr(ext, 'wsgi_prefetch', []))
+
         # Run pre-processing extensions
         response, post = self.pre_process_extensions(extensions,
                                                      request, action_args)
@@ -1069,11 +1117,20 @@ def extends(*args, **kwargs):
         @extends(action='resize')
         def _action_resize(...):
             pass
+
+    The prefetch keyword argument lists the kinds of related data
+    the extension will use, which the extended method loads in bulk
+    before the extension runs::
+
+        @extends(prefetch=['compute_nodes'])
+        def detail(...):
+            pass
     """
 
     def decorator(func):
         # Store enough information to find what we're extending
         func.wsgi_extends = (func.__name__, kwargs.get('action'))
+        func.wsgi_prefetch = kwargs.get('prefetch', [])
         return func
 
     # If we have positional arguments, call the decorator
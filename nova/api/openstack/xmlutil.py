@@ -173,6 +173,11 @@ class TemplateElement(object):
         self._children = []
         self._childmap = {}
 
+        # Render plans rooted at this element, and a counter used to
+        # detect modifications made after a plan was compiled
+        self._plans = {}
+        self._mutations = 0
+
         # Run the incoming attributes through set() so that they
         # become selectorized
         if not attrib:
@@ -219,6 +224,7 @@ class TemplateElement(object):
 
         self._children.append(elem)
         self._childmap[elem.tag] = elem
+        self._mutations += 1
 
     def extend(self, elems):
         """Append children to the element."""
@@ -240,6 +246,7 @@ class TemplateElement(object):
         # Update the children
         self._children.extend(elemlist)
         self._childmap.update(elemmap)
+        self._mutations += 1
 
     def insert(self, idx, elem):
         """Insert a child element at the given index."""
@@ -253,6 +260,7 @@ class TemplateElement(object):
 
         self._children.insert(idx, elem)
         self._childmap[elem.tag] = elem
+        self._mutations += 1
 
     def remove(self, elem):
         """Remove a child element."""
@@ -266,6 +274,7 @@ class TemplateElement(object):
 
         self._children.remove(elem)
         del self._childmap[elem.tag]
+        self._mutations += 1
 
     def get(self, key):
         """Get an attribute.
@@ -296,6 +305,7 @@ class TemplateElement(object):
             value = Selector(value)
 
         self.attrib[key] = value
+        self._mutations += 1
 
     def keys(self):
         """Return the attribute names."""
@@ -453,9 +463,11 @@ class TemplateElement(object):
             value = Selector(value)
 
         self._text = value
+        self._mutations += 1
 
     def _text_del(self):
         self._text = None
+        self._mutations += 1
 
     text = property(_text_get, _text_set, _text_del)
 
@@ -512,6 +524,199 @@ def SubTemplateElement(parent, tag, attrib=None, selector=None,
     return elem
 
 
+def _compile_selector(selector):
+    """Compile a selector into a faster equivalent callable.
+
+    Plain Selector instances with an empty chain or a single index
+    are replaced by closures performing the lookup directly; all
+    other selectors are returned unchanged.
+    """
+
+    if type(selector) is not Selector:
+        return selector
+
+    chain = selector.chain
+    if not chain:
+        return lambda obj, do_raise=False: obj
+    elif len(chain) > 1 or callable(chain[0]):
+        return selector
+
+    key = chain[0]
+
+    def select(obj, do_raise=False):
+        try:
+            return obj[key]
+        except (KeyError, IndexError):
+            if do_raise:
+                raise KeyError(key)
+            return None
+
+    return select
+
+
+def _overrides(elem, name):
+    """Determine if a template element overrides a method."""
+
+    method = getattr(type(elem), name)
+    return method.__func__ is not getattr(TemplateElement, name).__func__
+
+
+class RenderPlan(object):
+    """Represent a compiled template.
+
+    A render plan is compiled once from a list of sibling template
+    elements (the element of a master template plus the matching
+    elements of its slaves).  Selectors are compiled, attributes and
+    text of all the siblings are merged, and the child plans are
+    resolved up front, so that rendering an object no longer has to
+    walk the template trees.
+    """
+
+    def __init__(self, siblings):
+        """Compile a render plan.
+
+        :param siblings: The TemplateElement instances against which
+                         objects will be rendered.  The first is the
+                         primary element; the others are applied to
+                         it as patches.
+        """
+
+        self.elem = siblings[0]
+        self.patches = siblings[1:]
+
+        # Elements whose subclasses customize rendering fall back to
+        # TemplateElement.render()
+        self.custom = (_overrides(self.elem, 'render') or
+                       _overrides(self.elem, '_render') or
+                       any(_overrides(sib, 'apply') for sib in siblings))
+        if _overrides(self.elem, 'will_render'):
+            self.will_render = self.elem.will_render
+        else:
+            self.will_render = None
+
+        self.tag = self.elem.tag
+        self.dyntag = callable(self.tag)
+        self.selector = _compile_selector(self.elem.selector)
+        self.subselector = None
+        if self.elem.subselector is not None:
+            self.subselector = _compile_selector(self.elem.subselector)
+
+        # Later siblings override the text and attributes of earlier
+        # ones, as with TemplateElement.apply()
+        self.text = None
+        self.attrib = []
+        for sib in siblings:
+            if sib.text is not None:
+                self.text = _compile_selector(sib.text)
+            for key, value in sib.attrib.items():
+                self.attrib.append((key, _compile_selector(value)))
+
+        # Remember what we were compiled from
+        self.deps = [(sib, sib._mutations) for sib in siblings]
+
+        # Compile the children, merging those of the same name
+        self.children = []
+        seen = set()
+        for idx, sibling in enumerate(siblings):
+            for child in sibling:
+                if child.tag in seen:
+                    continue
+                seen.add(child.tag)
+
+                nieces = [child]
+                for sib in siblings[idx + 1:]:
+                    if child.tag in sib:
+                        nieces.append(sib[child.tag])
+
+                plan = RenderPlan(nieces)
+                self.children.append(plan)
+                self.deps.extend(plan.deps)
+
+    def is_current(self):
+        """Determine whether the template elements have changed."""
+
+        for elem, mutations in self.deps:
+            if elem._mutations != mutations:
+                return False
+        return True
+
+    def _element(self, parent, datum, nsmap):
+        """Create an etree.Element and apply text and attributes."""
+
+        tagname = self.tag(datum) if self.dyntag else self.tag
+        if parent is None:
+            elem = etree.Element(tagname, nsmap=nsmap)
+        else:
+            elem = etree.SubElement(parent, tagname, nsmap=nsmap)
+
+        if datum is None:
+            return elem
+
+        if self.text is not None:
+            elem.text = unicode(self.text(datum))
+        for key, value in self.attrib:
+            try:
+                elem.set(key, unicode(value(datum, True)))
+            except KeyError:
+                # Attribute has no value, so don't include it
+                pass
+
+        return elem
+
+    def _elements(self, parent, obj, nsmap):
+        """Render the elements for an object.
+
+        Equivalent to TemplateElement.render().
+        """
+
+        if self.custom:
+            return self.elem.render(parent, obj, self.patches, nsmap)
+
+        data = None if obj is None else self.selector(obj)
+
+        if self.will_render is None:
+            if data is None:
+                return []
+        elif not self.will_render(data):
+            return []
+        elif data is None:
+            return [(self._element(parent, None, nsmap), None)]
+
+        if not isinstance(data, list):
+            data = [data]
+        elif parent is None:
+            raise ValueError(_('root element selecting a list'))
+
+        elems = []
+        for datum in data:
+            if self.subselector is not None:
+                datum = self.subselector(datum)
+            elems.append((self._element(parent, datum, nsmap), datum))
+        return elems
+
+    def render(self, parent, obj, nsmap=None):
+        """Render an object.
+
+        Renders the object and, recursively, all its children.
+        Returns the first etree.Element instance rendered, or None.
+
+        :param parent: The parent etree.Element instance.  Can be
+                       None.
+        :param obj: The object to render.
+        :param nsmap: An optional namespace dictionary to be
+                      associated with the etree.Element instances
+                      rendered.
+        """
+
+        elems = self._elements(parent, obj, nsmap)
+        for elem, datum in elems:
+            for child in self.children:
+                child.render(elem, datum)
+
+        if elems:
+            return elems[0][0]
+
+
 class Template(object):
     """Represent a template."""
 
@@ -610,7 +815,21 @@ class Template(object):
         nsmap = self._nsmap()
 
         # Form the element tree
-        return self._serialize(None, obj, siblings, nsmap)
+        return self._plan(siblings).render(None, obj, nsmap)
+
+    def _plan(self, siblings):
+        """Return the render plan for the given root siblings.
+
+        Plans are cached on the root element, so that all copies of a
+        template with the same slaves attached share a single plan.
+        """
+
+        key = tuple(siblings[1:])
+        plan = siblings[0]._plans.get(key)
+        if plan is None or not plan.is_current():
+            plan = RenderPlan(siblings)
+            siblings[0]._plans[key] = plan
+        return plan
 
     def _siblings(self):
         """Hook method for computing root siblings.
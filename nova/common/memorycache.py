@@ -16,49 +16,355 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-"""Super simple fake memcache client."""
+"""Memcache clients: a pooled memcached client and a simple in-process
+stand-in with the same interface."""
 
+import collections
+import contextlib
+import copy
+import heapq
+import itertools
+import sys
+import threading
+import time
+
+import eventlet
+from eventlet import event
+from eventlet import pools
+from eventlet import queue
+
+from nova.openstack.common import cfg
+from nova.openstack.common import log as logging
 from nova.openstack.common import timeutils
 
+memorycache_opts = [
+    cfg.IntOpt('memorycache_max_items',
+               default=10000,
+               help='Maximum number of items an in-process cache keeps '
+                    'before evicting the least recently used, 0 for no '
+                    'limit'),
+    cfg.IntOpt('memcached_pool_size',
+               default=10,
+               help='Maximum number of memcached connections each process '
+                    'keeps, shared by all its green threads'),
+    ]
+
+CONF = cfg.CONF
+CONF.register_opts(memorycache_opts)
+CONF.import_opt('memcached_servers', 'nova.config')
+
+LOG = logging.getLogger(__name__)
+
+_POOLED_CLIENTS = {}
+
+
+def get_client(memcached_servers=None):
+    """Return a client for memcached_servers, which defaults to the
+    memcached_servers flag.
+
+    The clients of the same servers share one connection pool. Without
+    any servers, a new in-process Client is returned.
+    """
+    if memcached_servers is None:
+        memcached_servers = CONF.memcached_servers
+    if not memcached_servers:
+        return Client()
+    key = tuple(memcached_servers)
+    if key not in _POOLED_CLIENTS:
+        _POOLED_CLIENTS[key] = PooledClient(memcached_servers)
+    return _POOLED_CLIENTS[key]
+
+
+def _memcache_client(servers):
+    import memcache
+    return memcache.Client(servers, debug=0, cache_cas=True)
+
+
+class _Connection(object):
+    """A memcache client whose calls all run in a green thread of its own.
+
+    python-memcache clients are threading.local objects, so a client
+    opens new connections for every thread that uses it, and for every
+    green thread once eventlet has patched threading. Running all the
+    calls from one green thread keeps a single set of connections.
+    """
+
+    def __init__(self, servers):
+        self._requests = queue.LightQueue()
+        eventlet.spawn_n(self._run, servers)
+
+    def _run(self, servers):
+        client = None
+        while True:
+            done, operation, args, kwargs = self._requests.get()
+            try:
+                if client is None:
+                    client = _memcache_client(servers)
+                done.send(getattr(client, operation)(*args, **kwargs))
+            except Exception:
+                done.send_exception(*sys.exc_info())
+
+    def call(self, operation, *args, **kwargs):
+        done = event.Event()
+        self._requests.put((done, operation, args, kwargs))
+        return done.wait()
+
+
+class _ConnectionPool(pools.Pool):
+    """Pool of memcache connections."""
+
+    def __init__(self, servers):
+        self.servers = servers
+        super(_ConnectionPool, self).__init__(
+            max_size=CONF.memcached_pool_size, order_as_stack=True)
+
+    def create(self):
+        LOG.debug(_('Pool creating new memcached connection'))
+        return _Connection(self.servers)
+
+
+class _PooledOperations(object):
+    """The memcache calls of the pooled clients, each run by _call."""
+
+    def get(self, key):
+        return self._call('get', key)
+
+    def gets(self, key):
+        return self._call('gets', key)
+
+    def get_multi(self, keys, key_prefix=''):
+        return self._call('get_multi', keys, key_prefix=key_prefix)
+
+    def set(self, key, value, time=0, min_compress_len=0):
+        return self._call('set', key, value, time=time,
+                          min_compress_len=min_compress_len)
+
+    def set_multi(self, mapping, time=0, key_prefix='', min_compress_len=0):
+        return self._call('set_multi', mapping, time=time,
+                          key_prefix=key_prefix,
+                          min_compress_len=min_compress_len)
+
+    def add(self, key, value, time=0, min_compress_len=0):
+        return self._call('add', key, value, time=time,
+                          min_compress_len=min_compress_len)
+
+    def cas(self, key, value, time=0, min_compress_len=0):
+        return self._call('cas', key, value, time=time,
+                          min_compress_len=min_compress_len)
+
+    def incr(self, key, delta=1):
+        return self._call('incr', key, delta=delta)
+
+    def delete(self, key, time=0):
+        return self._call('delete', key, time=time)
+
+    def delete_multi(self, keys, time=0, key_prefix=''):
+        return self._call('delete_multi', keys, time=time,
+                          key_prefix=key_prefix)
+
+
+class PooledClient(_PooledOperations):
+    """memcached client that runs each call on a pooled connection.
+
+    The number of calls and the seconds spent on them, including the
+    wait for a free connection, are kept per operation in stats and
+    logged at most every STATS_LOG_INTERVAL seconds.
+    """
+
+    STATS_LOG_INTERVAL = 60
+
+    def __init__(self, servers):
+        self._servers = servers
+        self._pool = _ConnectionPool(servers)
+        self.stats = collections.defaultdict(
+            lambda: {'calls': 0, 'seconds': 0.0})
+        self._last_stats_log = time.time()
+
+    def _call(self, operation, *args, **kwargs):
+        start = time.time()
+        try:
+            with self._pool.item() as connection:
+                return connection.call(operation, *args, **kwargs)
+        finally:
+            self._record(operation, start)
+
+    def _record(self, operation, start):
+        now = time.time()
+        stats = self.stats[operation]
+        stats['calls'] += 1
+        stats['seconds'] += now - start
+        if now - self._last_stats_log >= self.STATS_LOG_INTERVAL:
+            self._last_stats_log = now
+            self._log_stats()
+
+    def _log_stats(self):
+        for operation, stats in sorted(self.stats.items()):
+            average = 1000 * stats['seconds'] / stats['calls']
+            LOG.debug(_('memcached %(servers)s %(operation)s: %(calls)d '
+                        'calls, %(average).2fms average'),
+                      {'servers': ','.join(self._servers),
+                       'operation': operation, 'calls': stats['calls'],
+                       'average': average})
+
+    @contextlib.contextmanager
+    def reserve(self):
+        """Run several calls on one connection, as gets and cas need."""
+        with self._pool.item() as connection:
+            yield _ReservedClient(self, connection)
+
+
+class _ReservedClient(_PooledOperations):
+    """Runs the calls of a PooledClient on a connection it reserved."""
+
+    def __init__(self, client, connection):
+        self._client = client
+        self._connection = connection
+
+    def _call(self, operation, *args, **kwargs):
+        start = time.time()
+        try:
+            return self._connection.call(operation, *args, **kwargs)
+        finally:
+            self._client._record(operation, start)
+
 
 class Client(object):
     """Replicates a tiny subset of memcached client interface."""
 
     def __init__(self, *args, **kwargs):
         """Ignores the passed in args."""
-        self.cache = {}
-
-    def get(self, key):
-        """Retrieves the value for a key or None.
-
-        this expunges expired keys during each get"""
+        # key -> (timeout, value, cas unique), least recently used first
+        self.cache = collections.OrderedDict()
+        self._uniques = itertools.count()
+        # key -> cas unique of the value returned by gets
+        self.cas_ids = {}
+        # heap of (timeout, key); entries outlive a set of a new timeout
+        # for their key and are skipped when they are popped
+        self._expiry = []
+        self._lock = threading.Lock()
 
-        for k in self.cache.keys():
-            (timeout, _value) = self.cache[k]
-            if timeout and timeutils.utcnow_ts() >= timeout:
-                del self.cache[k]
+    def _expunge(self):
+        now = timeutils.utcnow_ts()
+        while self._expiry and self._expiry[0][0] <= now:
+            timeout, key = heapq.heappop(self._expiry)
+            entry = self.cache.get(key)
+            if entry is not None and entry[0] == timeout:
+                del self.cache[key]
 
-        return self.cache.get(key, (0, None))[1]
+    def _get(self, key):
+        self._expunge()
+        entry = self.cache.pop(key, None)
+        if entry is None:
+            return None
+        self.cache[key] = entry
+        return entry[1]
 
-    def set(self, key, value, time=0, min_compress_len=0):
-        """Sets the value for a key."""
+    def _set(self, key, value, time):
         timeout = 0
         if time != 0:
             timeout = timeutils.utcnow_ts() + time
-        self.cache[key] = (timeout, value)
+            heapq.heappush(self._expiry, (timeout, key))
+            if len(self._expiry) > 2 * len(self.cache) + 64:
+                self._expiry[:] = [(entry[0], k)
+                                   for k, entry in self.cache.iteritems()
+                                   if entry[0]]
+                self._expiry.append((timeout, key))
+                heapq.heapify(self._expiry)
+        self.cache.pop(key, None)
+        self.cache[key] = (timeout, value, next(self._uniques))
+        max_items = CONF.memorycache_max_items
+        while max_items and len(self.cache) > max_items:
+            self.cache.popitem(last=False)
         return True
 
+    def get(self, key):
+        """Retrieves the value for a key or None."""
+        with self._lock:
+            return self._get(key)
+
+    def gets(self, key):
+        """Retrieves the value for a key or None, remembering its
+        version for a later cas."""
+        with self._lock:
+            value = self._get(key)
+            if value is None:
+                self.cas_ids.pop(key, None)
+            else:
+                self.cas_ids[key] = self.cache[key][2]
+            return value
+
+    def get_multi(self, keys, key_prefix=''):
+        """Retrieves the values found for several keys."""
+        with self._lock:
+            values = {}
+            for key in keys:
+                value = self._get(key_prefix + key)
+                if value is not None:
+                    values[key] = value
+            return values
+
+    def set(self, key, value, time=0, min_compress_len=0):
+        """Sets the value for a key."""
+        with self._lock:
+            return self._set(key, value, time)
+
+    def set_multi(self, mapping, time=0, key_prefix='', min_compress_len=0):
+        """Sets the values for several keys, returning those not set."""
+        with self._lock:
+            for key, value in mapping.iteritems():
+                self._set(key_prefix + key, value, time)
+            return []
+
     def add(self, key, value, time=0, min_compress_len=0):
         """Sets the value for a key if it doesn't exist."""
-        if not self.get(key) is None:
-            return False
-        return self.set(key, value, time, min_compress_len)
+        with self._lock:
+            if not self._get(key) is None:
+                return False
+            return self._set(key, value, time)
+
+    def cas(self, key, value, time=0, min_compress_len=0):
+        """Sets the value for a key if it did not change since gets.
+
+        Like python-memcache, this is a plain set for a key that was not
+        read with gets.
+        """
+        with self._lock:
+            if key not in self.cas_ids:
+                return self._set(key, value, time)
+            unique = self.cas_ids.pop(key)
+            self._get(key)
+            entry = self.cache.get(key)
+            if entry is None or entry[2] != unique:
+                return False
+            return self._set(key, value, time)
+
+    @contextlib.contextmanager
+    def reserve(self):
+        """Return a client sharing this cache, with cas ids of its own
+        like a reserved connection of a PooledClient."""
+        reserved = copy.copy(self)
+        reserved.cas_ids = {}
+        yield reserved
 
     def incr(self, key, delta=1):
         """Increments the value for a key."""
-        value = self.get(key)
-        if value is None:
-            return None
-        new_value = int(value) + delta
-        self.cache[key] = (self.cache[key][0], str(new_value))
-        return new_value
+        with self._lock:
+            value = self._get(key)
+            if value is None:
+                return None
+            new_value = int(value) + delta
+            self.cache[key] = (self.cache[key][0], str(new_value),
+                               next(self._uniques))
+            return new_value
+
+    def delete(self, key, time=0):
+        """Deletes the value associated with a key."""
+        with self._lock:
+            self.cache.pop(key, None)
+
+    def delete_multi(self, keys, time=0, key_prefix=''):
+        """Deletes the values associated with several keys."""
+        with self._lock:
+            for key in keys:
+                self.cache.pop(key_prefix + key, None)
+            return 1
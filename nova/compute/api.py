@@ -41,6 +41,7 @@ from nova import crypto
 from nova.db import base
 from nova import exception
 from nova.image import glance
+from nova import metadata_cache
 from nova import network
 from nova import notifications
 from nova.openstack.common import cfg
@@ -2037,6 +2038,7 @@ class API(base.Base):
         """Delete the given metadata item from an instance."""
         self.db.instance_metadata_delete(context, instance['uuid'], key)
         instance['metadata'] = {}
+        metadata_cache.invalidate_instance(instance)
         notifications.send_update(context, instance, instance)
         self.compute_rpcapi.change_instance_metadata(context,
                                                      instance=instance,
@@ -2063,6 +2065,7 @@ class API(base.Base):
         metadata = self.db.instance_metadata_update(context, instance['uuid'],
                                          _metadata, True)
         instance['metadata'] = metadata
+        metadata_cache.invalidate_instance(instance)
         notifications.send_update(context, instance, instance)
         diff = utils.diff_dict(orig, _metadata)
         self.compute_rpcapi.change_instance_metadata(context,
@@ -2143,6 +2146,11 @@ class HostAPI(base.Base):
         return self.compute_rpcapi.host_maintenance_mode(context,
                 host_param=host, mode=mode, host=host)
 
+    def prefetch_images(self, context, host, image_ids):
+        """Downloads images into the image cache of the host."""
+        self.compute_rpcapi.prefetch_images(context, image_ids=image_ids,
+                host=host)
+
 
 class AggregateAPI(base.Base):
     """Sub-set of the Compute Manager API for managing host aggregates."""
@@ -2231,6 +2239,14 @@ class AggregateAPI(base.Base):
                 aggregate=aggregate, host_param=host, host=host)
         return self.get_aggregate(context, aggregate_id)
 
+    def prefetch_images(self, context, aggregate_id, image_ids):
+        """Downloads images into the image cache of the aggregate's hosts."""
+        aggregate = self.db.aggregate_get(context, aggregate_id)
+        for host in self.db.aggregate_host_get_all(context, aggregate.id):
+            self.compute_rpcapi.prefetch_images(context, image_ids=image_ids,
+                    host=host)
+        return self._get_aggregate_info(context, aggregate)
+
     def _get_aggregate_info(self, context, aggregate):
         """Builds a dictionary with aggregate props, metadata and hosts."""
         metadata = self.db.aggregate_metadata_get(context, aggregate.id)
@@ -137,6 +137,23 @@ def get_all_types(ctxt=None, inactive=False, filters=None):
 get_all_flavors = get_all_types
 
 
+def get_all_types_sorted_list(ctxt=None, inactive=False, filters=None,
+                              sort_key='flavorid', sort_dir='asc',
+                              limit=None, marker=None):
+    """Get a page of instance_types as a sorted list.
+
+    The marker is the flavorid of the last instance_type of the
+    previous page.
+    """
+    if ctxt is None:
+        ctxt = context.get_admin_context()
+
+    return db.instance_type_get_all(ctxt, inactive=inactive,
+                                    filters=filters, sort_key=sort_key,
+                                    sort_dir=sort_dir, limit=limit,
+                                    marker=marker)
+
+
 def get_default_instance_type():
     """Get the default instance type."""
     name = CONF.default_instance_type
@@ -307,7 +307,7 @@ class ComputeVirtAPI(virtapi.VirtAPI):
 class ComputeManager(manager.SchedulerDependentManager):
     """Manages the running instances from creation to destruction."""
 
-    RPC_API_VERSION = '2.19'
+    RPC_API_VERSION = '2.20'
 
     def __init__(self, compute_driver=None, *args, **kwargs):
         """Load configuration options and connect to the hypervisor."""
@@ -2126,6 +2126,15 @@ class ComputeManager(manager.SchedulerDependentManager):
         """Returns the result of calling "uptime" on the target host."""
         return self.driver.get_host_uptime(host)
 
+    @exception.wrap_exception(notifier=notifier, publisher_id=publisher_id())
+    def prefetch_images(self, context, image_ids):
+        """Download images into this host's image cache ahead of time."""
+        LOG.audit(_("Prefetching images %s"), image_ids, context=context)
+        self.driver.prefetch_images(context, image_ids)
+        # NOTE(pnavarro): report the newly cached images to the schedulers
+        # on the next periodic run instead of waiting for host_state_interval
+        self._last_host_check = 0
+
     @exception.wrap_exception(notifier=notifier, publisher_id=publisher_id())
     @wrap_instance_fault
     def get_diagnostics(self, context, instance):
@@ -147,6 +147,7 @@ class ComputeAPI(nova.openstack.common.rpc.proxy.RpcProxy):
         2.17 - Add get_backdoor_port()
         2.18 - Add bdms to rebuild_instance
         2.19 - Add node to run_instance
+        2.20 - Add prefetch_images()
     '''
 
     #
@@ -559,6 +560,11 @@ class ComputeAPI(nova.openstack.common.rpc.proxy.RpcProxy):
         return self.call(ctxt, self.make_msg('get_backdoor_port'),
                          topic=_compute_topic(self.topic, ctxt, host, None))
 
+    def prefetch_images(self, ctxt, image_ids, host):
+        self.cast(ctxt, self.make_msg('prefetch_images', image_ids=image_ids),
+                topic=_compute_topic(self.topic, ctxt, host, None),
+                version='2.20')
+
     def publish_service_capabilities(self, ctxt):
         self.fanout_cast(ctxt, self.make_msg('publish_service_capabilities'))
 
@@ -207,6 +207,11 @@ def compute_node_get_by_host(context, host):
     return IMPL.compute_node_get_by_host(context, host)
 
 
+def compute_node_get_by_hosts(context, hosts):
+    """Get computeNodes, with their services, for a list of hosts."""
+    return IMPL.compute_node_get_by_hosts(context, hosts)
+
+
 def compute_node_statistics(context):
     return IMPL.compute_node_statistics(context)
 
@@ -315,6 +320,11 @@ def floating_ip_get_all_by_host(context, host):
     return IMPL.floating_ip_get_all_by_host(context, host)
 
 
+def floating_ip_get_all_with_fixed_by_host(context, host):
+    """Get all floating ips by host with the address of their fixed ip."""
+    return IMPL.floating_ip_get_all_with_fixed_by_host(context, host)
+
+
 def floating_ip_get_all_by_project(context, project_id):
     """Get all floating ips by project."""
     return IMPL.floating_ip_get_all_by_project(context, project_id)
@@ -441,9 +451,15 @@ def fixed_ip_create(context, values):
     return IMPL.fixed_ip_create(context, values)
 
 
-def fixed_ip_bulk_create(context, ips):
-    """Create a lot of fixed ips from the values dictionary."""
-    return IMPL.fixed_ip_bulk_create(context, ips)
+def fixed_ip_bulk_create(context, ips, chunk_size=None, progress=None):
+    """Create a lot of fixed ips from an iterable of values dictionaries.
+
+    They are inserted chunk_size at a time, all in one transaction. After
+    each chunk, progress is called with the number of fixed ips inserted
+    so far.
+    """
+    return IMPL.fixed_ip_bulk_create(context, ips, chunk_size=chunk_size,
+                                     progress=progress)
 
 
 def fixed_ip_disassociate(context, address):
@@ -546,6 +562,15 @@ def virtual_interface_get_all(context):
     return IMPL.virtual_interface_get_all(context)
 
 
+def virtual_interface_get_all_with_ips(context, address_prefix=None):
+    """Gets all instance vifs with their network, fixed and floating ips.
+
+    If address_prefix is given, only fixed ips whose address or one of
+    whose floating addresses starts with it are returned.
+    """
+    return IMPL.virtual_interface_get_all_with_ips(context, address_prefix)
+
+
 ####################
 
 
@@ -1256,10 +1281,13 @@ def instance_type_create(context, values):
     return IMPL.instance_type_create(context, values)
 
 
-def instance_type_get_all(context, inactive=False, filters=None):
+def instance_type_get_all(context, inactive=False, filters=None,
+                          sort_key='name', sort_dir='asc', limit=None,
+                          marker=None):
     """Get all instance types."""
     return IMPL.instance_type_get_all(
-        context, inactive=inactive, filters=filters)
+        context, inactive=inactive, filters=filters, sort_key=sort_key,
+        sort_dir=sort_dir, limit=limit, marker=marker)
 
 
 def instance_type_get(context, id):
@@ -23,11 +23,14 @@ import collections
 import copy
 import datetime
 import functools
+import itertools
+import random
 import uuid
 
 from sqlalchemy import and_
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import or_
+from sqlalchemy.orm import contains_eager
 from sqlalchemy.orm import joinedload
 from sqlalchemy.orm import joinedload_all
 from sqlalchemy.sql.expression import asc
@@ -555,6 +558,18 @@ def compute_node_get_by_host(context, host):
     return result
 
 
+def compute_node_get_by_hosts(context, hosts):
+    """Get all capacity entries for the given hosts."""
+    if not hosts:
+        return []
+    return model_query(context, models.ComputeNode).\
+            join('service').\
+            options(contains_eager('service')).\
+            filter(models.Service.host.in_(hosts)).\
+            filter_by(deleted=False).\
+            all()
+
+
 def compute_node_statistics(context):
     """Compute statistics over all compute nodes."""
     result = model_query(context,
@@ -840,6 +855,34 @@ def floating_ip_get_all_by_host(context, host):
     return floating_ip_refs
 
 
+@require_admin_context
+def floating_ip_get_all_with_fixed_by_host(context, host):
+    """Get all floating ips by host with the address of their fixed ip.
+
+    Returns a list of dicts with the floating ip address, interface and
+    fixed_ip_id plus the fixed_address, which is None if the fixed ip no
+    longer exists.
+    """
+    session = get_session()
+    rows = session.query(models.FloatingIp.address,
+                         models.FloatingIp.interface,
+                         models.FloatingIp.fixed_ip_id,
+                         models.FixedIp.address.label('fixed_address')).\
+                   outerjoin(models.FixedIp,
+                             and_(models.FixedIp.id ==
+                                      models.FloatingIp.fixed_ip_id,
+                                  models.FixedIp.deleted == False)).\
+                   filter(models.FloatingIp.host == host).\
+                   filter(models.FloatingIp.deleted == False).\
+                   all()
+    if not rows:
+        raise exception.FloatingIpNotFoundForHost(host=host)
+    return [{'address': row.address,
+             'interface': row.interface,
+             'fixed_ip_id': row.fixed_ip_id,
+             'fixed_address': row.fixed_address} for row in rows]
+
+
 @require_context
 def floating_ip_get_all_by_project(context, project_id):
     authorize_project_context(context, project_id)
@@ -1018,12 +1061,29 @@ def fixed_ip_associate_pool(context, network_id, instance_uuid=None,
     with session.begin():
         network_or_none = or_(models.FixedIp.network_id == network_id,
                               models.FixedIp.network_id == None)
-        fixed_ip_ref = model_query(context, models.FixedIp, session=session,
-                                   read_deleted="no").\
+        free_query = model_query(context, models.FixedIp, session=session,
+                                 read_deleted="no").\
                                filter(network_or_none).\
                                filter_by(reserved=False).\
                                filter_by(instance_uuid=None).\
-                               filter_by(host=None).\
+                               filter_by(host=None)
+
+        # NOTE(pnavarro): concurrent allocations used to all lock the first
+        #                 free row of the network and serialize on it.  Start
+        #                 the search at a random id inside the network's range
+        #                 instead and wrap around to the beginning only if
+        #                 nothing is free past that point.
+        fixed_ip_ref = None
+        pivot = _fixed_ip_pool_pivot(session, network_or_none)
+        if pivot is not None:
+            fixed_ip_ref = free_query.\
+                               filter(models.FixedIp.id >= pivot).\
+                               order_by(asc(models.FixedIp.id)).\
+                               with_lockmode('update').\
+                               first()
+        if not fixed_ip_ref:
+            fixed_ip_ref = free_query.\
+                               order_by(asc(models.FixedIp.id)).\
                                with_lockmode('update').\
                                first()
         # NOTE(vish): if with_lockmode isn't supported, as in sqlite,
@@ -1043,6 +1103,21 @@ def fixed_ip_associate_pool(context, network_id, instance_uuid=None,
     return fixed_ip_ref['address']
 
 
+def _fixed_ip_pool_pivot(session, network_filter):
+    """Pick a random fixed ip id to start a free address search from.
+
+    Returns None if there are no fixed ips matching network_filter.
+    """
+    min_id, max_id = session.query(func.min(models.FixedIp.id),
+                                   func.max(models.FixedIp.id)).\
+                             filter(network_filter).\
+                             filter(models.FixedIp.deleted == False).\
+                             first()
+    if min_id is None or max_id is None:
+        return None
+    return random.randint(min_id, max_id)
+
+
 @require_context
 def fixed_ip_create(context, values):
     fixed_ip_ref = models.FixedIp()
@@ -1052,13 +1127,23 @@ def fixed_ip_create(context, values):
 
 
 @require_context
-def fixed_ip_bulk_create(context, ips):
+def fixed_ip_bulk_create(context, ips, chunk_size=None, progress=None):
+    ips = iter(ips)
+    inserted = 0
     session = get_session()
     with session.begin():
-        for ip in ips:
-            model = models.FixedIp()
-            model.update(ip)
-            session.add(model)
+        # NOTE(pnavarro): an executemany insert is much cheaper than
+        #                 building an ORM object for every address; chunks
+        #                 bound the memory used while all of them still
+        #                 commit or roll back together.
+        while True:
+            chunk = list(itertools.islice(ips, chunk_size))
+            if not chunk:
+                break
+            session.execute(models.FixedIp.__table__.insert(), chunk)
+            inserted += len(chunk)
+            if progress:
+                progress(inserted)
 
 
 @require_context
@@ -1340,6 +1425,60 @@ def virtual_interface_get_all(context):
     return vif_refs
 
 
+@require_context
+def virtual_interface_get_all_with_ips(context, address_prefix=None):
+    """Get all instance vifs with their network, fixed and floating ips.
+
+    Everything is loaded with a single joined query and returned as a list
+    of dicts, one per vif, ordered by vif id.
+    """
+    vif = models.VirtualInterface
+    fixed = models.FixedIp
+    floating = models.FloatingIp
+
+    session = get_session()
+    query = session.query(vif.id, vif.instance_uuid, vif.address,
+                          vif.network_id,
+                          models.Network.cidr_v6,
+                          fixed.address.label('fixed_address'),
+                          floating.address.label('floating_address')).\
+                    outerjoin(models.Network,
+                              and_(models.Network.id == vif.network_id,
+                                   models.Network.deleted == False)).\
+                    outerjoin(fixed,
+                              and_(fixed.virtual_interface_id == vif.id,
+                                   fixed.deleted == False)).\
+                    outerjoin(floating,
+                              and_(floating.fixed_ip_id == fixed.id,
+                                   floating.deleted == False)).\
+                    filter(vif.instance_uuid != None)
+    if address_prefix:
+        like = '%s%%' % address_prefix
+        query = query.filter(or_(fixed.address.like(like),
+                                 floating.address.like(like)))
+    query = query.order_by(asc(vif.id), asc(fixed.id), asc(floating.id))
+
+    vifs = []
+    for row in query.all():
+        if not vifs or vifs[-1]['id'] != row.id:
+            vifs.append({'id': row.id,
+                         'instance_uuid': row.instance_uuid,
+                         'address': row.address,
+                         'network_id': row.network_id,
+                         'cidr_v6': row.cidr_v6,
+                         'fixed_ips': []})
+        fixed_ips = vifs[-1]['fixed_ips']
+        if row.fixed_address is None:
+            continue
+        if not fixed_ips or fixed_ips[-1]['address'] != row.fixed_address:
+            fixed_ips.append({'address': row.fixed_address,
+                              'floating_ips': []})
+        if row.floating_address is not None:
+            fixed_ips[-1]['floating_ips'].append(
+                    {'address': row.floating_address})
+    return vifs
+
+
 ###################
 
 
@@ -1542,18 +1681,16 @@ def instance_get_all_by_filters(context, filters, sort_key, sort_dir,
     will be returned by default, unless there's a filter that says
     otherwise"""
 
-    sort_fn = {'desc': desc, 'asc': asc}
-
     if not session:
         session = get_session()
 
+    # NOTE(pnavarro): paginate_query() takes care of the ordering
     query_prefix = session.query(models.Instance).\
             options(joinedload('info_cache')).\
             options(joinedload('security_groups')).\
             options(joinedload('system_metadata')).\
             options(joinedload('metadata')).\
-            options(joinedload('instance_type')).\
-            order_by(sort_fn[sort_dir](getattr(models.Instance, sort_key)))
+            options(joinedload('instance_type'))
 
     # Make a copy of the filters dictionary to use going forward, as we'll
     # be modifying it and we shouldn't affect the caller's use of it.
@@ -1596,13 +1733,15 @@ def instance_get_all_by_filters(context, filters, sort_key, sort_dir,
     query_prefix = regex_filter(query_prefix, models.Instance, filters)
 
     # paginate query
+    sort_keys = [sort_key]
+    for key in ('created_at', 'id'):
+        if key not in sort_keys:
+            sort_keys.append(key)
     if marker is not None:
-        try:
-            marker = instance_get_by_uuid(context, marker, session=session)
-        except exception.InstanceNotFound:
-            raise exception.MarkerNotFound(marker)
+        marker = _instance_get_marker(context, marker, sort_keys,
+                                      session=session)
     query_prefix = paginate_query(query_prefix, models.Instance, limit,
-                           [sort_key, 'created_at', 'id'],
+                           sort_keys,
                            marker=marker,
                            sort_dir=sort_dir)
 
@@ -1610,6 +1749,29 @@ def instance_get_all_by_filters(context, filters, sort_key, sort_dir,
     return instances
 
 
+def _instance_get_marker(context, instance_uuid, sort_keys, session=None):
+    """Return the sort key values of the instance used as a marker.
+
+    Only the sort key columns are loaded, none of the relationships
+    instance_get_by_uuid() joins.
+    """
+    try:
+        columns = [getattr(models.Instance, key) for key in sort_keys]
+    except AttributeError:
+        raise exception.InvalidSortKey()
+
+    marker = model_query(context, models.Instance, session=session,
+                         project_only=True).\
+                     filter_by(uuid=instance_uuid).\
+                     with_entities(*columns).\
+                     first()
+
+    if not marker:
+        raise exception.MarkerNotFound(marker=instance_uuid)
+
+    return marker
+
+
 def regex_filter(query, model, filters):
     """Applies regular expression filtering to a query.
 
@@ -3564,7 +3726,9 @@ def _instance_type_get_query(context, session=None, read_deleted=None):
 
 
 @require_context
-def instance_type_get_all(context, inactive=False, filters=None):
+def instance_type_get_all(context, inactive=False, filters=None,
+                          sort_key='name', sort_dir='asc', limit=None,
+                          marker=None):
     """
     Returns all instance types.
     """
@@ -3603,11 +3767,39 @@ def instance_type_get_all(context, inactive=False, filters=None):
             query = query.filter(the_filter[0])
         del filters['is_public']
 
-    inst_types = query.order_by("name").all()
+    if marker is not None:
+        marker = _instance_type_get_marker(context, marker,
+                                           [sort_key, 'id'],
+                                           read_deleted=read_deleted)
+    query = paginate_query(query, models.InstanceTypes, limit,
+                           [sort_key, 'id'],
+                           marker=marker,
+                           sort_dir=sort_dir)
+
+    inst_types = query.all()
 
     return [_dict_with_extra_specs(i) for i in inst_types]
 
 
+def _instance_type_get_marker(context, flavorid, sort_keys, read_deleted):
+    """Return the sort key values of the instance type used as a marker."""
+    try:
+        columns = [getattr(models.InstanceTypes, key) for key in sort_keys]
+    except AttributeError:
+        raise exception.InvalidSortKey()
+
+    marker = model_query(context, models.InstanceTypes,
+                         read_deleted=read_deleted).\
+                     filter_by(flavorid=flavorid).\
+                     with_entities(*columns).\
+                     first()
+
+    if not marker:
+        raise exception.MarkerNotFound(marker=flavorid)
+
+    return marker
+
+
 @require_context
 def instance_type_get(context, id, session=None):
     """Returns a dict describing specific instance_type"""
@@ -21,7 +21,9 @@ from __future__ import absolute_import
 
 import copy
 import itertools
+import os
 import random
+import stat
 import sys
 import time
 import urlparse
@@ -33,6 +35,7 @@ from nova import exception
 from nova.openstack.common import cfg
 from nova.openstack.common import jsonutils
 from nova.openstack.common import log as logging
+from nova.openstack.common.notifier import api as notifier
 from nova.openstack.common import timeutils
 
 
@@ -44,6 +47,14 @@ CONF.import_opt('glance_api_servers', 'nova.config')
 CONF.import_opt('glance_num_retries', 'nova.config')
 
 
+def _is_regular_file(data):
+    """Check whether a writer is backed by a regular file."""
+    try:
+        return stat.S_ISREG(os.fstat(data.fileno()).st_mode)
+    except (AttributeError, EnvironmentError, ValueError):
+        return False
+
+
 def _parse_image_ref(image_href):
     """Parse an image href into composite parts.
 
@@ -225,9 +236,46 @@ class GlanceImageService(object):
         except Exception:
             _reraise_translated_image_exception(image_id)
 
+        # NOTE(pnavarro): chunks which are entirely zero are seeked over
+        # rather than written when the destination is a regular file, so the
+        # zero filled regions of raw images stay sparse on disk.
+        sparse = _is_regular_file(data)
+        zeros = ''
+        size = 0
+        skipped = 0
+        start = time.time()
         for chunk in image_chunks:
+            size += len(chunk)
+            if sparse:
+                if len(chunk) != len(zeros):
+                    zeros = '\0' * len(chunk)
+                if chunk == zeros:
+                    data.seek(len(chunk), os.SEEK_CUR)
+                    skipped += len(chunk)
+                    continue
             data.write(chunk)
 
+        if skipped:
+            # An image ending in zeros must still be extended to its size
+            data.truncate()
+
+        self._report_download(context, image_id, size, skipped,
+                              time.time() - start)
+
+    def _report_download(self, context, image_id, size, skipped, seconds):
+        """Log and notify the throughput of an image download."""
+        rate = size / seconds if seconds > 0 else 0
+        payload = {'image_id': image_id,
+                   'bytes': size,
+                   'sparse_bytes': skipped,
+                   'seconds': seconds,
+                   'bytes_per_second': rate}
+        LOG.info(_('Downloaded image %(image_id)s: %(bytes)d bytes '
+                   '(%(sparse_bytes)d sparse) in %(seconds).2f seconds, '
+                   '%(bytes_per_second)d bytes/s') % payload)
+        notifier.notify(context, notifier.publisher_id('image'),
+                        'image.download', notifier.INFO, payload)
+
     def create(self, context, image_meta, data=None):
         """Store the image data and return the new image object."""
         sent_service_image_meta = self._translate_to_glance(image_meta)
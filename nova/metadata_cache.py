@@ -0,0 +1,90 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Cache of the documents served by the metadata service.
+
+The documents of an instance are cached under its fixed addresses by
+the metadata API, and dropped by the compute and network APIs when the
+metadata or the addresses of the instance change.
+
+Without memcached_servers every process keeps its own cache, so the
+invalidation only reaches the process making the change. A separate
+nova-api-metadata service then keeps serving the old documents for up
+to metadata_cache_expiration seconds.
+"""
+
+from nova.common import memorycache
+from nova.network import model as network_model
+from nova.openstack.common import cfg
+from nova.openstack.common import log as logging
+
+
+metadata_cache_opts = [
+    cfg.IntOpt('metadata_cache_expiration',
+               default=15,
+               help='Time in seconds to cache the metadata documents of an '
+                    'instance. Without memcached_servers, changes made by '
+                    'other services are only seen once this expires'),
+    ]
+
+CONF = cfg.CONF
+CONF.register_opts(metadata_cache_opts)
+
+LOG = logging.getLogger(__name__)
+
+_CLIENT = None
+
+
+def _get_client():
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = memorycache.get_client()
+    return _CLIENT
+
+
+def _cache_key(address):
+    return str('metadata-%s' % address)
+
+
+def get_documents(address):
+    """Return the cached documents for a fixed address, or None."""
+    return _get_client().get(_cache_key(address))
+
+
+def set_documents(address, documents):
+    """Cache the documents for a fixed address."""
+    _get_client().set(_cache_key(address), documents,
+                      CONF.metadata_cache_expiration)
+
+
+def invalidate(address):
+    """Drop the cached documents for a fixed address."""
+    _get_client().delete(_cache_key(address))
+
+
+def invalidate_instance(instance):
+    """Drop the cached documents for all the fixed addresses of an
+    instance, as found in its network info cache."""
+    info_cache = instance.get('info_cache') or {}
+    nw_info = network_model.NetworkInfo.hydrate(
+        info_cache.get('network_info') or [])
+    addresses = [fixed_ip['address'] for fixed_ip in nw_info.fixed_ips()]
+    if addresses:
+        LOG.debug(_('Invalidating cached metadata for %s'),
+                  ', '.join(addresses), instance=instance)
+        _get_client().delete_multi([_cache_key(address)
+                                    for address in addresses])
@@ -22,6 +22,7 @@ import inspect
 
 from nova.db import base
 from nova import exception
+from nova import metadata_cache
 from nova.network import model as network_model
 from nova.network import rpcapi as network_rpcapi
 from nova.openstack.common import log as logging
@@ -78,6 +79,9 @@ def update_instance_cache_with_nw_info(api, context, instance,
         LOG.debug(_('args: %s') % (args or {}))
         LOG.debug(_('kwargs: %s') % (kwargs or {}))
 
+    # the metadata documents include the floating and fixed addresses
+    metadata_cache.invalidate_instance(instance)
+
 
 class API(base.Base):
     """API for interacting with the network manager."""
@@ -209,6 +213,7 @@ class API(base.Base):
         args['project_id'] = instance['project_id']
         args['host'] = instance['host']
         self.network_rpcapi.deallocate_for_instance(context, **args)
+        metadata_cache.invalidate_instance(instance)
 
     def add_fixed_ip_to_instance(self, context, instance, network_id):
         """Adds a fixed ip to instance from specified network."""
@@ -216,6 +221,7 @@ class API(base.Base):
                 'host': instance['host'],
                 'network_id': network_id}
         self.network_rpcapi.add_fixed_ip_to_instance(context, **args)
+        metadata_cache.invalidate_instance(instance)
 
     def remove_fixed_ip_from_instance(self, context, instance, address):
         """Removes a fixed ip from instance from specified network."""
@@ -224,6 +230,7 @@ class API(base.Base):
                 'host': instance['host'],
                 'address': address}
         self.network_rpcapi.remove_fixed_ip_from_instance(context, **args)
+        metadata_cache.invalidate(address)
 
     def add_network_to_project(self, context, project_id, network_uuid=None):
         """Force adds another network to a project."""
@@ -54,6 +54,13 @@ class L3Driver(object):
            l3_interface_id so just pass None in that case"""
         raise NotImplementedError()
 
+    def add_floating_ips(self, floating_ips, l3_interface_id):
+        """Add a list of (floating_ip, fixed_ip) pairs on l3_interface_id.
+           Drivers that can configure many floating IPs at once should
+           override this; by default add_floating_ip is called for each"""
+        for floating_ip, fixed_ip in floating_ips:
+            self.add_floating_ip(floating_ip, fixed_ip, l3_interface_id)
+
     def remove_floating_ip(self, floating_ip, fixed_ip, l3_interface_id):
         raise NotImplementedError()
 
@@ -101,6 +108,11 @@ class LinuxNetL3(L3Driver):
         linux_net.ensure_floating_forward(floating_ip, fixed_ip,
                                           l3_interface_id)
 
+    def add_floating_ips(self, floating_ips, l3_interface_id):
+        linux_net.bind_floating_ips([floating_ip for floating_ip, _fixed_ip
+                                     in floating_ips], l3_interface_id)
+        linux_net.ensure_floating_forwards(floating_ips, l3_interface_id)
+
     def remove_floating_ip(self, floating_ip, fixed_ip, l3_interface_id):
         linux_net.unbind_floating_ip(floating_ip, l3_interface_id)
         linux_net.remove_floating_forward(floating_ip, fixed_ip,
@@ -597,6 +597,29 @@ def bind_floating_ip(floating_ip, device):
         send_arp_for_ip(floating_ip, device, CONF.send_arp_for_ha_count)
 
 
+def bind_floating_ips(floating_ips, device):
+    """Bind a list of ips to public interface with a single ip call."""
+    out, _err = _execute('ip', 'addr', 'show', 'dev', device,
+                         run_as_root=True)
+    bound = set()
+    for line in out.split('\n'):
+        fields = line.split()
+        if len(fields) > 1 and fields[0] == 'inet':
+            bound.add(fields[1].split('/')[0])
+
+    commands = ['addr add %s/32 dev %s' % (floating_ip, device)
+                for floating_ip in floating_ips
+                if str(floating_ip) not in bound]
+    if commands:
+        _execute('ip', '-batch', '-',
+                 process_input='\n'.join(commands) + '\n',
+                 run_as_root=True)
+
+    if CONF.send_arp_for_ha and CONF.send_arp_for_ha_count > 0:
+        for floating_ip in floating_ips:
+            send_arp_for_ip(floating_ip, device, CONF.send_arp_for_ha_count)
+
+
 def unbind_floating_ip(floating_ip, device):
     """Unbind a public ip from public interface."""
     _execute('ip', 'addr', 'del', str(floating_ip) + '/32',
@@ -635,6 +658,18 @@ def ensure_floating_forward(floating_ip, fixed_ip, device):
     iptables_manager.apply()
 
 
+def ensure_floating_forwards(floating_ips, device):
+    """Ensure forwarding rules for a list of (floating_ip, fixed_ip) pairs.
+
+    The rules are applied with a single iptables call.
+    """
+    for floating_ip, fixed_ip in floating_ips:
+        for chain, rule in floating_forward_rules(floating_ip, fixed_ip,
+                                                  device):
+            iptables_manager.ipv4['nat'].add_rule(chain, rule)
+    iptables_manager.apply()
+
+
 def remove_floating_forward(floating_ip, fixed_ip, device):
     """Remove forwarding for floating ip."""
     for chain, rule in floating_forward_rules(floating_ip, fixed_ip, device):
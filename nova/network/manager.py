@@ -158,7 +158,11 @@ network_opts = [
                help='domain to use for building the hostnames'),
     cfg.StrOpt('l3_lib',
                default='nova.network.l3.LinuxNetL3',
-               help="Indicates underlying L3 management library")
+               help="Indicates underlying L3 management library"),
+    cfg.IntOpt('fixed_ip_bulk_create_chunk_size',
+               default=1000,
+               help='Number of fixed ips inserted per database round trip '
+                    'when creating a network'),
     ]
 
 CONF = cfg.CONF
@@ -172,6 +176,26 @@ CONF.import_opt('use_ipv6', 'nova.config')
 CONF.import_opt('my_ip', 'nova.config')
 
 
+def _regex_literal_prefix(regex):
+    """Return the leading part of regex that can only match itself.
+
+    Only characters that may appear in an ip address are considered, so the
+    result is safe to use as a database LIKE prefix for address columns.
+    """
+    if not regex or '|' in regex:
+        return ''
+    prefix = []
+    for char in regex:
+        if not (char.isalnum() or char == ':'):
+            # NOTE(pnavarro): a quantifier can make the previous character
+            #                 optional, so it is not part of the prefix.
+            if char in '*?{' and prefix:
+                prefix.pop()
+            break
+        prefix.append(char)
+    return ''.join(prefix)
+
+
 class RPCAllocateFixedIP(object):
     """Mixin class originally for FlatDCHP and VLAN network managers.
 
@@ -283,29 +307,34 @@ class FloatingIP(object):
 
         admin_context = context.get_admin_context()
         try:
-            floating_ips = self.db.floating_ip_get_all_by_host(admin_context,
-                                                               self.host)
+            floating_ips = self.db.floating_ip_get_all_with_fixed_by_host(
+                    admin_context, self.host)
         except exception.NotFound:
             return
 
+        # NOTE(pnavarro): group the addresses by interface so each one is
+        #                 configured with a single ip and iptables call
+        #                 instead of one of each per floating ip.
+        by_interface = {}
         for floating_ip in floating_ips:
-            fixed_ip_id = floating_ip.get('fixed_ip_id')
-            if fixed_ip_id:
-                try:
-                    fixed_ip_ref = self.db.fixed_ip_get(admin_context,
-                                                        fixed_ip_id)
-                except exception.FixedIpNotFound:
-                    msg = _('Fixed ip %(fixed_ip_id)s not found') % locals()
-                    LOG.debug(msg)
-                    continue
-                fixed_address = fixed_ip_ref['address']
-                interface = CONF.public_interface or floating_ip['interface']
-                try:
-                    self.l3driver.add_floating_ip(floating_ip['address'],
-                            fixed_address, interface)
-                except exception.ProcessExecutionError:
-                    LOG.debug(_('Interface %(interface)s not found'), locals())
-                    raise exception.NoFloatingIpInterface(interface=interface)
+            fixed_ip_id = floating_ip['fixed_ip_id']
+            if not fixed_ip_id:
+                continue
+            fixed_address = floating_ip['fixed_address']
+            if fixed_address is None:
+                msg = _('Fixed ip %(fixed_ip_id)s not found') % locals()
+                LOG.debug(msg)
+                continue
+            interface = CONF.public_interface or floating_ip['interface']
+            by_interface.setdefault(interface, []).append(
+                    (floating_ip['address'], fixed_address))
+
+        for interface, addresses in by_interface.iteritems():
+            try:
+                self.l3driver.add_floating_ips(addresses, interface)
+            except exception.ProcessExecutionError:
+                LOG.debug(_('Interface %(interface)s not found'), locals())
+                raise exception.NoFloatingIpInterface(interface=interface)
 
     @wrap_check_policy
     def allocate_for_instance(self, context, **kwargs):
@@ -1009,21 +1038,21 @@ class NetworkManager(manager.SchedulerDependentManager):
         ip_filter = re.compile(str(filters.get('ip')))
         ipv6_filter = re.compile(str(filters.get('ip6')))
 
-        # NOTE(jkoelker) Should probably figure out a better way to do
-        #                this. But for now it "works", this could suck on
-        #                large installs.
-
-        vifs = self.db.virtual_interface_get_all(context)
+        # NOTE(pnavarro): all vifs, networks, fixed and floating ips are
+        #                 loaded with one joined query.  When only an ipv4
+        #                 regex is given, its literal prefix is also used to
+        #                 narrow the query down in the database.
+        address_prefix = None
+        if 'ip6' not in filters and not fixed_ip_filter:
+            address_prefix = _regex_literal_prefix(filters.get('ip'))
+        vifs = self.db.virtual_interface_get_all_with_ips(context,
+                                                          address_prefix)
         results = []
 
         for vif in vifs:
-            if vif['instance_uuid'] is None:
-                continue
-
-            network = self._get_network_by_id(context, vif['network_id'])
             fixed_ipv6 = None
-            if network['cidr_v6'] is not None:
-                fixed_ipv6 = ipv6.to_global(network['cidr_v6'],
+            if vif['cidr_v6'] is not None:
+                fixed_ipv6 = ipv6.to_global(vif['cidr_v6'],
                                             vif['address'],
                                             context.project_id)
 
@@ -1031,12 +1060,7 @@ class NetworkManager(manager.SchedulerDependentManager):
                 results.append({'instance_uuid': vif['instance_uuid'],
                                 'ip': fixed_ipv6})
 
-            vif_id = vif['id']
-            fixed_ips = self.db.fixed_ips_by_virtual_interface(context,
-                                                               vif_id)
-            for fixed_ip in fixed_ips:
-                if not fixed_ip or not fixed_ip['address']:
-                    continue
+            for fixed_ip in vif['fixed_ips']:
                 if fixed_ip['address'] == fixed_ip_filter:
                     results.append({'instance_uuid': vif['instance_uuid'],
                                     'ip': fixed_ip['address']})
@@ -1045,13 +1069,10 @@ class NetworkManager(manager.SchedulerDependentManager):
                     results.append({'instance_uuid': vif['instance_uuid'],
                                     'ip': fixed_ip['address']})
                     continue
-                for floating_ip in fixed_ip.get('floating_ips', []):
-                    if not floating_ip or not floating_ip['address']:
-                        continue
+                for floating_ip in fixed_ip['floating_ips']:
                     if ip_filter.match(floating_ip['address']):
                         results.append({'instance_uuid': vif['instance_uuid'],
                                         'ip': floating_ip['address']})
-                        continue
 
         return results
 
@@ -1738,18 +1759,31 @@ class NetworkManager(manager.SchedulerDependentManager):
         if not fixed_cidr:
             fixed_cidr = netaddr.IPNetwork(network['cidr'])
         num_ips = len(fixed_cidr)
-        ips = []
-        for index in range(num_ips):
-            address = str(fixed_cidr[index])
-            if index < bottom_reserved or num_ips - index <= top_reserved:
-                reserved = True
-            else:
-                reserved = False
 
-            ips.append({'network_id': network_id,
-                        'address': address,
-                        'reserved': reserved})
-        self.db.fixed_ip_bulk_create(context, ips)
+        def _fixed_ips():
+            for index, address in enumerate(fixed_cidr):
+                if index < bottom_reserved or num_ips - index <= top_reserved:
+                    reserved = True
+                else:
+                    reserved = False
+                yield {'network_id': network_id,
+                       'address': str(address),
+                       'reserved': reserved}
+
+        # NOTE(pnavarro): large cidrs hold millions of addresses, so insert
+        #                 them in bounded chunks instead of building one
+        #                 list for the whole range.
+        chunk_size = max(CONF.fixed_ip_bulk_create_chunk_size, 1)
+
+        def _progress(created):
+            LOG.debug(_('Created %(created)d of %(num_ips)d fixed ips for '
+                        'network %(network_id)s'),
+                      {'created': created, 'num_ips': num_ips,
+                       'network_id': network_id})
+
+        self.db.fixed_ip_bulk_create(context, _fixed_ips(),
+                                     chunk_size=chunk_size,
+                                     progress=_progress)
 
     def _allocate_fixed_ips(self, context, instance_id, host, networks,
                             **kwargs):
@@ -28,6 +28,13 @@ def ensure_string_keys(d):
 
 class Model(dict):
     """Defines some necessary structures for most of the network models"""
+
+    # NOTE(pnavarro): the keys every model has once __init__ has run.  A
+    #                 serialized model that has exactly these keys was
+    #                 already normalized by __init__, so hydrating it can
+    #                 copy it in directly instead of calling __init__ again.
+    _fields = frozenset(['meta'])
+
     def __repr__(self):
         return self.__class__.__name__ + '(' + dict.__repr__(self) + ')'
 
@@ -41,9 +48,31 @@ class Model(dict):
         """calls get(key, default) on self['meta']"""
         return self['meta'].get(key, default)
 
+    @classmethod
+    def _is_normalized(cls, data):
+        return (data.viewkeys() == cls._fields and
+                isinstance(data['meta'], dict))
+
+    @classmethod
+    def _from_serialized(cls, data):
+        """Build a model from a serialized one, skipping __init__ if it
+        was already normalized.  The meta of data is copied, not shared."""
+        if not cls._is_normalized(data):
+            kwargs = ensure_string_keys(data)
+            if isinstance(kwargs.get('meta'), dict):
+                kwargs['meta'] = dict(kwargs['meta'])
+            return cls(**kwargs)
+        model = dict.__new__(cls)
+        dict.update(model, data)
+        model['meta'] = dict(data['meta'])
+        return model
+
 
 class IP(Model):
     """Represents an IP address in Nova"""
+
+    _fields = frozenset(['address', 'type', 'version', 'meta'])
+
     def __init__(self, address=None, type=None, **kwargs):
         super(IP, self).__init__()
 
@@ -70,15 +99,24 @@ class IP(Model):
         else:
             return False
 
+    @classmethod
+    def _is_normalized(cls, data):
+        return (super(IP, cls)._is_normalized(data) and
+                (data['version'] or not data['address']))
+
     @classmethod
     def hydrate(cls, ip):
         if ip:
-            return IP(**ensure_string_keys(ip))
+            return IP._from_serialized(ip)
         return None
 
 
 class FixedIP(IP):
     """Represents a Fixed IP address in Nova"""
+
+    _fields = frozenset(['address', 'type', 'version', 'floating_ips',
+                         'meta'])
+
     def __init__(self, floating_ips=None, **kwargs):
         super(FixedIP, self).__init__(**kwargs)
         self['floating_ips'] = floating_ips or []
@@ -93,9 +131,14 @@ class FixedIP(IP):
     def floating_ip_addresses(self):
         return [ip['address'] for ip in self['floating_ips']]
 
+    @classmethod
+    def _is_normalized(cls, data):
+        return (super(FixedIP, cls)._is_normalized(data) and
+                data['type'] and data['floating_ips'] is not None)
+
     @classmethod
     def hydrate(cls, fixed_ip):
-        fixed_ip = FixedIP(**ensure_string_keys(fixed_ip))
+        fixed_ip = FixedIP._from_serialized(fixed_ip)
         fixed_ip['floating_ips'] = [IP.hydrate(floating_ip)
                                    for floating_ip in fixed_ip['floating_ips']]
         return fixed_ip
@@ -103,6 +146,9 @@ class FixedIP(IP):
 
 class Route(Model):
     """Represents an IP Route in Nova"""
+
+    _fields = frozenset(['cidr', 'gateway', 'interface', 'meta'])
+
     def __init__(self, cidr=None, gateway=None, interface=None, **kwargs):
         super(Route, self).__init__()
 
@@ -114,13 +160,17 @@ class Route(Model):
 
     @classmethod
     def hydrate(cls, route):
-        route = Route(**ensure_string_keys(route))
+        route = Route._from_serialized(route)
         route['gateway'] = IP.hydrate(route['gateway'])
         return route
 
 
 class Subnet(Model):
     """Represents a Subnet in Nova"""
+
+    _fields = frozenset(['cidr', 'dns', 'gateway', 'ips', 'routes',
+                         'version', 'meta'])
+
     def __init__(self, cidr=None, dns=None, gateway=None, ips=None,
                  routes=None, **kwargs):
         super(Subnet, self).__init__()
@@ -156,9 +206,16 @@ class Subnet(Model):
         """Convience function to get cidr as a netaddr object"""
         return netaddr.IPNetwork(self['cidr'])
 
+    @classmethod
+    def _is_normalized(cls, data):
+        return (super(Subnet, cls)._is_normalized(data) and
+                (data['version'] or not data['cidr']) and
+                data['dns'] is not None and data['ips'] is not None and
+                data['routes'] is not None)
+
     @classmethod
     def hydrate(cls, subnet):
-        subnet = Subnet(**ensure_string_keys(subnet))
+        subnet = Subnet._from_serialized(subnet)
         subnet['dns'] = [IP.hydrate(dns) for dns in subnet['dns']]
         subnet['ips'] = [FixedIP.hydrate(ip) for ip in subnet['ips']]
         subnet['routes'] = [Route.hydrate(route) for route in subnet['routes']]
@@ -168,6 +225,9 @@ class Subnet(Model):
 
 class Network(Model):
     """Represents a Network in Nova"""
+
+    _fields = frozenset(['id', 'bridge', 'label', 'subnets', 'meta'])
+
     def __init__(self, id=None, bridge=None, label=None,
                  subnets=None, **kwargs):
         super(Network, self).__init__()
@@ -183,10 +243,15 @@ class Network(Model):
         if subnet not in self['subnets']:
             self['subnets'].append(subnet)
 
+    @classmethod
+    def _is_normalized(cls, data):
+        return (super(Network, cls)._is_normalized(data) and
+                data['subnets'] is not None)
+
     @classmethod
     def hydrate(cls, network):
         if network:
-            network = Network(**ensure_string_keys(network))
+            network = Network._from_serialized(network)
             network['subnets'] = [Subnet.hydrate(subnet)
                                   for subnet in network['subnets']]
         return network
@@ -194,6 +259,9 @@ class Network(Model):
 
 class VIF(Model):
     """Represents a Virtual Interface in Nova"""
+
+    _fields = frozenset(['id', 'address', 'network', 'meta'])
+
     def __init__(self, id=None, address=None, network=None, **kwargs):
         super(VIF, self).__init__()
 
@@ -250,7 +318,7 @@ class VIF(Model):
 
     @classmethod
     def hydrate(cls, vif):
-        vif = VIF(**ensure_string_keys(vif))
+        vif = VIF._from_serialized(vif)
         vif['network'] = Network.hydrate(vif['network'])
         return vif
 
@@ -275,7 +343,7 @@ class NetworkInfo(list):
         return NetworkInfo([VIF.hydrate(vif) for vif in network_info])
 
     def json(self):
-        return jsonutils.dumps(self)
+        return jsonutils.dumps(self, separators=(',', ':'))
 
     def legacy(self):
         """
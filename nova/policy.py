@@ -17,7 +17,9 @@
 
 """Policy Engine For Nova"""
 
+import datetime
 import os.path
+import time
 
 from nova import exception
 from nova.openstack.common import cfg
@@ -32,6 +34,10 @@ policy_opts = [
     cfg.StrOpt('policy_default_rule',
                default='default',
                help=_('Rule checked when requested rule is not found')),
+    cfg.IntOpt('policy_file_check_interval',
+               default=5,
+               help=_('Seconds between checks of the policy file for '
+                      'changes')),
     ]
 
 CONF = cfg.CONF
@@ -39,25 +45,39 @@ CONF.register_opts(policy_opts)
 
 _POLICY_PATH = None
 _POLICY_CACHE = {}
+_POLICY_CHECKED = 0
+
+# Most decisions a single context remembers
+_MAX_CONTEXT_DECISIONS = 256
+_FROZEN_TYPES = (basestring, int, long, float, bool, type(None),
+                 datetime.datetime)
 
 
 def reset():
     global _POLICY_PATH
     global _POLICY_CACHE
+    global _POLICY_CHECKED
     _POLICY_PATH = None
     _POLICY_CACHE = {}
+    _POLICY_CHECKED = 0
     policy.reset()
 
 
 def init():
     global _POLICY_PATH
     global _POLICY_CACHE
+    global _POLICY_CHECKED
     if not _POLICY_PATH:
         _POLICY_PATH = CONF.policy_file
         if not os.path.exists(_POLICY_PATH):
             _POLICY_PATH = CONF.find_file(_POLICY_PATH)
         if not _POLICY_PATH:
             raise exception.ConfigNotFound(path=CONF.policy_file)
+    now = time.time()
+    if (_POLICY_CACHE and
+        now - _POLICY_CHECKED < CONF.policy_file_check_interval):
+        return
+    _POLICY_CHECKED = now
     utils.read_cached_file(_POLICY_PATH, _POLICY_CACHE,
                            reload_func=_set_rules)
 
@@ -67,6 +87,33 @@ def _set_rules(data):
     policy.set_rules(policy.Rules.load_json(data, default_rule))
 
 
+def _freeze(value):
+    """Return a hashable copy of a target or credentials value.
+
+    Raises TypeError for values that cannot be compared by value.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.iteritems()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if not isinstance(value, _FROZEN_TYPES):
+        raise TypeError(value)
+    return value
+
+
+def _context_decisions(context):
+    """Return the decisions remembered by a context for the current rules."""
+    rules = policy._rules
+    cached = getattr(context, '_policy_decisions', None)
+    if cached is None or cached[0] is not rules:
+        cached = (rules, {})
+        context._policy_decisions = cached
+    decisions = cached[1]
+    if len(decisions) >= _MAX_CONTEXT_DECISIONS:
+        decisions.clear()
+    return decisions
+
+
 def enforce(context, action, target, do_raise=True):
     """Verifies that the action is valid on the target in this context.
 
@@ -93,12 +140,27 @@ def enforce(context, action, target, do_raise=True):
 
     credentials = context.to_dict()
 
-    # Add the exception arguments if asked to do a raise
-    extra = {}
-    if do_raise:
-        extra.update(exc=exception.PolicyNotAuthorized, action=action)
-
-    return policy.check(action, target, credentials, **extra)
+    # NOTE(pnavarro): a request usually checks the same action against
+    #                 the same target several times, so decisions are
+    #                 remembered on the context for as long as the rules
+    #                 do not change.
+    try:
+        key = (action, _freeze(target), _freeze(credentials))
+    except TypeError:
+        key = None
+
+    decisions = _context_decisions(context)
+    if key is not None and key in decisions:
+        result = decisions[key]
+    else:
+        result = policy.check(action, target, credentials)
+        if key is not None:
+            decisions[key] = result
+
+    if do_raise and not result:
+        raise exception.PolicyNotAuthorized(action=action)
+
+    return result
 
 
 def check_is_admin(roles):
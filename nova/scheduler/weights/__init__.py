@@ -39,8 +39,12 @@ class WeighedHost(weights.WeighedObject):
 
 
 class BaseHostWeigher(weights.BaseWeigher):
-    """Base class for host weights."""
-    pass
+    """Base class for host weights.
+
+    Weighers with opt_in set are only used when they are listed in
+    scheduler_weight_classes, never through all_weighers().
+    """
+    opt_in = False
 
 
 class HostWeightHandler(weights.BaseWeightHandler):
@@ -58,4 +62,5 @@ def all_weighers():
         LOG.deprecated(_('least_cost has been deprecated in favor of '
                 'the RAM Weigher.'))
         return least_cost.get_least_cost_weighers()
-    return HostWeightHandler().get_all_classes()
+    return [cls for cls in HostWeightHandler().get_all_classes()
+            if not cls.opt_in]
@@ -0,0 +1,83 @@
+# Copyright (c) 2012 OpenStack, LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+Image Cache Weigher.  Weigh hosts by whether they have the image cached.
+
+Hosts whose compute driver reports the requested image in the
+'cached_images' capability can boot without downloading it first, so they
+are preferred.  The bonus is expressed in the same units as the RAM
+weigher, MB of free RAM, and can be tuned or disabled with the
+'image_cache_weight_multiplier' option.
+
+This weigher is not part of all_weighers(); enable it by adding
+nova.scheduler.weights.image_cache.ImageCacheWeigher to
+scheduler_weight_classes.
+"""
+
+import hashlib
+
+from nova.openstack.common import cfg
+from nova.scheduler import weights
+
+
+image_cache_weight_opts = [
+        cfg.FloatOpt('image_cache_weight_multiplier',
+                     default=1024.0,
+                     help='Weight added to hosts which already have the '
+                          'requested image cached.  Set to 0 to disable.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(image_cache_weight_opts)
+
+
+def _image_fingerprint(weight_properties):
+    request_spec = weight_properties.get('request_spec') or {}
+    instance_properties = request_spec.get('instance_properties') or {}
+    image_ref = instance_properties.get('image_ref')
+    if not image_ref:
+        return None
+    return hashlib.sha1(str(image_ref)).hexdigest()
+
+
+class ImageCacheWeigher(weights.BaseHostWeigher):
+    opt_in = True
+
+    def _weight_multiplier(self):
+        """Override the weight multiplier."""
+        return CONF.image_cache_weight_multiplier
+
+    def weigh_objects(self, weighed_obj_list, weight_properties):
+        """Compute the image fingerprint once for all the hosts."""
+        multiplier = self._weight_multiplier()
+        if not multiplier:
+            return
+        fingerprint = _image_fingerprint(weight_properties)
+        if fingerprint is None:
+            return
+        for obj in weighed_obj_list:
+            obj.weight += multiplier * self._weigh_cached(obj.obj,
+                                                          fingerprint)
+
+    def _weigh_cached(self, host_state, fingerprint):
+        cached_images = host_state.capabilities.get('cached_images') or []
+        return 1.0 if fingerprint in cached_images else 0.0
+
+    def _weigh_object(self, host_state, weight_properties):
+        """Higher weights win.  Hosts with the image cached win."""
+        fingerprint = _image_fingerprint(weight_properties)
+        if fingerprint is None:
+            return 0.0
+        return self._weigh_cached(host_state, fingerprint)
@@ -357,6 +357,38 @@ class AggregateTestCase(test.TestCase):
         self.assertRaises(exc.HTTPBadRequest, self.controller.action,
                           self.req, "bad_aggregate", body=body)
 
+    def test_prefetch_images(self):
+        body = {"prefetch_images": {"images": ["img1", "img2"]}}
+
+        def stub_prefetch_images(context, aggregate, image_ids):
+            self.assertEqual(context, self.context, "context")
+            self.assertEqual("1", aggregate, "aggregate")
+            self.assertEqual(["img1", "img2"], image_ids, "image_ids")
+            return AGGREGATE
+        self.stubs.Set(self.controller.api, "prefetch_images",
+                       stub_prefetch_images)
+
+        result = self.controller.action(self.req, "1", body=body)
+
+        self.assertEqual(AGGREGATE, result["aggregate"])
+
+    def test_prefetch_images_with_bad_aggregate(self):
+        body = {"prefetch_images": {"images": ["img1"]}}
+
+        def stub_prefetch_images(context, aggregate, image_ids):
+            raise exception.AggregateNotFound()
+        self.stubs.Set(self.controller.api, "prefetch_images",
+                       stub_prefetch_images)
+
+        self.assertRaises(exc.HTTPNotFound, self.controller.action,
+                self.req, "bad_aggregate", body=body)
+
+    def test_prefetch_images_with_bad_images(self):
+        for images in ({}, {"images": "img1"}):
+            body = {"prefetch_images": images}
+            self.assertRaises(exc.HTTPBadRequest, self.controller.action,
+                              self.req, "1", body=body)
+
     def test_delete_aggregate(self):
         def stub_delete_aggregate(context, aggregate):
             self.assertEqual(context, self.context, "context")
@@ -40,8 +40,9 @@ def fake_compute_get_all(*args, **kwargs):
     ]
 
 
-def fake_cn_get(context, host):
-    return {"hypervisor_hostname": host}
+def fake_cn_get_by_hosts(context, hosts):
+    return [{"hypervisor_hostname": host, "service": {"host": host}}
+            for host in hosts]
 
 
 class ExtendedServerAttributesTest(test.TestCase):
@@ -53,7 +54,7 @@ class ExtendedServerAttributesTest(test.TestCase):
         fakes.stub_out_nw_api(self.stubs)
         self.stubs.Set(compute.api.API, 'get', fake_compute_get)
         self.stubs.Set(compute.api.API, 'get_all', fake_compute_get_all)
-        self.stubs.Set(db, 'compute_node_get_by_host', fake_cn_get)
+        self.stubs.Set(db, 'compute_node_get_by_hosts', fake_cn_get_by_hosts)
         self.flags(
             osapi_compute_extension=[
                 'nova.api.openstack.compute.contrib.select_extensions'],
@@ -97,6 +98,35 @@ class ExtendedServerAttributesTest(test.TestCase):
                                     host='host-%s' % (i + 1),
                                     instance_name='instance-%s' % (i + 1))
 
+    def test_detail_looks_up_hosts_once(self):
+        lookups = []
+
+        def fake_get_by_hosts(context, hosts):
+            lookups.append(sorted(hosts))
+            return fake_cn_get_by_hosts(context, hosts)
+
+        def fake_get_by_host(context, host):
+            self.fail('compute nodes must not be looked up per server')
+
+        self.stubs.Set(db, 'compute_node_get_by_hosts', fake_get_by_hosts)
+        self.stubs.Set(db, 'compute_node_get_by_host', fake_get_by_host)
+        url = '/v2/fake/servers/detail'
+        res = self._make_request(url)
+
+        self.assertEqual(res.status_int, 200)
+        self.assertEqual(lookups, [['host-1', 'host-2']])
+
+    def test_unauthorized_does_not_look_up_hosts(self):
+        def fake_get_by_hosts(context, hosts):
+            self.fail('compute nodes must not be looked up if unauthorized')
+
+        self.stubs.Set(extended_server_attributes, 'authorize',
+                       lambda context: False)
+        self.stubs.Set(db, 'compute_node_get_by_hosts', fake_get_by_hosts)
+        for url in ['/v2/fake/servers/detail', '/v2/fake/servers/%s' % UUID3]:
+            res = self._make_request(url)
+            self.assertEqual(res.status_int, 200)
+
     def test_no_instance_passthrough_404(self):
 
         def fake_compute_get(*args, **kwargs):
@@ -95,6 +95,13 @@ def fake_get_all_types(context, inactive=0, filters=None):
     return res
 
 
+def fake_get_all_types_sorted_list(context, inactive=0, filters=None,
+                                   sort_key='flavorid', sort_dir='asc',
+                                   limit=None, marker=None):
+    flavors = fake_get_all_types(context, inactive, filters).values()
+    return sorted(flavors, key=lambda item: item[sort_key])
+
+
 class FakeRequest(object):
     environ = {"nova.context": context.get_admin_context()}
 
@@ -110,6 +117,8 @@ class FlavorAccessTest(test.TestCase):
         self.stubs.Set(instance_types, 'get_instance_type_by_flavor_id',
                        fake_get_instance_type_by_flavor_id)
         self.stubs.Set(instance_types, 'get_all_types', fake_get_all_types)
+        self.stubs.Set(instance_types, 'get_all_types_sorted_list',
+                       fake_get_all_types_sorted_list)
         self.stubs.Set(instance_types, 'get_instance_type_access_by_flavor_id',
                        fake_get_instance_type_access_by_flavor_id)
 
@@ -44,7 +44,7 @@ def fake_instance_type_get_by_flavor_id(flavorid):
 
 
 def fake_instance_type_get_all(*args, **kwargs):
-    return FAKE_FLAVORS
+    return sorted(FAKE_FLAVORS.values(), key=lambda item: item['flavorid'])
 
 
 class FlavorDisabledTest(test.TestCase):
@@ -57,7 +57,7 @@ class FlavorDisabledTest(test.TestCase):
               '.flavor_disabled.Flavor_disabled')
         self.flags(osapi_compute_extension=[ext])
         fakes.stub_out_nw_api(self.stubs)
-        self.stubs.Set(instance_types, "get_all_types",
+        self.stubs.Set(instance_types, "get_all_types_sorted_list",
                        fake_instance_type_get_all)
         self.stubs.Set(instance_types,
                        "get_instance_type_by_flavor_id",
@@ -43,7 +43,7 @@ def fake_instance_type_get_by_flavor_id(flavorid):
 
 
 def fake_instance_type_get_all(*args, **kwargs):
-    return FAKE_FLAVORS
+    return sorted(FAKE_FLAVORS.values(), key=lambda item: item['flavorid'])
 
 
 class FlavorSwapTest(test.TestCase):
@@ -56,7 +56,7 @@ class FlavorSwapTest(test.TestCase):
               '.flavor_swap.Flavor_swap')
         self.flags(osapi_compute_extension=[ext])
         fakes.stub_out_nw_api(self.stubs)
-        self.stubs.Set(instance_types, "get_all_types",
+        self.stubs.Set(instance_types, "get_all_types_sorted_list",
                        fake_instance_type_get_all)
         self.stubs.Set(instance_types,
                        "get_instance_type_by_flavor_id",
@@ -41,11 +41,11 @@ def fake_get_instance_type_by_flavor_id(flavorid):
     }
 
 
-def fake_get_all_types(inactive=0, filters=None):
-    return {
-        'fake1': fake_get_instance_type_by_flavor_id(1),
-        'fake2': fake_get_instance_type_by_flavor_id(2)
-    }
+def fake_get_all_types_sorted_list(*args, **kwargs):
+    return [
+        fake_get_instance_type_by_flavor_id(1),
+        fake_get_instance_type_by_flavor_id(2)
+    ]
 
 
 class FlavorextradataTest(test.TestCase):
@@ -56,7 +56,8 @@ class FlavorextradataTest(test.TestCase):
         self.flags(osapi_compute_extension=[ext])
         self.stubs.Set(instance_types, 'get_instance_type_by_flavor_id',
                                         fake_get_instance_type_by_flavor_id)
-        self.stubs.Set(instance_types, 'get_all_types', fake_get_all_types)
+        self.stubs.Set(instance_types, 'get_all_types_sorted_list',
+                       fake_get_all_types_sorted_list)
 
     def _verify_flavor_response(self, flavor, expected):
         for key in expected:
@@ -199,6 +199,28 @@ class HostTestCase(test.TestCase):
         self.assertRaises(webob.exc.HTTPNotFound, self.controller.update,
                 self.req, "bogus_host_name", body={"status": "disable"})
 
+    def test_prefetch_images(self):
+        self.mox.StubOutWithMock(self.controller.api, 'prefetch_images')
+        self.controller.api.prefetch_images(self.req.environ['nova.context'],
+                host='host_c1', image_ids=['img1', 'img2'])
+        self.mox.ReplayAll()
+
+        result = self.controller.prefetch_images(self.req, 'host_c1',
+                body={'images': ['img1', 'img2']})
+        self.assertEqual(result, {'host': 'host_c1',
+                                  'images': ['img1', 'img2']})
+
+    def test_prefetch_images_bad_body(self):
+        for body in ({}, {'images': 'img1'}, None):
+            self.assertRaises(webob.exc.HTTPBadRequest,
+                    self.controller.prefetch_images, self.req, 'host_c1',
+                    body=body)
+
+    def test_prefetch_images_bad_host(self):
+        self.assertRaises(webob.exc.HTTPNotFound,
+                self.controller.prefetch_images, self.req, 'bogus_host_name',
+                body={'images': ['img1']})
+
     def test_show_forbidden(self):
         self.req.environ["nova.context"].is_admin = False
         dest = 'dummydest'
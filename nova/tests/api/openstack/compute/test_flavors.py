@@ -72,10 +72,37 @@ def fake_instance_type_get_all(inactive=False, filters=None):
     return output
 
 
+def fake_instance_type_get_all_sorted_list(context=None, inactive=False,
+                                           filters=None, sort_key='flavorid',
+                                           sort_dir='asc', limit=None,
+                                           marker=None):
+    flavors = fake_instance_type_get_all(inactive, filters).values()
+    flavors = sorted(flavors, key=lambda item: item[sort_key],
+                     reverse=(sort_dir == 'desc'))
+
+    start = 0
+    if marker is not None:
+        flavorids = [flavor['flavorid'] for flavor in flavors]
+        if marker not in flavorids:
+            raise exception.MarkerNotFound(marker=marker)
+        start = flavorids.index(marker) + 1
+
+    if limit is None:
+        return flavors[start:]
+    return flavors[start:start + limit]
+
+
 def empty_instance_type_get_all(inactive=False, filters=None):
     return {}
 
 
+def empty_instance_type_get_all_sorted_list(context=None, inactive=False,
+                                            filters=None, sort_key='flavorid',
+                                            sort_dir='asc', limit=None,
+                                            marker=None):
+    return []
+
+
 def return_instance_type_not_found(flavor_id):
     raise exception.InstanceTypeNotFound(flavor_id=flavor_id)
 
@@ -88,6 +115,9 @@ class FlavorsTest(test.TestCase):
         fakes.stub_out_rate_limiting(self.stubs)
         self.stubs.Set(nova.compute.instance_types, "get_all_types",
                        fake_instance_type_get_all)
+        self.stubs.Set(nova.compute.instance_types,
+                       "get_all_types_sorted_list",
+                       fake_instance_type_get_all_sorted_list)
         self.stubs.Set(nova.compute.instance_types,
                        "get_instance_type_by_flavor_id",
                        fake_instance_type_get_by_flavor_id)
@@ -217,6 +247,11 @@ class FlavorsTest(test.TestCase):
         }
         self.assertThat(flavor, matchers.DictMatches(expected))
 
+    def test_get_flavor_list_with_bad_marker(self):
+        req = fakes.HTTPRequest.blank('/v2/fake/flavors?limit=1&marker=99')
+        self.assertRaises(webob.exc.HTTPBadRequest,
+                          self.controller.index, req)
+
     def test_get_flavor_detail_with_limit(self):
         req = fakes.HTTPRequest.blank('/v2/fake/flavors/detail?limit=1')
         response = self.controller.index(req)
@@ -341,8 +376,9 @@ class FlavorsTest(test.TestCase):
         self.assertEqual(flavor, expected)
 
     def test_get_empty_flavor_list(self):
-        self.stubs.Set(nova.compute.instance_types, "get_all_types",
-                       empty_instance_type_get_all)
+        self.stubs.Set(nova.compute.instance_types,
+                       "get_all_types_sorted_list",
+                       empty_instance_type_get_all_sorted_list)
 
         req = fakes.HTTPRequest.blank('/v2/fake/flavors')
         flavors = self.controller.index(req)
@@ -740,6 +776,17 @@ class DisabledFlavorsWithRealDBTest(test.TestCase):
         self.assert_(disabled_flavorid in db_flavorids)
         self.assertEqual(db_flavorids, api_flavorids)
 
+    def test_index_with_limit_and_marker(self):
+        self.context.is_admin = True
+
+        flavorids = sorted(i['flavorid'] for i in self.inst_types)
+        req = fakes.HTTPRequest.blank('/v2/fake/flavors?limit=2&marker=%s'
+                                      % flavorids[0])
+        req.environ['nova.context'] = self.context
+
+        flavor_list = self.controller.index(req)['flavors']
+        self.assertEqual([f['id'] for f in flavor_list], flavorids[1:3])
+
     def test_show_should_include_disabled_flavor_for_user(self):
         """
         Counterintuitively we should show disabled flavors to all users and not
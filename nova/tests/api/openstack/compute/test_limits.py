@@ -27,6 +27,7 @@ import webob
 from nova.api.openstack.compute import limits
 from nova.api.openstack.compute import views
 from nova.api.openstack import xmlutil
+from nova.common import memorycache
 import nova.context
 from nova.openstack.common import jsonutils
 from nova import test
@@ -617,6 +618,103 @@ class LimiterTest(BaseLimitTestSuite):
         self.assertEqual(expected, results)
 
 
+class LimiterEvictionTest(BaseLimitTestSuite):
+    """
+    Tests for forgetting idle users in `limits.Limiter`.
+    """
+
+    def test_idle_users_evicted(self):
+        """
+        Users whose buckets have drained are forgotten, configured ones
+        are kept.
+        """
+        limiter = limits.Limiter(TEST_LIMITS, **{'user:user3': ''})
+        limiter.check_for_delay("PUT", "/anything", "user1")
+        limiter.check_for_delay("PUT", "/anything", "user2")
+
+        self.time += 6.0
+        limiter.check_for_delay("PUT", "/anything", "user2")
+        limiter._evict_idle_users()
+
+        self.assertEqual(sorted(limiter.levels.keys()), ['user2', 'user3'])
+
+
+class MemcachedLimiterTest(LimiterTest):
+    """
+    Runs the `limits.Limiter` tests against `limits.MemcachedLimiter`.
+    """
+
+    def setUp(self):
+        """Run before each test."""
+        super(MemcachedLimiterTest, self).setUp()
+        userlimits = {'user:user3': ''}
+        self.limiter = limits.MemcachedLimiter(TEST_LIMITS, **userlimits)
+
+    def test_workers_share_limits(self):
+        """
+        Limiters of different workers using the same cache share buckets.
+        """
+        other = limits.MemcachedLimiter(TEST_LIMITS)
+        other._cache = self.limiter._cache
+
+        expected = [None] * 5
+        results = list(self._check(5, "PUT", "/anything", "user1"))
+        self.assertEqual(expected, results)
+
+        for x in xrange(5):
+            delay = other.check_for_delay("PUT", "/anything", "user1")
+            self.assertEqual(delay, (None, None))
+        delay = other.check_for_delay("PUT", "/anything", "user1")[0]
+        self.assertEqual(delay, 6.0)
+
+    def test_concurrent_workers_do_not_overwrite_buckets(self):
+        """
+        A bucket updated by another worker meanwhile is checked again.
+        """
+        other = limits.MemcachedLimiter(TEST_LIMITS)
+        other._cache = self.limiter._cache
+        real_load_limits = self.limiter._load_limits
+        interleaved = []
+
+        def load_limits(username, states):
+            if not interleaved:
+                interleaved.append(username)
+                other.check_for_delay("PUT", "/anything", username)
+            return real_load_limits(username, states)
+
+        self.stubs.Set(self.limiter, '_load_limits', load_limits)
+        for x in xrange(2):
+            interleaved[:] = []
+            self.limiter.check_for_delay("PUT", "/anything", "user1")
+
+        remaining = [limit['remaining'] for limit in
+                     self.limiter.get_limits("user1")
+                     if limit['verb'] == 'PUT' and limit['URI'] == '*']
+        self.assertEqual(remaining, [6])
+
+    def test_check_for_delay_gives_up_after_retries(self):
+        """
+        A bucket that keeps changing is not waited on forever.
+        """
+        self.limiter.check_for_delay("PUT", "/anything", "user1")
+        warnings = []
+        self.stubs.Set(memorycache.Client, 'cas',
+                       lambda *args, **kwargs: False)
+        self.stubs.Set(limits.LOG, 'warn',
+                       lambda msg, *args: warnings.append(msg))
+
+        delay = self.limiter.check_for_delay("PUT", "/anything", "user1")
+        self.assertEqual(delay, (None, None))
+        self.assertEqual(len(warnings), 1)
+
+    def test_get_limits_reflects_shared_state(self):
+        self._check_sum(3, "PUT", "/anything", "user1")
+        remaining = [limit['remaining'] for limit in
+                     self.limiter.get_limits("user1")
+                     if limit['verb'] == 'PUT' and limit['URI'] == '*']
+        self.assertEqual(remaining, [7])
+
+
 class WsgiLimiterTest(BaseLimitTestSuite):
     """
     Tests for `limits.WsgiLimiter` class.
@@ -694,6 +694,48 @@ class ServersControllerTest(test.TestCase):
         self.assertEqual(len(servers), 1)
         self.assertEqual(servers[0]['id'], server_uuid)
 
+    def test_get_servers_prefetch(self):
+        server_uuid = str(uuid.uuid4())
+
+        def fake_get_all(compute_self, context, search_opts=None,
+                         sort_key=None, sort_dir='desc',
+                         limit=None, marker=None):
+            return [fakes.stub_instance(100, uuid=server_uuid,
+                                        host='host-1'),
+                    fakes.stub_instance(101, host=None)]
+
+        lookups = []
+
+        def fake_compute_node_get_by_hosts(context, hosts):
+            lookups.append(hosts)
+            return [{'hypervisor_hostname': 'hyper-1',
+                     'service': {'host': 'host-1'}}]
+
+        self.stubs.Set(compute_api.API, 'get_all', fake_get_all)
+        self.stubs.Set(db, 'compute_node_get_by_hosts',
+                       fake_compute_node_get_by_hosts)
+
+        req = fakes.HTTPRequest.blank('/v2/fake/servers/detail')
+        req.add_prefetch(['compute_nodes', 'unknown'])
+        self.controller.detail(req)
+
+        self.assertEqual(lookups, [])
+        compute_node = req.get_db_compute_node('host-1')
+        self.assertEqual(compute_node['hypervisor_hostname'], 'hyper-1')
+        self.assertEqual(req.get_db_compute_node('host-2'), None)
+        self.assertEqual(lookups, [['host-1']])
+
+    def test_get_servers_without_prefetch(self):
+        def fake_compute_node_get_by_hosts(context, hosts):
+            self.fail('nothing was requested to be prefetched')
+
+        self.stubs.Set(db, 'compute_node_get_by_hosts',
+                       fake_compute_node_get_by_hosts)
+
+        req = fakes.HTTPRequest.blank('/v2/fake/servers/detail')
+        servers = self.controller.detail(req)['servers']
+        self.assertEqual(len(servers), 5)
+
     def test_get_servers_allows_image(self):
         server_uuid = str(uuid.uuid4())
 
@@ -96,6 +96,20 @@ class RequestTest(test.TestCase):
                  'uuid1': instances[1],
                  'uuid2': instances[2]})
 
+    def test_deferred_db_items(self):
+        request = wsgi.Request.blank('/foo')
+        loads = []
+
+        def load():
+            loads.append(1)
+            request.cache_db_items('things', [{'id': 'a'}])
+
+        request.defer_db_items('things', load)
+        self.assertEqual(loads, [])
+        self.assertEqual(request.get_db_item('things', 'a'), {'id': 'a'})
+        self.assertEqual(request.get_db_item('things', 'b'), None)
+        self.assertEqual(loads, [1])
+
 
 class ActionDispatcherTest(test.TestCase):
     def test_dispatch(self):
@@ -510,6 +524,30 @@ class ResourceTest(test.TestCase):
         self.assertEqual(method, controller.index)
         self.assertEqual(extensions, [extended.index])
 
+    def test_process_stack_extensions_prefetch(self):
+        class Controller(object):
+            def index(self, req):
+                return {'prefetch': sorted(req.get_prefetch())}
+
+        class ControllerExtended(wsgi.Controller):
+            @wsgi.extends(prefetch=['foo', 'bar'])
+            def index(self, req, resp_obj):
+                return None
+
+        class ControllerExtended2(wsgi.Controller):
+            @wsgi.extends
+            def index(self, req, resp_obj):
+                return None
+
+        resource = wsgi.Resource(Controller())
+        resource.register_extensions(ControllerExtended())
+        resource.register_extensions(ControllerExtended2())
+
+        req = wsgi.Request.blank('/tests')
+        response = resource._process_stack(req, 'index', {}, None, '',
+                                           'application/json')
+        self.assertEqual(response.body, '{"prefetch": ["bar", "foo"]}')
+
     def test_get_method_action_extensions(self):
         class Controller(wsgi.Controller):
             def index(self, req, pants=None):
@@ -862,6 +900,30 @@ class ResponseObjectTest(test.TestCase):
             self.assertEqual(response.status_int, 202)
             self.assertEqual(response.body, mtype)
 
+    def test_attach_builds_template_for_media_type_only(self):
+        built = []
+        attached = []
+
+        class Template(object):
+            def __init__(self):
+                built.append(self)
+
+        class Serializer(object):
+            def attach(self, template):
+                attached.append(template)
+
+        robj = wsgi.ResponseObject({}, json=Serializer, xml=Serializer)
+
+        robj.preserialize('application/json')
+        robj.attach(xml=Template)
+        self.assertEqual(built, [])
+        self.assertEqual(attached, [])
+
+        robj.preserialize('application/xml')
+        robj.attach(xml=Template)
+        self.assertEqual(len(built), 1)
+        self.assertEqual(attached, built)
+
 
 class ValidBodyTest(test.TestCase):
 
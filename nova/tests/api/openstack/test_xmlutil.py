@@ -652,6 +652,82 @@ class TemplateTest(test.TestCase):
                          str(obj['test']['image']['id']))
         self.assertEqual(result[idx].text, obj['test']['image']['name'])
 
+    def _make_master(self):
+        root = xmlutil.TemplateElement('test', selector='test',
+                                       name='name')
+        value = xmlutil.SubTemplateElement(root, 'value', selector='values')
+        value.text = xmlutil.Selector()
+        root.append(xmlutil.make_flat_dict('attrs', ns='foo'))
+        master = xmlutil.MasterTemplate(root, 1, nsmap=dict(f='foo'))
+
+        root_slave = xmlutil.TemplateElement('test', selector='test',
+                                             name='alias')
+        image = xmlutil.SubTemplateElement(root_slave, 'image',
+                                           selector='image', id='id')
+        image.text = xmlutil.Selector('name')
+        slave = xmlutil.SlaveTemplate(root_slave, 1, nsmap=dict(b='bar'))
+        master.attach(slave)
+        return master, slave
+
+    def test_make_tree_matches__serialize(self):
+        obj = {
+            'test': {
+                'name': 'foobar',
+                'values': [1, 2, 3, 4],
+                'attrs': {'a': 1, 'b': 2},
+                'image': {'name': 'image_foobar', 'id': 42},
+                },
+            }
+        master, _slave = self._make_master()
+
+        expected = master._serialize(None, obj, master._siblings(),
+                                     master._nsmap())
+        result = master.make_tree(obj)
+
+        self.assertEqual(etree.tostring(result), etree.tostring(expected))
+        self.assertEqual(result.get('name'), 'foobar')
+        self.assertEqual(result.get('alias'), None)
+
+    def test_render_plan_shared_by_copies(self):
+        master, slave = self._make_master()
+        plan = master._plan(master._siblings())
+
+        tmpl = master.copy()
+        self.assertEqual(tmpl._plan(tmpl._siblings()), plan)
+
+        tmpl = xmlutil.MasterTemplate(master.root, 1)
+        self.assertNotEqual(tmpl._plan(tmpl._siblings()), plan)
+
+    def test_render_plan_recompiled_on_change(self):
+        master, slave = self._make_master()
+        obj = {'test': {'name': 'foobar', 'other': 'baz'}}
+        self.assertEqual(master.make_tree(obj).get('other'), None)
+
+        slave.root.set('other')
+        xmlutil.SubTemplateElement(slave.root['image'], 'extra')
+        result = master.make_tree(obj)
+        self.assertEqual(result.get('other'), 'baz')
+
+    def test_render_plan_custom_elements(self):
+        class AlwaysTemplateElement(xmlutil.TemplateElement):
+            def will_render(self, datum):
+                return True
+
+        class UpperTemplateElement(xmlutil.TemplateElement):
+            def apply(self, elem, obj):
+                elem.text = obj.upper()
+
+        root = xmlutil.TemplateElement('test', selector='test')
+        root.append(AlwaysTemplateElement('empty', selector='missing'))
+        root.append(UpperTemplateElement('upper', selector='name'))
+        tmpl = xmlutil.Template(root)
+
+        result = tmpl.make_tree({'test': {'name': 'foo'}})
+        self.assertEqual(result[0].tag, 'empty')
+        self.assertEqual(result[0].text, None)
+        self.assertEqual(result[1].tag, 'upper')
+        self.assertEqual(result[1].text, 'FOO')
+
 
 class MasterTemplateBuilder(xmlutil.TemplateBuilder):
     def construct(self):
@@ -2897,6 +2897,17 @@ class ComputeTestCase(BaseTestCase):
         self.assertTrue(called['get_all'])
         self.assertEqual(called['set_error_state'], 4)
 
+    def test_prefetch_images(self):
+        self.mox.StubOutWithMock(self.compute.driver, 'prefetch_images')
+        self.compute.driver.prefetch_images(self.context, ['img1', 'img2'])
+        self.mox.ReplayAll()
+
+        self.compute._last_host_check = 1000
+        self.compute.prefetch_images(self.context,
+                                     image_ids=['img1', 'img2'])
+        # The next periodic run reports the cached images to the schedulers
+        self.assertEqual(self.compute._last_host_check, 0)
+
 
 class ComputeAPITestCase(BaseTestCase):
 
@@ -5233,6 +5244,25 @@ class ComputeAPIAggrTestCase(BaseTestCase):
                                                        values[fake_zone][0])
         self.assertEqual(len(aggr['hosts']) - 1, len(expected['hosts']))
 
+    def test_prefetch_images(self):
+        """Ensure images are prefetched on every host of an aggregate."""
+        values = _create_service_entries(self.context)
+        fake_zone = values.keys()[0]
+        aggr = self.api.create_aggregate(self.context,
+                                         'fake_aggregate', fake_zone)
+        for host in values[fake_zone]:
+            aggr = self.api.add_host_to_aggregate(self.context,
+                                                  aggr['id'], host)
+
+        self.mox.StubOutWithMock(self.api.compute_rpcapi, 'prefetch_images')
+        for host in aggr['hosts']:
+            self.api.compute_rpcapi.prefetch_images(self.context,
+                    image_ids=['img1'], host=host)
+        self.mox.ReplayAll()
+
+        result = self.api.prefetch_images(self.context, aggr['id'], ['img1'])
+        self.assertEqual(result['hosts'], aggr['hosts'])
+
     def test_remove_host_from_aggregate_raise_not_found(self):
         """Ensure ComputeHostNotFound is raised when removing invalid host."""
         _create_service_entries(self.context, {'fake_zone': ['fake_host']})
@@ -5508,6 +5538,24 @@ class ComputeHostAPITestCase(BaseTestCase):
                  'args': {'host': 'fake_host', 'mode': 'fake_mode'},
                  'version': compute_rpcapi.ComputeAPI.BASE_RPC_API_VERSION})
 
+    def test_prefetch_images(self):
+        ctxt = context.RequestContext('fake', 'fake')
+        cast_info = {}
+
+        def fake_rpc_cast(context, topic, msg):
+            cast_info['context'] = context
+            cast_info['topic'] = topic
+            cast_info['msg'] = msg
+        self.stubs.Set(rpc, 'cast', fake_rpc_cast)
+
+        self.host_api.prefetch_images(ctxt, 'fake_host', ['img1'])
+        self.assertEqual(cast_info['context'], ctxt)
+        self.assertEqual(cast_info['topic'], 'compute.fake_host')
+        self.assertEqual(cast_info['msg'],
+                {'method': 'prefetch_images',
+                 'args': {'image_ids': ['img1']},
+                 'version': '2.20'})
+
 
 class KeypairAPITestCase(BaseTestCase):
     def setUp(self):
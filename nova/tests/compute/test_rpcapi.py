@@ -177,6 +177,10 @@ class ComputeRpcAPITestCase(test.TestCase):
     def test_get_backdoor_port(self):
         self._test_compute_api('get_backdoor_port', 'call', host='host')
 
+    def test_prefetch_images(self):
+        self._test_compute_api('prefetch_images', 'cast',
+                image_ids=['img1', 'img2'], host='host', version='2.20')
+
     def test_inject_file(self):
         self._test_compute_api('inject_file', 'cast',
                 instance=self.fake_instance, path='path', file_contents='fc')
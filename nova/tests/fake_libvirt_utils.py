@@ -48,6 +48,10 @@ def copy_image(src, dest):
     pass
 
 
+def clone_image(src, dest):
+    files[dest] = files[src]
+
+
 def resize2fs(path):
     pass
 
@@ -142,6 +142,31 @@ class FakeNetworkManager(network_manager.NetworkManager):
             return [ip for ip in self.fixed_ips
                     if ip['virtual_interface_id'] == vif_id]
 
+        def virtual_interface_get_all_with_ips(self, context,
+                                               address_prefix=None):
+            vifs = []
+            for vif in self.vifs:
+                fixed_ips = []
+                for fixed_ip in self.fixed_ips:
+                    if fixed_ip['virtual_interface_id'] != vif['id']:
+                        continue
+                    floating_ips = [dict(address=ip['address'])
+                                    for ip in self.floating_ips
+                                    if ip['fixed_ip_id'] == fixed_ip['id']]
+                    addresses = [fixed_ip['address']] + [
+                            ip['address'] for ip in floating_ips]
+                    if address_prefix and not any(
+                            a.startswith(address_prefix) for a in addresses):
+                        continue
+                    fixed_ips.append(dict(address=fixed_ip['address'],
+                                          floating_ips=floating_ips))
+                if address_prefix and not fixed_ips:
+                    continue
+                network = self.network_get(context, vif['network_id'])
+                vifs.append(dict(vif, cidr_v6=network['cidr_v6'],
+                                 fixed_ips=fixed_ips))
+            return vifs
+
     def __init__(self):
         self.db = self.FakeDB()
         self.deallocate_called = None
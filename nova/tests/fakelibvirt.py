@@ -305,6 +305,12 @@ class Domain(object):
     def UUIDString(self):
         return self._def['uuid']
 
+    def ID(self):
+        for (k, v) in self._connection._running_vms.iteritems():
+            if v == self:
+                return k
+        return -1
+
     def interfaceStats(self, device):
         return [10000242400, 1234, 0, 2, 213412343233, 34214234, 23, 3]
 
@@ -16,7 +16,9 @@
 #    under the License.
 
 
+import cStringIO
 import datetime
+import os
 import random
 import time
 
@@ -25,10 +27,13 @@ import glanceclient.exc
 from nova import context
 from nova import exception
 from nova.image import glance
+from nova.openstack.common.notifier import api as notifier_api
+from nova.openstack.common.notifier import test_notifier
 from nova import test
 from nova.tests.api.openstack import fakes
 from nova.tests.glance import stubs as glance_stubs
 from nova.tests import matchers
+from nova import utils
 
 
 class NullWriter(object):
@@ -465,6 +470,50 @@ class TestGlanceImageService(test.TestCase):
         self.flags(glance_num_retries=1)
         service.download(self.context, image_id, writer)
 
+    def _download_chunks(self, chunks, writer):
+        class MyGlanceStubClient(glance_stubs.StubGlanceClient):
+            def data(self, image_id):
+                return chunks
+
+        service = self._create_image_service(MyGlanceStubClient())
+        service.download(self.context, 1, writer)
+
+    def test_download_sparse(self):
+        zeros = '\0' * 4096
+        chunks = ['a' * 4096, zeros, 'b' * 10, zeros, zeros]
+        with utils.tempdir() as tmpdir:
+            path = os.path.join(tmpdir, 'image')
+            with open(path, 'wb') as f:
+                self._download_chunks(chunks, f)
+
+            with open(path) as f:
+                self.assertEqual(''.join(chunks), f.read())
+            # The zero chunks were skipped, leaving holes in the file
+            self.assertTrue(os.stat(path).st_blocks * 512 <
+                            len(''.join(chunks)))
+
+    def test_download_not_sparse_for_non_files(self):
+        zeros = '\0' * 4096
+        chunks = ['a', zeros, 'b']
+        writer = cStringIO.StringIO()
+        self._download_chunks(chunks, writer)
+        self.assertEqual(''.join(chunks), writer.getvalue())
+
+    def test_download_notifies_throughput(self):
+        self.flags(notification_driver=[test_notifier.__name__])
+        notifier_api._reset_drivers()
+        self.addCleanup(notifier_api._reset_drivers)
+        test_notifier.NOTIFICATIONS = []
+
+        self._download_chunks(['a' * 10, '\0' * 10], NullWriter())
+
+        self.assertEqual(1, len(test_notifier.NOTIFICATIONS))
+        notification = test_notifier.NOTIFICATIONS[0]
+        self.assertEqual('image.download', notification['event_type'])
+        self.assertEqual(1, notification['payload']['image_id'])
+        self.assertEqual(20, notification['payload']['bytes'])
+        self.assertEqual(0, notification['payload']['sparse_bytes'])
+
     def test_client_forbidden_converts_to_imagenotauthed(self):
         class MyGlanceStubClient(glance_stubs.StubGlanceClient):
             """A client that raises a Forbidden exception."""
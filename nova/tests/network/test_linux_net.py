@@ -509,6 +509,52 @@ class LinuxNetworkTestCase(test.TestCase):
         ]
         self._test_initialize_gateway(existing, expected)
 
+    def test_bind_floating_ips(self):
+        self.flags(fake_network=False, send_arp_for_ha=False)
+        executes = []
+
+        def fake_execute(*args, **kwargs):
+            executes.append((args, kwargs.get('process_input')))
+            if args[:3] == ('ip', 'addr', 'show'):
+                return ("2: eth0: <BROADCAST,MULTICAST,UP,LOWER_UP>\n"
+                        "    inet 10.0.0.1/24 scope global eth0\n"
+                        "    inet 172.16.0.1/32 scope global eth0\n"), ""
+            return "", ""
+        self.stubs.Set(utils, 'execute', fake_execute)
+        self.driver.bind_floating_ips(['172.16.0.1', '172.16.0.2',
+                                       '172.16.0.3'], 'eth0')
+        self.assertEqual(executes, [
+            (('ip', 'addr', 'show', 'dev', 'eth0'), None),
+            (('ip', '-batch', '-'),
+             'addr add 172.16.0.2/32 dev eth0\n'
+             'addr add 172.16.0.3/32 dev eth0\n'),
+        ])
+
+    def test_bind_floating_ips_all_bound(self):
+        self.flags(fake_network=False, send_arp_for_ha=False)
+        executes = []
+
+        def fake_execute(*args, **kwargs):
+            executes.append(args)
+            return "    inet 172.16.0.1/32 scope global eth0\n", ""
+        self.stubs.Set(utils, 'execute', fake_execute)
+        self.driver.bind_floating_ips(['172.16.0.1'], 'eth0')
+        self.assertEqual(executes, [('ip', 'addr', 'show', 'dev', 'eth0')])
+
+    def test_ensure_floating_forwards_applies_once(self):
+        floating_ips = [('172.16.0.1', '10.0.0.1'),
+                        ('172.16.0.2', '10.0.0.2')]
+        nat = self.driver.iptables_manager.ipv4['nat']
+        self.mox.StubOutWithMock(nat, 'add_rule')
+        self.mox.StubOutWithMock(self.driver.iptables_manager, 'apply')
+        for floating_ip, fixed_ip in floating_ips:
+            for chain, rule in self.driver.floating_forward_rules(
+                    floating_ip, fixed_ip, 'eth0'):
+                nat.add_rule(chain, rule)
+        self.driver.iptables_manager.apply()
+        self.mox.ReplayAll()
+        self.driver.ensure_floating_forwards(floating_ips, 'eth0')
+
     def test_apply_ran(self):
         manager = linux_net.IptablesManager()
         manager.iptables_apply_deferred = False
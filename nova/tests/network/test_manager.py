@@ -19,8 +19,11 @@ import mox
 import shutil
 import tempfile
 
+import netaddr
+
 from nova import context
 from nova import db
+from nova.db.sqlalchemy import api as sqlalchemy_api
 from nova.db.sqlalchemy import models
 from nova import exception
 from nova.network import linux_net
@@ -761,42 +764,64 @@ class VlanNetworkTestCase(test.TestCase):
 
         def get_all_by_host(_context, _host):
             return [{'interface': 'foo',
-                     'address': 'foo'},
+                     'address': 'foo',
+                     'fixed_ip_id': None,
+                     'fixed_address': None},
                     {'interface': 'fakeiface',
                      'address': 'fakefloat',
-                     'fixed_ip_id': 1},
+                     'fixed_ip_id': 1,
+                     'fixed_address': 'fakefixed'},
+                    {'interface': 'fakeiface',
+                     'address': 'fakefloat2',
+                     'fixed_ip_id': 3,
+                     'fixed_address': 'fakefixed2'},
                     {'interface': 'bar',
                      'address': 'bar',
-                     'fixed_ip_id': 2}]
-        self.stubs.Set(self.network.db, 'floating_ip_get_all_by_host',
+                     'fixed_ip_id': 2,
+                     'fixed_address': None}]
+        self.stubs.Set(self.network.db,
+                       'floating_ip_get_all_with_fixed_by_host',
                        get_all_by_host)
 
-        def fixed_ip_get(_context, fixed_ip_id):
-            if fixed_ip_id == 1:
-                return {'address': 'fakefixed'}
-            raise exception.FixedIpNotFound()
-        self.stubs.Set(self.network.db, 'fixed_ip_get', fixed_ip_get)
-
-        self.mox.StubOutWithMock(self.network.l3driver, 'add_floating_ip')
+        self.mox.StubOutWithMock(self.network.l3driver, 'add_floating_ips')
         self.flags(public_interface=False)
-        self.network.l3driver.add_floating_ip('fakefloat',
-                                              'fakefixed',
-                                              'fakeiface')
+        self.network.l3driver.add_floating_ips([('fakefloat', 'fakefixed'),
+                                                ('fakefloat2', 'fakefixed2')],
+                                               'fakeiface')
         self.mox.ReplayAll()
         self.network.init_host_floating_ips()
         self.mox.UnsetStubs()
         self.mox.VerifyAll()
 
-        self.mox.StubOutWithMock(self.network.l3driver, 'add_floating_ip')
+        self.mox.StubOutWithMock(self.network.l3driver, 'add_floating_ips')
         self.flags(public_interface='fooiface')
-        self.network.l3driver.add_floating_ip('fakefloat',
-                                              'fakefixed',
-                                              'fooiface')
+        self.network.l3driver.add_floating_ips([('fakefloat', 'fakefixed'),
+                                                ('fakefloat2', 'fakefixed2')],
+                                               'fooiface')
         self.mox.ReplayAll()
         self.network.init_host_floating_ips()
         self.mox.UnsetStubs()
         self.mox.VerifyAll()
 
+    def test_floating_ip_init_host_no_interface(self):
+
+        def get_all_by_host(_context, _host):
+            return [{'interface': 'fakeiface',
+                     'address': 'fakefloat',
+                     'fixed_ip_id': 1,
+                     'fixed_address': 'fakefixed'}]
+        self.stubs.Set(self.network.db,
+                       'floating_ip_get_all_with_fixed_by_host',
+                       get_all_by_host)
+
+        def add_floating_ips(floating_ips, interface):
+            raise exception.ProcessExecutionError()
+        self.stubs.Set(self.network.l3driver, 'add_floating_ips',
+                       add_floating_ips)
+        self.flags(public_interface=False)
+        self.assertRaises(exception.NoFloatingIpInterface,
+                          self.network.init_host_floating_ips)
+
     def test_disassociate_floating_ip(self):
         ctxt = context.RequestContext('testuser', 'testproject',
                                       is_admin=False)
@@ -1321,6 +1346,50 @@ class CommonNetworkTestCase(test.TestCase):
                 None, None, None]
         self.assertTrue(manager.create_networks(*args))
 
+    def test_create_fixed_ips_in_chunks(self):
+        self.flags(fixed_ip_bulk_create_chunk_size=100)
+        ctxt = context.get_admin_context()
+        manager = fake_network.FakeNetworkManager()
+        self.stubs.Set(manager, 'db', db)
+        network = db.network_create_safe(ctxt, {'cidr': '10.0.0.0/23'})
+
+        inserts = []
+        real_get_session = sqlalchemy_api.get_session
+
+        def fake_get_session(*args, **kwargs):
+            session = real_get_session(*args, **kwargs)
+            real_execute = session.execute
+
+            def execute(clause, params=None, *args, **kwargs):
+                inserts.append(len(params))
+                return real_execute(clause, params, *args, **kwargs)
+
+            session.execute = execute
+            return session
+
+        self.stubs.Set(sqlalchemy_api, 'get_session', fake_get_session)
+
+        progress = []
+
+        def fake_debug(msg, *args, **kwargs):
+            if args and 'created' in args[0]:
+                progress.append(args[0]['created'])
+
+        self.stubs.Set(network_manager.LOG, 'debug', fake_debug)
+        network_manager.NetworkManager._create_fixed_ips(manager, ctxt,
+                                                         network['id'])
+
+        self.assertEqual([100, 100, 100, 100, 100, 12], inserts)
+        self.assertEqual([100, 200, 300, 400, 500, 512], progress)
+        ips = sorted((ip for ip in db.fixed_ip_get_all(ctxt)
+                      if ip['network_id'] == network['id']),
+                     key=lambda ip: netaddr.IPAddress(ip['address']))
+        self.assertEqual(512, len(ips))
+        self.assertEqual('10.0.0.0', ips[0]['address'])
+        self.assertEqual('10.0.1.255', ips[-1]['address'])
+        reserved = [ip['address'] for ip in ips if ip['reserved']]
+        self.assertEqual(['10.0.0.0', '10.0.0.1', '10.0.1.255'], reserved)
+
     def test_get_instance_uuids_by_ip_regex(self):
         manager = fake_network.FakeNetworkManager()
         _vifs = manager.db.virtual_interface_get_all(None)
@@ -1366,6 +1435,48 @@ class CommonNetworkTestCase(test.TestCase):
         self.assertEqual(res[0]['instance_uuid'], _vifs[1]['instance_uuid'])
         self.assertEqual(res[1]['instance_uuid'], _vifs[2]['instance_uuid'])
 
+    def test_get_instance_uuids_by_floating_ip_regex(self):
+        manager = fake_network.FakeNetworkManager()
+        _vifs = manager.db.virtual_interface_get_all(None)
+        fake_context = context.RequestContext('user', 'project')
+
+        res = manager.get_instance_uuids_by_ip_filter(fake_context,
+                                                      {'ip': '172.16.1.1'})
+        self.assertEqual(len(res), 1)
+        self.assertEqual(res[0]['instance_uuid'], _vifs[0]['instance_uuid'])
+        self.assertEqual(res[0]['ip'], '172.16.1.1')
+
+    def test_get_instance_uuids_by_ip_filter_pushes_prefix(self):
+        manager = fake_network.FakeNetworkManager()
+        fake_context = context.RequestContext('user', 'project')
+        self.mox.StubOutWithMock(manager.db,
+                                 'virtual_interface_get_all_with_ips')
+        manager.db.virtual_interface_get_all_with_ips(fake_context,
+                                                      '172').AndReturn([])
+        manager.db.virtual_interface_get_all_with_ips(fake_context,
+                                                      '').AndReturn([])
+        manager.db.virtual_interface_get_all_with_ips(fake_context,
+                                                      None).AndReturn([])
+        self.mox.ReplayAll()
+        manager.get_instance_uuids_by_ip_filter(fake_context,
+                                                {'ip': '172.16.0.2'})
+        manager.get_instance_uuids_by_ip_filter(fake_context,
+                                                {'ip': '.*'})
+        manager.get_instance_uuids_by_ip_filter(fake_context,
+                                                {'ip': '172.*', 'ip6': '.*'})
+
+    def test_regex_literal_prefix(self):
+        prefix = network_manager._regex_literal_prefix
+        self.assertEqual(prefix(None), '')
+        self.assertEqual(prefix('10.0.0.1'), '10')
+        self.assertEqual(prefix('172.16.0.*'), '172')
+        self.assertEqual(prefix('10*'), '1')
+        self.assertEqual(prefix('10?.1'), '1')
+        self.assertEqual(prefix('fe80::1'), 'fe80::1')
+        self.assertEqual(prefix('10.0|172'), '')
+        self.assertEqual(prefix('.*'), '')
+        self.assertEqual(prefix('\\d+'), '')
+
     def test_get_instance_uuids_by_ipv6_regex(self):
         manager = fake_network.FakeNetworkManager()
         _vifs = manager.db.virtual_interface_get_all(None)
@@ -17,6 +17,7 @@
 
 from nova import exception
 from nova.network import model
+from nova.openstack.common import jsonutils
 from nova.openstack.common import log as logging
 from nova import test
 from nova.tests import fake_network_cache_model
@@ -324,3 +325,54 @@ class NetworkInfoTests(test.TestCase):
                 [fake_network_cache_model.new_ip({'address': '10.10.0.2'}),
                  fake_network_cache_model.new_ip(
                         {'address': '10.10.0.3'})] * 4)
+
+    def test_hydrate_from_json(self):
+        vif = fake_network_cache_model.new_vif()
+        vif['network']['subnets'][0]['ips'][0].add_floating_ip(
+                model.IP(address='192.168.1.1', type='floating'))
+        ninfo = model.NetworkInfo([vif])
+        deserialized = model.NetworkInfo.hydrate(ninfo.json())
+        self.assertEqual(ninfo, deserialized)
+        self.assertEqual(ninfo.legacy(), deserialized.legacy())
+        network = deserialized[0]['network']
+        self.assertTrue(isinstance(deserialized[0], model.VIF))
+        self.assertTrue(isinstance(network, model.Network))
+        self.assertTrue(isinstance(network['subnets'][0], model.Subnet))
+        fixed_ip = network['subnets'][0]['ips'][0]
+        self.assertTrue(isinstance(fixed_ip, model.FixedIP))
+        self.assertTrue(isinstance(fixed_ip['floating_ips'][0], model.IP))
+        self.assertEqual(['192.168.1.1'],
+                         [ip['address'] for ip in deserialized.floating_ips()])
+
+    def test_hydrate_normalizes_partial_data(self):
+        deserialized = model.NetworkInfo.hydrate(
+                '[{"id": 1, "address": "aa:aa:aa:aa:aa:aa", "rxtx_cap": 3,'
+                '  "network": {"subnets": [{"cidr": "10.0.0.0/24",'
+                '                           "ips": [{"address": "10.0.0.2",'
+                '                                    "meta": {}}]}]}}]')
+        vif = deserialized[0]
+        self.assertEqual(3, vif.get_meta('rxtx_cap'))
+        subnet = vif['network']['subnets'][0]
+        self.assertEqual(4, subnet['version'])
+        self.assertEqual([], subnet['routes'])
+        self.assertEqual('fixed', subnet['ips'][0]['type'])
+        self.assertEqual(4, subnet['ips'][0]['version'])
+        self.assertEqual([], subnet['ips'][0]['floating_ips'])
+
+    def test_hydrate_copies_meta(self):
+        vif = fake_network_cache_model.new_vif()
+        vif['meta']['foo'] = 'bar'
+        serialized = jsonutils.loads(model.NetworkInfo([vif]).json())
+        serialized[0]['network']['subnets'][0]['ips'][0]['rxtx_cap'] = 3
+        first = model.NetworkInfo.hydrate(serialized)
+        second = model.NetworkInfo.hydrate(serialized)
+
+        first[0]['meta']['foo'] = 'baz'
+        first_ip = first[0]['network']['subnets'][0]['ips'][0]
+        first_ip['meta']['rxtx_cap'] = 4
+        self.assertEqual('bar', serialized[0]['meta']['foo'])
+        self.assertEqual('bar', second[0].get_meta('foo'))
+        second_ip = second[0]['network']['subnets'][0]['ips'][0]
+        self.assertEqual(3, second_ip.get_meta('rxtx_cap'))
+        self.assertFalse('rxtx_cap' in
+                serialized[0]['network']['subnets'][0]['ips'][0]['meta'])
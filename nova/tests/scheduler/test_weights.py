@@ -115,3 +115,45 @@ class RamWeigherTestCase(test.TestCase):
         weighed_host = self._get_weighed_host(hostinfo_list)
         self.assertEqual(weighed_host.weight, 8192 * 2)
         self.assertEqual(weighed_host.obj.host, 'host4')
+
+
+class ImageCacheWeigherTestCase(test.TestCase):
+    def setUp(self):
+        super(ImageCacheWeigherTestCase, self).setUp()
+        self.weight_handler = weights.HostWeightHandler()
+        self.weight_classes = self.weight_handler.get_matching_classes(
+                ['nova.scheduler.weights.image_cache.ImageCacheWeigher'])
+        hashed_1 = '356a192b7913b04c54574d18c28d46e6395428ab'
+        self.hosts = [
+                fakes.FakeHostState('host1', 'node1', {}),
+                fakes.FakeHostState('host2', 'node2',
+                        {'capabilities': {'cached_images': [hashed_1]}}),
+                fakes.FakeHostState('host3', 'node3',
+                        {'capabilities': {'cached_images': []}})]
+
+    def _get_weighed_hosts(self, image_ref):
+        weight_properties = {'request_spec':
+                {'instance_properties': {'image_ref': image_ref}}}
+        return self.weight_handler.get_weighed_objects(self.weight_classes,
+                self.hosts, weight_properties)
+
+    def test_prefers_hosts_with_image_cached(self):
+        weighed_hosts = self._get_weighed_hosts('1')
+        self.assertEqual(weighed_hosts[0].weight, 1024.0)
+        self.assertEqual(weighed_hosts[0].obj.host, 'host2')
+        self.assertEqual([h.weight for h in weighed_hosts[1:]], [0.0, 0.0])
+
+    def test_image_not_cached_anywhere(self):
+        weighed_hosts = self._get_weighed_hosts('2')
+        self.assertEqual([h.weight for h in weighed_hosts], [0.0, 0.0, 0.0])
+
+    def test_no_image_ref(self):
+        weighed_hosts = self.weight_handler.get_weighed_objects(
+                self.weight_classes, self.hosts, {})
+        self.assertEqual([h.weight for h in weighed_hosts], [0.0, 0.0, 0.0])
+
+    def test_multiplier(self):
+        self.flags(image_cache_weight_multiplier=2.0)
+        weighed_hosts = self._get_weighed_hosts('1')
+        self.assertEqual(weighed_hosts[0].weight, 2.0)
+        self.assertEqual(weighed_hosts[0].obj.host, 'host2')
@@ -20,10 +20,12 @@
 """Unit tests for the DB API"""
 
 import datetime
+import random
 import uuid as stdlib_uuid
 
 from nova import context
 from nova import db
+from nova.db.sqlalchemy import api as sqlalchemy_api
 from nova import exception
 from nova.openstack.common import cfg
 from nova.openstack.common import timeutils
@@ -183,6 +185,30 @@ class DbApiTestCase(test.TestCase):
                           self.context, {'display_name': '%test%'},
                           marker=str(stdlib_uuid.uuid4()))
 
+    def test_instance_get_all_by_filters_paginate_marker_columns(self):
+        test1 = self.create_instances_with_args(display_name='test1')
+        test2 = self.create_instances_with_args(display_name='test2')
+
+        def fake_instance_get_by_uuid(*args, **kwargs):
+            self.fail('the marker instance must not be fully loaded')
+
+        self.stubs.Set(sqlalchemy_api, 'instance_get_by_uuid',
+                       fake_instance_get_by_uuid)
+        result = db.instance_get_all_by_filters(self.context, {},
+                                                sort_key='display_name',
+                                                sort_dir='asc',
+                                                marker=test1['uuid'])
+        self.assertEqual([test2['uuid']], [i['uuid'] for i in result])
+
+    def test_instance_get_all_by_filters_paginate_marker_other_project(self):
+        otherprojectcontext = context.RequestContext(self.user_id,
+                                          "%s2" % self.project_id)
+        other = self.create_instances_with_args(context=otherprojectcontext)
+
+        self.assertRaises(exception.MarkerNotFound,
+                          db.instance_get_all_by_filters,
+                          self.context, {}, marker=other['uuid'])
+
     def test_migration_get_unconfirmed_by_dest_compute(self):
         ctxt = context.get_admin_context()
 
@@ -1113,6 +1139,15 @@ class CapacityTestCase(test.TestCase):
         self.assertEqual(2, int(stats['num_proj_12345']))
         self.assertEqual(3, int(stats['num_vm_building']))
 
+    def test_compute_node_get_by_hosts(self):
+        self._create_helper('host1')
+        nodes = db.compute_node_get_by_hosts(self.ctxt, ['host1', 'host2'])
+        self.assertEqual(1, len(nodes))
+        self.assertEqual('host1', nodes[0]['service']['host'])
+        self.assertEqual([], db.compute_node_get_by_hosts(self.ctxt,
+                                                          ['host2']))
+        self.assertEqual([], db.compute_node_get_by_hosts(self.ctxt, []))
+
     def test_compute_node_update(self):
         item = self._create_helper('host1')
 
@@ -1242,6 +1277,139 @@ class TestIpAllocation(test.TestCase):
         self.assertEqual(fixed_ip.instance_uuid, self.instance.uuid)
         self.assertEqual(fixed_ip.network_id, self.network.id)
 
+    def test_floating_ip_get_all_with_fixed_by_host(self):
+        address = self.create_fixed_ip(network_id=self.network.id)
+        fixed = db.fixed_ip_get_by_address(self.ctxt, address)
+        db.floating_ip_create(self.ctxt, {'address': '10.0.0.1',
+                                          'host': 'host1',
+                                          'interface': 'eth0',
+                                          'fixed_ip_id': fixed['id']})
+        db.floating_ip_create(self.ctxt, {'address': '10.0.0.2',
+                                          'host': 'host1',
+                                          'interface': 'eth0'})
+        db.floating_ip_create(self.ctxt, {'address': '10.0.0.3',
+                                          'host': 'host2',
+                                          'fixed_ip_id': fixed['id']})
+
+        floating_ips = db.floating_ip_get_all_with_fixed_by_host(self.ctxt,
+                                                                 'host1')
+        floating_ips.sort(key=lambda ip: ip['address'])
+        self.assertEqual([{'address': '10.0.0.1',
+                           'interface': 'eth0',
+                           'fixed_ip_id': fixed['id'],
+                           'fixed_address': address},
+                          {'address': '10.0.0.2',
+                           'interface': 'eth0',
+                           'fixed_ip_id': None,
+                           'fixed_address': None}], floating_ips)
+        self.assertRaises(exception.FloatingIpNotFoundForHost,
+                          db.floating_ip_get_all_with_fixed_by_host,
+                          self.ctxt, 'host3')
+
+    def test_virtual_interface_get_all_with_ips(self):
+        vif = db.virtual_interface_create(self.ctxt,
+                {'address': 'DE:AD:BE:EF:00:01',
+                 'network_id': self.network.id,
+                 'instance_uuid': self.instance.uuid})
+        db.virtual_interface_create(self.ctxt,
+                {'address': 'DE:AD:BE:EF:00:02',
+                 'network_id': self.network.id,
+                 'instance_uuid': self.instance.uuid})
+        self.create_fixed_ip(address='192.168.0.1',
+                             virtual_interface_id=vif['id'])
+        address = self.create_fixed_ip(address='192.168.0.2',
+                                       virtual_interface_id=vif['id'])
+        fixed = db.fixed_ip_get_by_address(self.ctxt, address)
+        db.floating_ip_create(self.ctxt, {'address': '10.0.0.1',
+                                          'fixed_ip_id': fixed['id']})
+        db.floating_ip_create(self.ctxt, {'address': '10.0.0.2',
+                                          'fixed_ip_id': fixed['id']})
+
+        vifs = db.virtual_interface_get_all_with_ips(self.ctxt)
+        self.assertEqual(2, len(vifs))
+        self.assertEqual('DE:AD:BE:EF:00:01', vifs[0]['address'])
+        self.assertEqual(self.instance.uuid, vifs[0]['instance_uuid'])
+        self.assertEqual(
+                [{'address': '192.168.0.1', 'floating_ips': []},
+                 {'address': '192.168.0.2',
+                  'floating_ips': [{'address': '10.0.0.1'},
+                                   {'address': '10.0.0.2'}]}],
+                vifs[0]['fixed_ips'])
+        self.assertEqual([], vifs[1]['fixed_ips'])
+
+        vifs = db.virtual_interface_get_all_with_ips(self.ctxt, '10.')
+        self.assertEqual(1, len(vifs))
+        self.assertEqual(['192.168.0.2'],
+                         [ip['address'] for ip in vifs[0]['fixed_ips']])
+
+    def test_fixed_ip_bulk_create(self):
+        ips = [{'address': '192.168.0.%d' % i,
+                'network_id': self.network.id,
+                'reserved': i == 1} for i in xrange(1, 4)]
+        db.fixed_ip_bulk_create(self.ctxt, ips)
+        for ip in ips:
+            fixed_ip = db.fixed_ip_get_by_address(self.ctxt, ip['address'])
+            self.assertEqual(fixed_ip.network_id, self.network.id)
+            self.assertEqual(fixed_ip.reserved, ip['reserved'])
+            self.assertFalse(fixed_ip.deleted)
+            self.assertFalse(fixed_ip.allocated)
+            self.assertNotEqual(fixed_ip.created_at, None)
+
+    def test_fixed_ip_bulk_create_chunks_in_one_transaction(self):
+        def ips():
+            for i in xrange(1, 4):
+                yield {'address': '192.168.0.%d' % i,
+                       'network_id': self.network.id,
+                       'reserved': False}
+            raise test.TestingException()
+
+        self.assertRaises(test.TestingException, db.fixed_ip_bulk_create,
+                          self.ctxt, ips(), chunk_size=2)
+        self.assertRaises(exception.FixedIpNotFoundForAddress,
+                          db.fixed_ip_get_by_address, self.ctxt,
+                          '192.168.0.1')
+
+    def test_fixed_ip_associate_pool_starts_at_random_pivot(self):
+        ids = []
+        for i in xrange(1, 5):
+            address = self.create_fixed_ip(address='192.168.0.%d' % i,
+                                           network_id=self.network.id)
+            ids.append(db.fixed_ip_get_by_address(self.ctxt, address).id)
+        self.mox.StubOutWithMock(random, 'randint')
+        random.randint(min(ids), max(ids)).AndReturn(ids[2])
+        self.mox.ReplayAll()
+        address = db.fixed_ip_associate_pool(self.ctxt, self.network.id,
+                                             self.instance.uuid)
+        self.assertEqual(address, '192.168.0.3')
+
+    def test_fixed_ip_associate_pool_wraps_around(self):
+        ids = []
+        for i in xrange(1, 5):
+            address = self.create_fixed_ip(address='192.168.0.%d' % i,
+                                           network_id=self.network.id)
+            ids.append(db.fixed_ip_get_by_address(self.ctxt, address).id)
+        db.fixed_ip_update(self.ctxt, '192.168.0.4', {'reserved': True})
+        self.mox.StubOutWithMock(random, 'randint')
+        random.randint(min(ids), max(ids)).AndReturn(ids[3])
+        self.mox.ReplayAll()
+        address = db.fixed_ip_associate_pool(self.ctxt, self.network.id,
+                                             self.instance.uuid)
+        self.assertEqual(address, '192.168.0.1')
+
+    def test_fixed_ip_associate_pool_allocates_every_address(self):
+        addresses = set('192.168.0.%d' % i for i in xrange(1, 9))
+        for address in addresses:
+            self.create_fixed_ip(address=address, network_id=self.network.id)
+        allocated = set()
+        for i in xrange(len(addresses)):
+            allocated.add(db.fixed_ip_associate_pool(self.ctxt,
+                                                     self.network.id,
+                                                     self.instance.uuid))
+        self.assertEqual(allocated, addresses)
+        self.assertRaises(exception.NoMoreFixedIps,
+                          db.fixed_ip_associate_pool,
+                          self.ctxt, self.network.id, self.instance.uuid)
+
 
 class InstanceDestroyConstraints(test.TestCase):
 
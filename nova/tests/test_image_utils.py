@@ -14,6 +14,15 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import cStringIO
+import hashlib
+import httplib
+import mimetools
+import os
+import StringIO
+import urllib2
+
+from nova.image import glance
 from nova import test
 from nova import utils
 
@@ -216,3 +225,187 @@ ID        TAG                 VM SIZE                DATE       VM CLOCK
         self.assertEquals(67108864, image_info.virtual_size)
         self.assertEquals(98304, image_info.disk_size)
         self.assertEquals(3, len(image_info.snapshots))
+
+    def _stub_image_service(self, chunks, image_meta=None):
+        class FakeImageService(object):
+            def download(self, context, image_id, data):
+                self.downloaded = True
+                for chunk in chunks:
+                    data.write(chunk)
+
+            def show(self, context, image_id):
+                return image_meta
+
+        self.image_service = FakeImageService()
+        self.image_service.downloaded = False
+
+        self.stubs.Set(glance, 'get_remote_image_service',
+                       lambda context, href: (self.image_service, href))
+
+    def test_fetch_returns_checksum(self):
+        chunks = ['a' * 65536, 'b' * 100, 'c']
+        self._stub_image_service(chunks)
+        with utils.tempdir() as tmpdir:
+            path = os.path.join(tmpdir, 'image')
+            checksum = images.fetch(None, 'fake', path, None, None)
+            with open(path) as f:
+                self.assertEqual(''.join(chunks), f.read())
+        self.assertEqual(hashlib.sha1(''.join(chunks)).hexdigest(),
+                         checksum)
+
+    def test_fetch_sparse_checksum(self):
+        class FakeImageService(object):
+            def download(self, context, image_id, data):
+                data.write('a')
+                data.seek(4096, os.SEEK_CUR)
+                data.truncate()
+
+        self.stubs.Set(glance, 'get_remote_image_service',
+                       lambda context, href: (FakeImageService(), href))
+        with utils.tempdir() as tmpdir:
+            path = os.path.join(tmpdir, 'image')
+            checksum = images.fetch(None, 'fake', path, None, None)
+            with open(path) as f:
+                self.assertEqual('a' + '\0' * 4096, f.read())
+        self.assertEqual(hashlib.sha1('a' + '\0' * 4096).hexdigest(),
+                         checksum)
+
+    def test_qemu_img_info_cached_until_file_changes(self):
+        self.stubs.Set(images, '_QEMU_IMG_INFO_CACHE', {})
+        calls = []
+
+        def fake_execute(*cmd, **kwargs):
+            calls.append(cmd[-1])
+            return ('image: %s\nfile format: raw\n' % cmd[-1], '')
+        self.stubs.Set(utils, 'execute', fake_execute)
+
+        with utils.tempdir() as tmpdir:
+            path = os.path.join(tmpdir, 'disk')
+            with open(path, 'w') as f:
+                f.write('data')
+
+            first = images.qemu_img_info(path)
+            self.assertTrue(images.qemu_img_info(path) is first)
+            self.assertEqual([path], calls)
+
+            with open(path, 'a') as f:
+                f.write('more data')
+            images.qemu_img_info(path)
+            self.assertEqual([path, path], calls)
+
+    def test_qemu_img_info_missing_file_not_cached(self):
+        self.stubs.Set(images, '_QEMU_IMG_INFO_CACHE', {})
+        self.stubs.Set(utils, 'execute',
+                       lambda *cmd, **kwargs: ('file format: raw\n', ''))
+
+        images.qemu_img_info('/no/such/disk')
+        self.assertEqual({}, images._QEMU_IMG_INFO_CACHE)
+
+    def _test_fetch_to_raw(self, file_format):
+        self._stub_image_service(['data'])
+        info = images.QemuImgInfo('file format: %s\n' % file_format)
+        self.stubs.Set(images, 'qemu_img_info', lambda path: info)
+
+        def fake_convert_image(source, dest, out_format):
+            info.file_format = out_format
+            with open(dest, 'w') as f:
+                f.write('converted')
+        self.stubs.Set(images, 'convert_image', fake_convert_image)
+
+        with utils.tempdir() as tmpdir:
+            path = os.path.join(tmpdir, 'image')
+            checksum = images.fetch_to_raw(None, 'fake', path, None, None)
+            self.assertTrue(os.path.exists(path))
+        return checksum
+
+    def test_fetch_to_raw_returns_checksum(self):
+        self.assertEqual(hashlib.sha1('data').hexdigest(),
+                         self._test_fetch_to_raw('raw'))
+
+    def test_fetch_to_raw_converted_has_no_checksum(self):
+        self.flags(force_raw_images=True)
+        self.assertEqual(None, self._test_fetch_to_raw('qcow2'))
+
+    def _stub_peers(self, peers, truncated=()):
+        self.peer_reads = []
+
+        def fake_urlopen(url, timeout=None):
+            if url not in peers:
+                raise urllib2.URLError('connection refused')
+            data = peers[url]
+            if isinstance(data, Exception):
+                raise data
+            length = len(data)
+            if isinstance(data, tuple):
+                data, length = data
+            body = StringIO.StringIO(data)
+            real_read = body.read
+
+            def read(size=-1):
+                self.peer_reads.append(url)
+                if url in truncated:
+                    raise httplib.IncompleteRead(data)
+                return real_read(size)
+            body.read = read
+            response = urllib2.addinfourl(body,
+                    mimetools.Message(cStringIO.StringIO(
+                        'Content-Length: %d\r\n\r\n' % length)),
+                    url)
+            response.code = 200
+            return response
+        self.stubs.Set(urllib2, 'urlopen', fake_urlopen)
+
+    def _test_fetch_from_peers(self, peers, peer_urls, disk_format='raw',
+                               truncated=()):
+        image_meta = {'size': len('data'),
+                      'disk_format': disk_format,
+                      'checksum': hashlib.md5('data').hexdigest()}
+        self._stub_image_service(['data'], image_meta)
+        self._stub_peers(peers, truncated)
+        with utils.tempdir() as tmpdir:
+            path = os.path.join(tmpdir, 'image')
+            checksum = images.fetch(None, 'fake', path, None, None,
+                                    peer_urls=peer_urls)
+            with open(path) as f:
+                self.assertEqual('data', f.read())
+        self.assertEqual(hashlib.sha1('data').hexdigest(), checksum)
+
+    def test_fetch_from_peer(self):
+        self._test_fetch_from_peers({'http://peer2/image': 'data'},
+                                    ['http://peer1/image',
+                                     'http://peer2/image'])
+        self.assertFalse(self.image_service.downloaded)
+
+    def test_fetch_from_peer_bad_checksum(self):
+        self._test_fetch_from_peers({'http://peer1/image': 'dat4'},
+                                    ['http://peer1/image'])
+        self.assertTrue(self.image_service.downloaded)
+
+    def test_fetch_from_peer_bad_size(self):
+        self._test_fetch_from_peers({'http://peer1/image': 'converted'},
+                                    ['http://peer1/image'])
+        self.assertTrue(self.image_service.downloaded)
+        self.assertEqual(self.peer_reads, [])
+
+    def test_fetch_from_peer_converted(self):
+        # a copy the peer converted to raw is rejected on its size,
+        # without downloading it
+        self._test_fetch_from_peers({'http://peer1/image': 'converted'},
+                                    ['http://peer1/image'],
+                                    disk_format='qcow2')
+        self.assertTrue(self.image_service.downloaded)
+        self.assertEqual(self.peer_reads, [])
+
+    def test_fetch_from_peers_unavailable(self):
+        self._test_fetch_from_peers({}, ['http://peer1/image'])
+        self.assertTrue(self.image_service.downloaded)
+
+    def test_fetch_from_peers_http_errors(self):
+        self._test_fetch_from_peers(
+                {'http://peer1/image': httplib.BadStatusLine(''),
+                 'http://peer2/image': 'data',
+                 'http://peer3/image': 'data'},
+                ['http://peer1/image', 'http://peer2/image',
+                 'http://peer3/image'],
+                truncated=['http://peer2/image'])
+        self.assertFalse(self.image_service.downloaded)
@@ -28,6 +28,7 @@ from nova import test
 
 from nova.compute import manager as compute_manager
 from nova.compute import vm_states
+from nova import context
 from nova import db
 from nova.openstack.common import cfg
 from nova.openstack.common import importutils
@@ -405,6 +406,65 @@ class ImageCacheManagerTestCase(test.TestCase):
                 res = image_cache_manager._verify_checksum(img, fname)
                 self.assertTrue(res is None)
 
+    def test_hash_file(self):
+        with utils.tempdir() as tmpdir:
+            fname = os.path.join(tmpdir, 'aaa')
+            with open(fname, 'w') as f:
+                f.write('data' * 20000)
+
+            expected = hashlib.sha1('data' * 20000).hexdigest()
+            self.assertEquals(imagecache.hash_file(fname), expected)
+
+    def test_hash_file_rate_limited(self):
+        self.flags(checksum_workers=2,
+                   checksum_max_bytes_per_second=32768)
+
+        class FakeTime(object):
+            def __init__(self):
+                self.now = 0.0
+                self.sleeps = []
+
+            def time(self):
+                return self.now
+
+            def sleep(self, delay):
+                self.sleeps.append(delay)
+                self.now += delay
+
+        fake_time = FakeTime()
+        self.stubs.Set(imagecache, '_native_time', fake_time)
+
+        with utils.tempdir() as tmpdir:
+            fname = os.path.join(tmpdir, 'aaa')
+            with open(fname, 'w') as f:
+                f.write('x' * 65536)
+
+            expected = hashlib.sha1('x' * 65536).hexdigest()
+            self.assertEquals(imagecache.hash_file(fname), expected)
+
+        # Each of the two workers gets half of the bandwidth, so reading
+        # two 32k chunks takes four seconds
+        self.assertEquals(fake_time.sleeps, [2.0, 2.0])
+
+    def test_verify_checksums(self):
+        self.flags(checksum_base_images=True, checksum_workers=4)
+
+        with utils.tempdir() as tmpdir:
+            good = os.path.join(tmpdir, 'good')
+            bad = os.path.join(tmpdir, 'bad')
+            for fname in (good, bad):
+                with open(fname, 'w') as f:
+                    f.write('data')
+
+            image_cache_manager = imagecache.ImageCacheManager()
+            self.stubs.Set(image_cache_manager, '_verify_checksum',
+                           lambda img, base_file: base_file == good)
+
+            res = image_cache_manager._verify_checksums(
+                [('1', good), ('2', bad),
+                 ('3', os.path.join(tmpdir, 'missing')), ('4', None)])
+            self.assertEquals(res, {good: True, bad: False})
+
     def test_verify_checksum_invalid_json(self):
         img = {'container_format': 'ami', 'id': '42'}
 
@@ -699,6 +759,26 @@ class ImageCacheManagerTestCase(test.TestCase):
             self.assertEquals(image_cache_manager.corrupt_base_files,
                               [fname])
 
+    def test_handle_base_image_precomputed_checksum(self):
+        self.flags(checksum_base_images=True)
+        self.stubs.Set(virtutils, 'chown', lambda x, y: None)
+
+        img = '123'
+
+        with self._make_base_file() as fname:
+            image_cache_manager = imagecache.ImageCacheManager()
+            self.mox.StubOutWithMock(image_cache_manager, '_verify_checksum')
+            self.mox.ReplayAll()
+
+            image_cache_manager.unexplained_images = [fname]
+            image_cache_manager.used_images = {'123': (1, 0, ['banana-42'])}
+            image_cache_manager._handle_base_image(img, fname,
+                                                   checksums={fname: False})
+
+            self.assertEquals(image_cache_manager.removable_base_files, [])
+            self.assertEquals(image_cache_manager.corrupt_base_files,
+                              [fname])
+
     def test_verify_base_images(self):
         hashed_1 = '356a192b7913b04c54574d18c28d46e6395428ab'
         hashed_42 = '92cfceb39d57d914ed8b14d0e37643de0797ae56'
@@ -860,6 +940,49 @@ class ImageCacheManagerTestCase(test.TestCase):
         # Ensure there are no "corrupt" images as well
         self.assertTrue(len(image_cache_manager.corrupt_base_files), 0)
 
+    def test_prefetch_image(self):
+        ctxt = context.RequestContext('fake_user', 'fake_project')
+        fetched = []
+
+        def fake_fetch_image(context, target, image_id, user_id, project_id):
+            self.assertEqual((user_id, project_id),
+                             ('fake_user', 'fake_project'))
+            fetched.append(image_id)
+            with open(target, 'w') as f:
+                f.write('data')
+
+        self.stubs.Set(virtutils, 'fetch_image', fake_fetch_image)
+
+        with utils.tempdir() as tmpdir:
+            self.flags(instances_path=tmpdir)
+            image_cache_manager = imagecache.ImageCacheManager()
+
+            self.assertTrue(image_cache_manager.prefetch_image(ctxt, '1'))
+            # An image which is already cached is not downloaded again
+            self.assertFalse(image_cache_manager.prefetch_image(ctxt, '1'))
+            self.assertEqual(fetched, ['1'])
+
+            base_file = os.path.join(tmpdir, CONF.base_dir_name,
+                                     hashlib.sha1('1').hexdigest())
+            self.assertTrue(os.path.exists(base_file))
+
+    def test_list_cached_images(self):
+        hashed_1 = '356a192b7913b04c54574d18c28d46e6395428ab'
+
+        with utils.tempdir() as tmpdir:
+            self.flags(instances_path=tmpdir)
+            image_cache_manager = imagecache.ImageCacheManager()
+            self.assertEqual(image_cache_manager.list_cached_images(), [])
+
+            base_dir = os.path.join(tmpdir, CONF.base_dir_name)
+            os.mkdir(base_dir)
+            for ent in (hashed_1, '%s_10737418240' % hashed_1,
+                        '%s.info' % hashed_1, 'ephemeral_0_20_None'):
+                open(os.path.join(base_dir, ent), 'w').close()
+
+            self.assertEqual(image_cache_manager.list_cached_images(),
+                             [hashed_1])
+
     def test_verify_base_images_no_base(self):
         self.flags(instances_path='/tmp/no/such/dir/name/please')
         image_cache_manager = imagecache.ImageCacheManager()
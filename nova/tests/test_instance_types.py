@@ -149,6 +149,26 @@ class InstanceTypeTestCase(test.TestCase):
         inst_types = instance_types.get_all_types()
         self.assertEqual(total_instance_types, len(inst_types))
 
+    def test_get_all_types_sorted_list(self):
+        """Ensures that pages of instance types can be retrieved"""
+        inst_types = instance_types.get_all_types().values()
+        flavorids = sorted(inst_type['flavorid'] for inst_type in inst_types)
+
+        page = instance_types.get_all_types_sorted_list(limit=2)
+        self.assertEqual([i['flavorid'] for i in page], flavorids[:2])
+
+        page = instance_types.get_all_types_sorted_list(
+            limit=2, marker=flavorids[1])
+        self.assertEqual([i['flavorid'] for i in page], flavorids[2:4])
+
+        page = instance_types.get_all_types_sorted_list(
+            sort_dir='desc', marker=flavorids[1])
+        self.assertEqual([i['flavorid'] for i in page], flavorids[:1])
+
+        self.assertRaises(exception.MarkerNotFound,
+                          instance_types.get_all_types_sorted_list,
+                          marker='unknown_flavor')
+
     def test_invalid_create_args_should_fail(self):
         """Ensures that instance type creation fails with invalid args"""
         invalid_sigs = [
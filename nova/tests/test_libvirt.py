@@ -21,6 +21,7 @@ import eventlet
 import json
 import mox
 import os
+import random
 import re
 import shutil
 import tempfile
@@ -73,6 +74,7 @@ CONF = cfg.CONF
 CONF.import_opt('compute_manager', 'nova.config')
 CONF.import_opt('host', 'nova.config')
 CONF.import_opt('my_ip', 'nova.config')
+CONF.import_opt('base_dir_name', 'nova.compute.manager')
 LOG = logging.getLogger(__name__)
 
 _fake_network_info = fake_network.fake_get_instance_nw_info
@@ -113,6 +115,9 @@ class FakeVirtDomain(object):
     def name(self):
         return "fake-domain %s" % self
 
+    def ID(self):
+        return 1
+
     def info(self):
         return [power_state.RUNNING, None, None, None, None]
 
@@ -1119,6 +1124,61 @@ class LibvirtConnTestCase(test.TestCase):
         devices = conn.get_all_block_devices()
         self.assertEqual(devices, ['/path/to/dev/1', '/path/to/dev/3'])
 
+    def test_domain_tree_cache(self):
+        class XMLCountingDomain(FakeVirtDomain):
+            dom_id = 1
+            xml_reads = 0
+
+            def ID(self):
+                return self.dom_id
+
+            def XMLDesc(self, *args):
+                self.xml_reads += 1
+                return super(XMLCountingDomain, self).XMLDesc(*args)
+
+        dom = XMLCountingDomain()
+        conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+
+        tree = conn._get_domain_tree('instance-1', dom)
+        self.assertTrue(conn._get_domain_tree('instance-1', dom) is tree)
+        self.assertEqual(dom.xml_reads, 1)
+
+        dom.dom_id = 2
+        self.assertFalse(conn._get_domain_tree('instance-1', dom) is tree)
+        self.assertEqual(dom.xml_reads, 2)
+
+        conn._forget_domain_tree('instance-1')
+        conn._get_domain_tree('instance-1', dom)
+        self.assertEqual(dom.xml_reads, 3)
+
+        # NOTE(pnavarro): a redefined domain keeps its id
+        self.stubs.Set(dom, 'name', lambda: 'instance-1')
+        conn._create_domain(domain=dom)
+        conn._get_domain_tree('instance-1', dom)
+        self.assertEqual(dom.xml_reads, 5)
+
+        # NOTE(pnavarro): all shut off domains report an id of -1
+        dom.dom_id = -1
+        conn._get_domain_tree('instance-1', dom)
+        conn._get_domain_tree('instance-1', dom)
+        self.assertEqual(dom.xml_reads, 7)
+        self.assertFalse('instance-1' in conn._domain_trees)
+
+    def test_list_instances_prunes_domain_trees(self):
+        self.mox.StubOutWithMock(libvirt_driver.LibvirtDriver, '_conn')
+        dom = FakeVirtDomain()
+        libvirt_driver.LibvirtDriver._conn.lookupByID = lambda dom_id: dom
+        libvirt_driver.LibvirtDriver._conn.numOfDomains = lambda: 1
+        libvirt_driver.LibvirtDriver._conn.listDomainsID = lambda: [1]
+
+        self.mox.ReplayAll()
+        conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        conn._get_domain_tree(dom.name(), dom)
+        conn._get_domain_tree('instance-gone', FakeVirtDomain())
+
+        conn.list_instances()
+        self.assertEqual(conn._domain_trees.keys(), [dom.name()])
+
     def test_get_disks(self):
         xml = [
             # NOTE(vish): id 0 is skipped
@@ -1296,6 +1356,139 @@ class LibvirtConnTestCase(test.TestCase):
         self.assertEquals(snapshot['disk_format'], 'raw')
         self.assertEquals(snapshot['name'], snapshot_name)
 
+    def test_snapshot_streaming_raw(self):
+        self.flags(libvirt_snapshots_directory='./',
+                   libvirt_snapshot_streaming=True)
+
+        image_service = nova.tests.image.fake.FakeImageService()
+
+        instance_ref = db.instance_create(self.context, self.test_instance)
+        properties = {'instance_id': instance_ref['id'],
+                      'user_id': str(self.context.user_id)}
+        sent_meta = {'name': 'test-snap', 'is_public': False,
+                     'status': 'creating', 'properties': properties}
+        recv_meta = image_service.create(context, sent_meta)
+
+        self.mox.StubOutWithMock(libvirt_driver.LibvirtDriver, '_conn')
+        libvirt_driver.LibvirtDriver._conn.lookupByName = self.fake_lookup
+        self.mox.StubOutWithMock(libvirt_driver.utils, 'execute')
+        libvirt_driver.utils.execute = self.fake_execute
+        self.stubs.Set(libvirt_driver.libvirt_utils, 'disk_type', 'raw')
+        self.stubs.Set(libvirt_driver.libvirt_utils, 'files',
+                       {'filename': 'disk contents'})
+
+        def fail_convert(*args):
+            self.fail('streamed snapshots must not be converted')
+
+        self.stubs.Set(images, 'convert_image', fail_convert)
+
+        events = []
+
+        def fake_update(ctxt, image_href, metadata, data):
+            events.append(('upload', data.read()))
+
+        self.stubs.Set(image_service, 'update', fake_update)
+
+        def fake_file_delete(path):
+            events.append(('delete', path))
+
+        self.stubs.Set(libvirt_driver.libvirt_utils, 'file_delete',
+                       fake_file_delete)
+
+        self.mox.ReplayAll()
+
+        conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        self.stubs.Set(conn, '_create_domain',
+                       lambda domain: events.append(('resume', None)))
+        conn.snapshot(self.context, instance_ref, recv_meta['id'])
+
+        # the instance runs again before the clone of its disk is uploaded
+        self.assertEqual([event for event, arg in events],
+                         ['resume', 'upload', 'delete'])
+        self.assertEqual(events[1][1], 'disk contents')
+        self.assertTrue(events[2][1].startswith('filename.'))
+
+    def test_snapshot_streaming_without_reflink(self):
+        self.flags(libvirt_snapshots_directory='./',
+                   libvirt_snapshot_streaming=True)
+
+        image_service = nova.tests.image.fake.FakeImageService()
+
+        instance_ref = db.instance_create(self.context, self.test_instance)
+        properties = {'instance_id': instance_ref['id'],
+                      'user_id': str(self.context.user_id)}
+        sent_meta = {'name': 'test-snap', 'is_public': False,
+                     'status': 'creating', 'properties': properties}
+        recv_meta = image_service.create(context, sent_meta)
+
+        self.mox.StubOutWithMock(libvirt_driver.LibvirtDriver, '_conn')
+        libvirt_driver.LibvirtDriver._conn.lookupByName = self.fake_lookup
+        self.mox.StubOutWithMock(libvirt_driver.utils, 'execute')
+        libvirt_driver.utils.execute = self.fake_execute
+        self.stubs.Set(libvirt_driver.libvirt_utils, 'disk_type', 'raw')
+
+        def fail_clone(src, dest):
+            raise exception.ProcessExecutionError()
+
+        self.stubs.Set(libvirt_driver.libvirt_utils, 'clone_image',
+                       fail_clone)
+        deleted = []
+        self.stubs.Set(utils, 'delete_if_exists', deleted.append)
+
+        converted = []
+
+        def convert_image(source, dest, out_format):
+            converted.append(out_format)
+            libvirt_driver.libvirt_utils.files[dest] = ''
+
+        self.stubs.Set(images, 'convert_image', convert_image)
+
+        self.mox.ReplayAll()
+
+        conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        conn.snapshot(self.context, instance_ref, recv_meta['id'])
+
+        self.assertEqual(converted, ['raw'])
+        self.assertEqual(len(deleted), 1)
+        self.assertTrue(deleted[0].startswith(CONF.instances_path))
+
+    def test_snapshot_streaming_needs_conversion(self):
+        self.flags(libvirt_snapshots_directory='./',
+                   libvirt_snapshot_streaming=True,
+                   snapshot_image_format='qcow2')
+
+        image_service = nova.tests.image.fake.FakeImageService()
+
+        instance_ref = db.instance_create(self.context, self.test_instance)
+        properties = {'instance_id': instance_ref['id'],
+                      'user_id': str(self.context.user_id)}
+        sent_meta = {'name': 'test-snap', 'is_public': False,
+                     'status': 'creating', 'properties': properties}
+        recv_meta = image_service.create(context, sent_meta)
+
+        self.mox.StubOutWithMock(libvirt_driver.LibvirtDriver, '_conn')
+        libvirt_driver.LibvirtDriver._conn.lookupByName = self.fake_lookup
+        self.mox.StubOutWithMock(libvirt_driver.utils, 'execute')
+        libvirt_driver.utils.execute = self.fake_execute
+        self.stubs.Set(libvirt_driver.libvirt_utils, 'disk_type', 'raw')
+
+        converted = []
+
+        def convert_image(source, dest, out_format):
+            converted.append(out_format)
+            libvirt_driver.libvirt_utils.files[dest] = ''
+
+        self.stubs.Set(images, 'convert_image', convert_image)
+
+        self.mox.ReplayAll()
+
+        conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        conn.snapshot(self.context, instance_ref, recv_meta['id'])
+
+        self.assertEqual(converted, ['qcow2'])
+        snapshot = image_service.show(context, recv_meta['id'])
+        self.assertEquals(snapshot['disk_format'], 'qcow2')
+
     def test_lxc_snapshot_in_raw_format(self):
         self.flags(libvirt_snapshots_directory='./',
                    libvirt_type='lxc')
@@ -2194,6 +2387,7 @@ class LibvirtConnTestCase(test.TestCase):
 
         # Preparing mocks
         vdmock = self.mox.CreateMock(libvirt.virDomain)
+        vdmock.ID().AndReturn(1)
         self.mox.StubOutWithMock(vdmock, "XMLDesc")
         vdmock.XMLDesc(0).AndReturn(dummyxml)
 
@@ -2595,6 +2789,47 @@ class LibvirtConnTestCase(test.TestCase):
         space = fake_libvirt_utils.get_fs_info(CONF.instances_path)['free']
         self.assertEqual(result, space / 1024 ** 3)
 
+    def test_available_least_caches_over_commit(self):
+        conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        instances = ['inst1', 'inst2']
+        scanned = []
+
+        def get_info(instance_name):
+            scanned.append(instance_name)
+            return jsonutils.dumps([{'virt_disk_size': 3 * 1024 ** 3,
+                                     'disk_size': 1024 ** 3}])
+        self.stubs.Set(conn, 'list_instances', lambda: instances)
+        self.stubs.Set(conn, 'get_instance_disk_info', get_info)
+
+        space = fake_libvirt_utils.get_fs_info(CONF.instances_path)['free']
+        expected = space / 1024 ** 3 - 4
+        self.assertEqual(conn.get_disk_available_least(), expected)
+        self.assertEqual(conn.get_disk_available_least(), expected)
+        self.assertEqual(scanned, ['inst1', 'inst2'])
+
+        conn._forget_disk_over_commit({'name': 'inst2'})
+        self.assertEqual(conn.get_disk_available_least(), expected)
+        self.assertEqual(scanned, ['inst1', 'inst2', 'inst2'])
+
+        instances.remove('inst1')
+        self.assertEqual(conn.get_disk_available_least(), expected + 2)
+        self.assertEqual(conn._disk_over_commit.keys(), ['inst2'])
+
+    def test_available_least_full_rescan(self):
+        self.flags(disk_available_least_refresh_interval=0)
+        conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        scanned = []
+
+        def get_info(instance_name):
+            scanned.append(instance_name)
+            return jsonutils.dumps([])
+        self.stubs.Set(conn, 'list_instances', lambda: ['inst1'])
+        self.stubs.Set(conn, 'get_instance_disk_info', get_info)
+
+        conn.get_disk_available_least()
+        conn.get_disk_available_least()
+        self.assertEqual(scanned, ['inst1', 'inst1'])
+
     def test_cpu_info(self):
         conn = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), True)
 
@@ -3069,6 +3304,7 @@ class HostStateTestCase(test.TestCase):
                  '"mtrr", "sep", "apic"], '
                  '"topology": {"cores": "1", "threads": "1", "sockets": "1"}}')
     instance_caps = [("x86_64", "kvm", "hvm"), ("i686", "kvm", "hvm")]
+    cached_images = ['356a192b7913b04c54574d18c28d46e6395428ab']
 
     class FakeConnection(object):
         """Fake connection object"""
@@ -3113,6 +3349,9 @@ class HostStateTestCase(test.TestCase):
         def get_instance_capabilities(self):
             return HostStateTestCase.instance_caps
 
+        def get_cached_images(self):
+            return HostStateTestCase.cached_images
+
     def test_update_status(self):
         virtapi = fake.FakeVirtAPI()
         self.mox.StubOutWithMock(libvirt_driver, 'LibvirtDriver')
@@ -3139,6 +3378,8 @@ class HostStateTestCase(test.TestCase):
         self.assertEquals(stats["hypervisor_type"], 'QEMU')
         self.assertEquals(stats["hypervisor_version"], 13091)
         self.assertEquals(stats["hypervisor_hostname"], 'compute1')
+        self.assertEquals(stats["cached_images"],
+                          ['356a192b7913b04c54574d18c28d46e6395428ab'])
 
 
 class NWFilterFakes:
@@ -3758,6 +3999,35 @@ disk size: 4.4M''', ''))
         finally:
             os.unlink(dst_path)
 
+    def test_copy_image_reflink(self):
+        commands = []
+
+        def fake_execute(*args, **kwargs):
+            commands.append(args)
+        self.stubs.Set(libvirt_utils, 'execute', fake_execute)
+
+        written = libvirt_utils.copy_image('/base/image', '/instance/disk')
+        self.assertEqual(written, 0)
+        self.assertEqual(commands, [('cp', '--reflink=always',
+                                     '/base/image', '/instance/disk')])
+
+    def test_copy_image_reflink_unsupported(self):
+        def fake_execute(*args, **kwargs):
+            if '--reflink=always' in args:
+                raise exception.ProcessExecutionError()
+            utils.execute(*args, **kwargs)
+        self.stubs.Set(libvirt_utils, 'execute', fake_execute)
+
+        with utils.tempdir() as tmpdir:
+            src_path = os.path.join(tmpdir, 'src')
+            dst_path = os.path.join(tmpdir, 'dst')
+            with open(src_path, 'w') as fp:
+                fp.write('canary')
+            written = libvirt_utils.copy_image(src_path, dst_path)
+            with open(dst_path, 'r') as fp:
+                self.assertEquals(fp.read(), 'canary')
+        self.assertTrue(written > 0)
+
     def test_write_to_file(self):
         dst_fd, dst_path = tempfile.mkstemp()
         try:
@@ -3869,12 +4139,69 @@ disk size: 4.4M''', ''))
         image_id = '4'
         user_id = 'fake'
         project_id = 'fake'
-        images.fetch_to_raw(context, image_id, target, user_id, project_id)
+        images.fetch_to_raw(context, image_id, target, user_id, project_id,
+                            peer_urls=None)
 
         self.mox.ReplayAll()
         libvirt_utils.fetch_image(context, target, image_id,
                                   user_id, project_id)
 
+    def test_fetch_image_from_peers(self):
+        self.flags(image_peers=['peer1', 'peer2', CONF.host, 'peer3'],
+                   image_peer_attempts=2,
+                   image_peer_url_template='http://%(host)s:8080/%(image)s')
+        self.stubs.Set(random, 'shuffle', lambda peers: peers.reverse())
+
+        with utils.tempdir() as tmpdir:
+            self.flags(instances_path=tmpdir)
+            target = os.path.join(tmpdir, CONF.base_dir_name, 'image')
+
+            self.mox.StubOutWithMock(images, 'fetch_to_raw')
+            images.fetch_to_raw(None, '4', target, 'fake', 'fake',
+                    peer_urls=['http://peer3:8080/image',
+                               'http://peer2:8080/image'])
+            self.mox.ReplayAll()
+
+            libvirt_utils.fetch_image(None, target, '4', 'fake', 'fake')
+
+    def test_fetch_image_outside_base_dir_skips_peers(self):
+        self.flags(image_peers=['peer1'])
+        self.mox.StubOutWithMock(images, 'fetch_to_raw')
+        images.fetch_to_raw(None, '4', '/tmp/targetfile', 'fake', 'fake',
+                            peer_urls=None)
+        self.mox.ReplayAll()
+
+        libvirt_utils.fetch_image(None, '/tmp/targetfile', '4',
+                                  'fake', 'fake')
+
+    def _test_fetch_image_stores_checksum(self, in_base_dir,
+                                          checksum_base_images=True):
+        with utils.tempdir() as tmpdir:
+            self.flags(instances_path=tmpdir,
+                       checksum_base_images=checksum_base_images)
+            base_dir = os.path.join(tmpdir, CONF.base_dir_name)
+            os.mkdir(base_dir)
+            if in_base_dir:
+                target = os.path.join(base_dir, 'image')
+            else:
+                target = os.path.join(tmpdir, 'image')
+            self.stubs.Set(images, 'fetch_to_raw',
+                           lambda *args, **kwargs: 'fakechecksum')
+            libvirt_utils.fetch_image(None, target, '4', 'fake', 'fake')
+            return libvirt_utils.read_stored_info(
+                    os.path.join(base_dir, 'image'), field='sha1')
+
+    def test_fetch_image_stores_checksum(self):
+        self.assertEqual('fakechecksum',
+                         self._test_fetch_image_stores_checksum(True))
+
+    def test_fetch_image_outside_base_dir_stores_nothing(self):
+        self.assertEqual(None, self._test_fetch_image_stores_checksum(False))
+
+    def test_fetch_image_without_checksums_stores_nothing(self):
+        self.assertEqual(None, self._test_fetch_image_stores_checksum(
+                True, checksum_base_images=False))
+
     def test_get_disk_backing_file(self):
         with_actual_path = False
 
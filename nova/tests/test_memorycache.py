@@ -0,0 +1,294 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the in-process memcache client."""
+
+import sys
+import threading
+import types
+
+import eventlet
+from eventlet import greenthread
+from eventlet import patcher
+
+from nova.common import memorycache
+from nova.openstack.common import timeutils
+from nova import test
+
+
+class MemorycacheTestCase(test.TestCase):
+    def setUp(self):
+        super(MemorycacheTestCase, self).setUp()
+        timeutils.set_time_override()
+        self.addCleanup(timeutils.clear_time_override)
+        self.client = memorycache.Client()
+
+    def test_get_set(self):
+        self.assertEqual(self.client.get('foo'), None)
+        self.assertTrue(self.client.set('foo', 'bar'))
+        self.assertEqual(self.client.get('foo'), 'bar')
+
+    def test_expiry(self):
+        self.client.set('foo', 'bar', time=10)
+        self.client.set('baz', 'qux')
+        timeutils.advance_time_seconds(9)
+        self.assertEqual(self.client.get('foo'), 'bar')
+        timeutils.advance_time_seconds(1)
+        self.assertEqual(self.client.get('foo'), None)
+        self.assertEqual(self.client.get('baz'), 'qux')
+        self.assertFalse('foo' in self.client.cache)
+
+    def test_set_extends_expiry(self):
+        self.client.set('foo', 'bar', time=10)
+        timeutils.advance_time_seconds(5)
+        self.client.set('foo', 'bar', time=10)
+        timeutils.advance_time_seconds(5)
+        self.assertEqual(self.client.get('foo'), 'bar')
+        timeutils.advance_time_seconds(5)
+        self.assertEqual(self.client.get('foo'), None)
+
+    def test_expiry_heap_is_compacted(self):
+        for i in range(1000):
+            self.client.set('foo', str(i), time=10 + i)
+        self.assertTrue(len(self.client._expiry) < 100)
+        self.assertEqual(self.client.get('foo'), '999')
+
+    def test_add(self):
+        self.assertTrue(self.client.add('foo', 'bar', time=10))
+        self.assertFalse(self.client.add('foo', 'baz'))
+        self.assertEqual(self.client.get('foo'), 'bar')
+        timeutils.advance_time_seconds(10)
+        self.assertTrue(self.client.add('foo', 'baz'))
+        self.assertEqual(self.client.get('foo'), 'baz')
+
+    def test_incr_keeps_expiry(self):
+        self.assertEqual(self.client.incr('foo'), None)
+        self.client.set('foo', '1', time=10)
+        self.assertEqual(self.client.incr('foo'), 2)
+        self.assertEqual(self.client.incr('foo', 3), 5)
+        self.assertEqual(self.client.get('foo'), '5')
+        timeutils.advance_time_seconds(10)
+        self.assertEqual(self.client.get('foo'), None)
+
+    def test_delete(self):
+        self.client.set('foo', 'bar')
+        self.client.delete('foo')
+        self.assertEqual(self.client.get('foo'), None)
+        self.client.delete('foo')
+
+    def test_multi(self):
+        self.assertEqual(self.client.set_multi({'a': 1, 'b': 2}, time=10,
+                                               key_prefix='x-'), [])
+        self.assertEqual(self.client.get('x-a'), 1)
+        self.assertEqual(self.client.get_multi(['a', 'b', 'c'],
+                                               key_prefix='x-'),
+                         {'a': 1, 'b': 2})
+        self.client.delete_multi(['a', 'c'], key_prefix='x-')
+        self.assertEqual(self.client.get_multi(['a', 'b'], key_prefix='x-'),
+                         {'b': 2})
+        timeutils.advance_time_seconds(10)
+        self.assertEqual(self.client.get_multi(['b'], key_prefix='x-'), {})
+
+    def test_gets_cas(self):
+        self.assertEqual(self.client.gets('foo'), None)
+        self.assertTrue(self.client.cas('foo', 'bar'))
+        self.assertEqual(self.client.gets('foo'), 'bar')
+        self.assertTrue(self.client.cas('foo', 'baz', time=10))
+        self.assertEqual(self.client.get('foo'), 'baz')
+        timeutils.advance_time_seconds(10)
+        self.assertEqual(self.client.get('foo'), None)
+
+    def test_cas_fails_if_changed(self):
+        self.client.set('foo', 'bar')
+        with self.client.reserve() as first:
+            with self.client.reserve() as second:
+                self.assertEqual(first.gets('foo'), 'bar')
+                self.assertEqual(second.gets('foo'), 'bar')
+                self.assertTrue(second.cas('foo', 'second'))
+                self.assertFalse(first.cas('foo', 'first'))
+        self.assertEqual(self.client.get('foo'), 'second')
+
+        self.assertEqual(self.client.gets('foo'), 'second')
+        self.client.incr('bar')
+        self.client.delete('foo')
+        self.client.set('foo', 'other')
+        self.assertFalse(self.client.cas('foo', 'third'))
+
+    def test_max_items_evicts_least_recently_used(self):
+        self.flags(memorycache_max_items=2)
+        self.client.set('a', 1)
+        self.client.set('b', 2)
+        self.client.get('a')
+        self.client.set('c', 3)
+        self.assertEqual(self.client.get('a'), 1)
+        self.assertEqual(self.client.get('b'), None)
+        self.assertEqual(self.client.get('c'), 3)
+
+
+class PooledClientTestCase(test.TestCase):
+    def setUp(self):
+        super(PooledClientTestCase, self).setUp()
+        self.stubs.Set(memorycache, '_POOLED_CLIENTS', {})
+        self.connections = []
+
+        # NOTE(pnavarro): each pooled connection is backed by an
+        # in-process cache standing in for a memcached server
+        def fake_memcache_client(servers):
+            self.assertEqual(servers, ['127.0.0.1:11211'])
+            self.connections.append(memorycache.Client())
+            return self.connections[-1]
+
+        self.stubs.Set(memorycache, '_memcache_client', fake_memcache_client)
+
+    def test_get_client(self):
+        self.assertTrue(isinstance(memorycache.get_client(),
+                                   memorycache.Client))
+        self.assertFalse(memorycache.get_client() is
+                         memorycache.get_client())
+
+        self.flags(memcached_servers=['127.0.0.1:11211'])
+        client = memorycache.get_client()
+        self.assertTrue(isinstance(client, memorycache.PooledClient))
+        self.assertTrue(memorycache.get_client() is client)
+
+    def test_connections_are_reused(self):
+        client = memorycache.PooledClient(['127.0.0.1:11211'])
+        client.set('foo', 'bar')
+        self.assertEqual(client.get('foo'), 'bar')
+        client.set_multi({'a': '1', 'b': '2'}, key_prefix='x-')
+        self.assertEqual(client.incr('x-a'), 2)
+        self.assertEqual(client.get_multi(['a', 'b'], key_prefix='x-'),
+                         {'a': '2', 'b': '2'})
+        client.delete_multi(['a'], key_prefix='x-')
+        self.assertEqual(client.get('x-a'), None)
+        self.assertEqual(len(self.connections), 1)
+
+    def test_errors_are_raised_to_the_caller(self):
+        client = memorycache.PooledClient(['127.0.0.1:11211'])
+        client.set('foo', 'bar')
+        self.assertRaises(ValueError, client.incr, 'foo')
+        self.assertEqual(client.get('foo'), 'bar')
+
+    def test_client_creation_errors_are_raised_to_the_caller(self):
+        def fail_memcache_client(servers):
+            raise ImportError('No module named memcache')
+
+        self.stubs.Set(memorycache, '_memcache_client', fail_memcache_client)
+        client = memorycache.PooledClient(['127.0.0.1:11211'])
+        self.assertRaises(ImportError, client.get, 'foo')
+
+    def test_pool_size(self):
+        self.flags(memcached_pool_size=2)
+        client = memorycache.PooledClient(['127.0.0.1:11211'])
+        with client._pool.item():
+            with client._pool.item():
+                self.assertEqual(client._pool.free(), 0)
+        self.assertEqual(client._pool.current_size, 2)
+
+    def test_stats(self):
+        client = memorycache.PooledClient(['127.0.0.1:11211'])
+        client.get('foo')
+        client.get('bar')
+        client.delete('foo')
+        self.assertEqual(client.stats['get']['calls'], 2)
+        self.assertEqual(client.stats['delete']['calls'], 1)
+        self.assertTrue(client.stats['get']['seconds'] >= 0)
+
+    def test_reserve(self):
+        self.flags(memcached_pool_size=2)
+        client = memorycache.PooledClient(['127.0.0.1:11211'])
+        client.set('foo', 'bar')
+        with client.reserve() as reserved:
+            self.assertEqual(client._pool.free(), 1)
+            self.assertEqual(reserved.gets('foo'), 'bar')
+            self.assertTrue(reserved.cas('foo', 'baz'))
+        self.assertEqual(client.get('foo'), 'baz')
+        self.assertEqual(client.stats['gets']['calls'], 1)
+        self.assertEqual(client.stats['cas']['calls'], 1)
+
+    def test_stats_are_logged(self):
+        logged = []
+
+        def fake_debug(msg, *args):
+            if args and 'operation' in args[0]:
+                logged.append(args[0])
+
+        self.stubs.Set(memorycache.LOG, 'debug', fake_debug)
+        client = memorycache.PooledClient(['127.0.0.1:11211'])
+        client.get('foo')
+        self.assertEqual(logged, [])
+
+        client._last_stats_log -= client.STATS_LOG_INTERVAL
+        client.get('foo')
+        client.get('foo')
+        self.assertEqual([(values['operation'], values['calls'])
+                          for values in logged], [('get', 2)])
+
+
+class MemcacheConnectionTestCase(test.TestCase):
+    """Runs pooled clients against a python-memcache stand-in whose
+    clients are threading.local objects, like the real ones."""
+
+    def setUp(self):
+        super(MemcacheConnectionTestCase, self).setUp()
+        self.stubs.Set(memorycache, '_POOLED_CLIENTS', {})
+        self.flags(memcached_pool_size=1)
+        self.addCleanup(sys.modules.pop, 'memcache', None)
+
+    def _stub_memcache(self, local):
+        connections = []
+
+        class FakeMemcacheClient(local):
+            def __init__(self, servers, debug=0, cache_cas=False):
+                self.cache = memorycache.Client()
+                connections.append(greenthread.getcurrent())
+
+            def get(self, key):
+                return self.cache.get(key)
+
+            def set(self, key, value, time=0, min_compress_len=0):
+                return self.cache.set(key, value, time=time)
+
+        memcache = types.ModuleType('memcache')
+        memcache.Client = FakeMemcacheClient
+        sys.modules['memcache'] = memcache
+        return connections
+
+    def _test_connection_is_kept(self, local):
+        connections = self._stub_memcache(local)
+        client = memorycache.PooledClient(['127.0.0.1:11211'])
+        client.set('foo', 'bar')
+
+        values = []
+        pool = eventlet.GreenPool()
+        for i in range(5):
+            pool.spawn_n(lambda: values.append(client.get('foo')))
+        pool.waitall()
+
+        self.assertEqual(values, ['bar'] * 5)
+        # NOTE(pnavarro): every thread using a local gets its own state,
+        # that is its own memcached connections
+        self.assertEqual(len(set(connections)), 1)
+
+    def test_connection_is_kept(self):
+        self._test_connection_is_kept(patcher.original('threading').local)
+
+    def test_connection_is_kept_monkey_patched(self):
+        # NOTE(pnavarro): the test runner has patched threading, so this
+        # local is a green one
+        self.assertTrue(patcher.is_monkey_patched('thread'))
+        self._test_connection_is_kept(threading.local)
@@ -31,10 +31,13 @@ from nova import block_device
 from nova import db
 from nova.db.sqlalchemy import api
 from nova import exception
+from nova import metadata_cache
 from nova.network import api as network_api
+from nova.network import model as network_model
 from nova.openstack.common import cfg
 from nova import test
 from nova.tests import fake_network
+from nova.tests import fake_network_cache_model
 
 CONF = cfg.CONF
 
@@ -86,7 +89,7 @@ def fake_request(stubs, mdinst, relpath, address="127.0.0.1",
                  fake_get_metadata=None, headers=None):
 
     def get_metadata(address):
-        return mdinst
+        return mdinst.render()
 
     app = handler.MetadataRequestHandler()
 
@@ -235,6 +238,32 @@ class MetadataTestCase(test.TestCase):
         self.assertTrue(md._check_version('2009-04-04', '2009-04-04'))
 
 
+    def test_render_matches_lookup(self):
+        inst = copy(self.instance)
+        content = [('/etc/my.conf', "content of my.conf")]
+        md = fake_InstanceMetadata(self.stubs, inst, content=content)
+
+        documents = md.render()
+        for path, document in documents.iteritems():
+            self.assertEqual(document, base.ec2_md_print(md.lookup(path)))
+
+        for path in ("/2009-04-04/meta-data/public-keys/0/openssh-key",
+                     "/latest/user-data",
+                     "/openstack/latest/meta_data.json",
+                     "/openstack/content/0000"):
+            self.assertTrue(base.normalize_path(path) in documents)
+        self.assertFalse("/ec2/9999-99-99" in documents)
+        self.assertFalse("/openstack/content" in documents)
+
+    def test_normalize_path(self):
+        self.assertEqual(base.normalize_path(""), "/ec2")
+        self.assertEqual(base.normalize_path("/foo/../"), "/ec2")
+        self.assertEqual(base.normalize_path("latest/meta-data/"),
+                         "/ec2/latest/meta-data")
+        self.assertEqual(base.normalize_path("/openstack/latest/"),
+                         "/openstack/latest")
+
+
 class OpenStackMetadataTestCase(test.TestCase):
     def setUp(self):
         super(OpenStackMetadataTestCase, self).setUp()
@@ -383,7 +412,7 @@ class MetadataHandlerTestCase(test.TestCase):
 
         def fake_get_metadata(address):
             if address == expected_addr:
-                return self.mdinst
+                return self.mdinst.render()
             else:
                 raise Exception("Expected addr of %s, got %s" %
                                 (expected_addr, address))
@@ -405,3 +434,44 @@ class MetadataHandlerTestCase(test.TestCase):
                                 fake_get_metadata=fake_get_metadata,
                                 headers=None)
         self.assertEqual(response.status_int, 500)
+
+    def test_get_metadata_caches_documents(self):
+        self.stubs.Set(metadata_cache, '_CLIENT', None)
+        calls = []
+
+        def fake_get_metadata_by_address(address):
+            calls.append(address)
+            return self.mdinst
+
+        self.stubs.Set(base, 'get_metadata_by_address',
+                       fake_get_metadata_by_address)
+
+        for i in range(2):
+            response = fake_request(None, self.mdinst,
+                                    relpath="/2009-04-04/user-data",
+                                    address="192.168.1.1")
+            self.assertEqual(response.body,
+                             base64.b64decode(self.instance['user_data']))
+        self.assertEqual(calls, ["192.168.1.1"])
+
+        metadata_cache.invalidate("192.168.1.1")
+        fake_request(None, self.mdinst, relpath="/2009-04-04/user-data",
+                     address="192.168.1.1")
+        self.assertEqual(calls, ["192.168.1.1", "192.168.1.1"])
+
+    def test_invalidate_instance(self):
+        self.stubs.Set(metadata_cache, '_CLIENT', None)
+        vif = fake_network_cache_model.new_vif()
+        nw_info = network_model.NetworkInfo([vif])
+        addresses = [ip['address'] for ip in nw_info.fixed_ips()]
+        for address in addresses + ['10.0.0.1']:
+            metadata_cache.set_documents(address, {'/ec2': 'latest'})
+
+        instance = dict(self.instance,
+                        info_cache={'network_info': nw_info.json()})
+        metadata_cache.invalidate_instance(instance)
+
+        for address in addresses:
+            self.assertEqual(metadata_cache.get_documents(address), None)
+        self.assertEqual(metadata_cache.get_documents('10.0.0.1'),
+                         {'/ec2': 'latest'})
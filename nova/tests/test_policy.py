@@ -62,6 +62,21 @@ class PolicyFileTestCase(test.TestCase):
             self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
                               self.context, action, self.target)
 
+    def test_policy_file_checked_on_interval(self):
+        with utils.tempdir() as tmpdir:
+            tmpfilename = os.path.join(tmpdir, 'policy')
+            self.flags(policy_file=tmpfilename,
+                       policy_file_check_interval=3600)
+            policy.reset()
+
+            with open(tmpfilename, "w") as policyfile:
+                policyfile.write("""{"example:test": ""}""")
+            policy.init()
+
+            self.mox.StubOutWithMock(os.path, 'getmtime')
+            self.mox.ReplayAll()
+            policy.init()
+
 
 class PolicyTestCase(test.TestCase):
     def setUp(self):
@@ -160,6 +175,45 @@ class PolicyTestCase(test.TestCase):
         policy.enforce(admin_context, lowercase_action, self.target)
         policy.enforce(admin_context, uppercase_action, self.target)
 
+    def test_enforce_remembers_decisions(self):
+        calls = []
+        real_check = common_policy.check
+
+        def fake_check(*args, **kwargs):
+            calls.append(args[0])
+            return real_check(*args, **kwargs)
+        self.stubs.Set(common_policy, 'check', fake_check)
+
+        target = {'project_id': 'fake'}
+        for x in xrange(3):
+            policy.enforce(self.context, "example:my_file", target)
+        self.assertEqual(calls, ["example:my_file"])
+
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, "example:my_file",
+                          {'project_id': 'another'})
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, "example:my_file",
+                          {'project_id': 'another'})
+        self.assertEqual(len(calls), 2)
+
+    def test_enforce_forgets_decisions_on_new_rules(self):
+        policy.enforce(self.context, "example:allowed", self.target)
+        common_policy.set_rules(common_policy.Rules(
+                {"example:allowed": common_policy.parse_rule("!")}))
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, "example:allowed", self.target)
+
+    def test_enforce_unhashable_target(self):
+        target = {'project_id': 'fake', 'instance': object()}
+        policy.enforce(self.context, "example:my_file", target)
+        policy.enforce(self.context, "example:my_file", target)
+
+    def test_enforce_falsy_result_raises(self):
+        self.stubs.Set(common_policy, 'check', lambda *args: None)
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, "example:allowed", self.target)
+
 
 class DefaultPolicyTestCase(test.TestCase):
 
@@ -725,6 +725,16 @@ class ComputeDriver(object):
         """
         pass
 
+    def prefetch_images(self, context, image_ids):
+        """
+        Download images into the driver's local image cache.
+
+        This lets a host be warmed up with popular images before instances
+        using them are scheduled to it. Drivers without an image cache can
+        ignore this.
+        """
+        pass
+
     def add_to_aggregate(self, context, aggregate, host, **kwargs):
         """Add a compute host to an aggregate."""
         #NOTE(jogo) Currently only used for XenAPI-Pool
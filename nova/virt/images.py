@@ -21,8 +21,11 @@
 Handling of VM disk images.
 """
 
+import hashlib
+import httplib
 import os
 import re
+import urllib2
 
 from nova import exception
 from nova.image import glance
@@ -37,11 +40,21 @@ image_opts = [
     cfg.BoolOpt('force_raw_images',
                 default=True,
                 help='Force backing images to raw format'),
+    cfg.IntOpt('image_peer_timeout',
+               default=10,
+               help='Timeout in seconds for connecting to and reading from '
+                    'a peer serving a cached image'),
 ]
 
 CONF = cfg.CONF
 CONF.register_opts(image_opts)
 
+# NOTE(pnavarro): parsed qemu-img info results, keyed by path. Each entry
+#                 remembers the (inode, size, mtime) of the file it was
+#                 made from, so a replaced or modified file is re-read.
+_QEMU_IMG_INFO_CACHE = {}
+_QEMU_IMG_INFO_CACHE_SIZE = 1024
+
 
 class QemuImgInfo(object):
     BACKING_FILE_RE = re.compile((r"^(.*?)\s*\(actual\s+path\s*:"
@@ -174,11 +187,36 @@ class QemuImgInfo(object):
         return contents
 
 
+def _file_stamp(path):
+    """Return what identifies the current contents of path, or None."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime)
+
+
 def qemu_img_info(path):
-    """Return a object containing the parsed output from qemu-img info."""
+    """Return a object containing the parsed output from qemu-img info.
+
+    Results are cached for as long as the file keeps the same inode,
+    size and modification time.
+    """
+    stamp = _file_stamp(path)
+    if stamp is not None:
+        cached = _QEMU_IMG_INFO_CACHE.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
     out, err = utils.execute('env', 'LC_ALL=C', 'LANG=C',
                              'qemu-img', 'info', path)
-    return QemuImgInfo(out)
+    info = QemuImgInfo(out)
+
+    if stamp is not None and stamp == _file_stamp(path):
+        if len(_QEMU_IMG_INFO_CACHE) >= _QEMU_IMG_INFO_CACHE_SIZE:
+            _QEMU_IMG_INFO_CACHE.clear()
+        _QEMU_IMG_INFO_CACHE[path] = (stamp, info)
+    return info
 
 
 def convert_image(source, dest, out_format):
@@ -187,21 +225,129 @@ def convert_image(source, dest, out_format):
     utils.execute(*cmd)
 
 
-def fetch(context, image_href, path, _user_id, _project_id):
+class _ChecksummingWriter(object):
+    """Wraps a file so everything written to it also updates a checksum."""
+
+    def __init__(self, data, checksum):
+        self._data = data
+        self._checksum = checksum
+
+    def write(self, chunk):
+        self._checksum.update(chunk)
+        self._data.write(chunk)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        """Skip over offset zero bytes, leaving a hole in the file.
+
+        Downloads seek over zero filled chunks to keep images sparse, so
+        only forward relative seeks are supported.
+        """
+        if whence != os.SEEK_CUR or offset < 0:
+            raise IOError(_('Only forward relative seeks are supported'))
+        self._checksum.update('\0' * offset)
+        self._data.seek(offset, whence)
+
+    def __getattr__(self, name):
+        return getattr(self._data, name)
+
+
+def _fetch_from_peer(url, path, image_meta):
+    """Download an image served by a peer host to path.
+
+    The copy is only kept if its MD5 matches the image service's metadata
+    for the image. Returns the SHA1 checksum of the data as hex, or None if
+    the peer could not provide a valid copy.
+    """
+    try:
+        response = urllib2.urlopen(url, timeout=CONF.image_peer_timeout)
+    except (IOError, httplib.HTTPException), e:
+        LOG.debug(_('Image not available from peer %(url)s: %(e)s') % locals())
+        return None
+
+    try:
+        # NOTE(pnavarro): peers usually serve images they converted to
+        #                 raw, which can never match the checksum of an
+        #                 image stored in another format, so reject any copy
+        #                 of the wrong size before downloading it.
+        length = response.info().getheader('Content-Length')
+        if length is not None and int(length) != image_meta['size']:
+            LOG.debug(_('Image at peer %(url)s has a different size, '
+                        'ignoring it') % locals())
+            return None
+
+        checksum = hashlib.sha1()
+        md5 = hashlib.md5()
+        with utils.remove_path_on_error(path):
+            with open(path, "wb") as image_file:
+                writer = _ChecksummingWriter(
+                    _ChecksummingWriter(image_file, checksum), md5)
+                for chunk in iter(lambda: response.read(65536), ''):
+                    writer.write(chunk)
+    except (IOError, httplib.HTTPException), e:
+        LOG.warn(_('Failed to download image from peer %(url)s: %(e)s')
+                 % locals())
+        return None
+    finally:
+        response.close()
+
+    if md5.hexdigest() != image_meta['checksum']:
+        LOG.warn(_('Image from peer %(url)s failed checksum validation')
+                 % locals())
+        os.unlink(path)
+        return None
+
+    return checksum.hexdigest()
+
+
+def fetch(context, image_href, path, _user_id, _project_id, peer_urls=None):
+    """Download an image to path.
+
+    peer_urls optionally lists URLs where other compute hosts serve a copy
+    of the image. They are tried in order before falling back to the image
+    service.
+
+    Returns the SHA1 checksum of the downloaded data as hex, computed while
+    the data is written.
+    """
     # TODO(vish): Improve context handling and add owner and auth data
     #             when it is added to glance.  Right now there is no
     #             auth checking in glance, so we assume that access was
     #             checked before we got here.
     (image_service, image_id) = glance.get_remote_image_service(context,
                                                                 image_href)
+    if peer_urls:
+        # NOTE(pnavarro): a copy from a peer is validated against the MD5
+        # the image service recorded at upload time, so images without one
+        # always come from the image service.
+        image_meta = image_service.show(context, image_id)
+        if image_meta.get('checksum') and image_meta.get('size'):
+            for url in peer_urls:
+                checksum = _fetch_from_peer(url, path, image_meta)
+                if checksum:
+                    LOG.debug(_('Fetched image %(image_href)s from peer '
+                                '%(url)s') % locals())
+                    return checksum
+
+    checksum = hashlib.sha1()
     with utils.remove_path_on_error(path):
         with open(path, "wb") as image_file:
-            image_service.download(context, image_id, image_file)
+            image_service.download(context, image_id,
+                                   _ChecksummingWriter(image_file, checksum))
+    return checksum.hexdigest()
+
+
+def fetch_to_raw(context, image_href, path, user_id, project_id,
+                 peer_urls=None):
+    """Download an image to path, converting it to raw if required.
 
+    peer_urls is passed on to fetch().
 
-def fetch_to_raw(context, image_href, path, user_id, project_id):
+    Returns the SHA1 checksum of the file at path as hex, or None if the
+    image had to be converted and so was never checksummed.
+    """
     path_tmp = "%s.part" % path
-    fetch(context, image_href, path_tmp, user_id, project_id)
+    checksum = fetch(context, image_href, path_tmp, user_id, project_id,
+                     peer_urls=peer_urls)
 
     with utils.remove_path_on_error(path_tmp):
         data = qemu_img_info(path_tmp)
@@ -230,6 +376,8 @@ def fetch_to_raw(context, image_href, path, user_id, project_id):
                         data.file_format)
 
                 os.rename(staged, path)
+                return None
 
         else:
             os.rename(path_tmp, path)
+            return checksum
@@ -48,6 +48,7 @@ import os
 import shutil
 import sys
 import tempfile
+import time
 import uuid
 
 from eventlet import greenthread
@@ -180,6 +181,19 @@ libvirt_opts = [
                default='$instances_path/snapshots',
                help='Location where libvirt driver will store snapshots '
                     'before uploading them to image service'),
+    cfg.BoolOpt('libvirt_snapshot_streaming',
+                default=False,
+                help='Upload snapshots that need no conversion (raw disks '
+                     'snapshotted as raw) from a copy-on-write clone of the '
+                     'instance disk instead of copying them to '
+                     'libvirt_snapshots_directory first. Needs a filesystem '
+                     'that can clone files (reflink)'),
+    cfg.IntOpt('disk_available_least_refresh_interval',
+               default=600,
+               help='Seconds between full rescans of every instance disk '
+                    'when computing disk_available_least. In between, '
+                    'only instances that were created, resized or '
+                    'destroyed are rescanned'),
     cfg.StrOpt('xen_hvmloader_path',
                 default='/usr/lib/xen/boot/hvmloader',
                 help='Location where the Xen hvmloader is kept'),
@@ -296,6 +310,9 @@ class LibvirtDriver(driver.ComputeDriver):
         self.default_last_device = self._disk_prefix + 'z'
 
         self._disk_cachemode = None
+        self._disk_over_commit = {}
+        self._disk_over_commit_refreshed = 0
+        self._domain_trees = {}
         self.image_cache_manager = imagecache.ImageCacheManager()
         self.image_backend = imagebackend.Backend(CONF.use_cow_images)
 
@@ -434,6 +451,7 @@ class LibvirtDriver(driver.ComputeDriver):
             except libvirt.libvirtError:
                 # Instance was deleted while listing... ignore it
                 pass
+        self._prune_domain_trees(names)
         return names
 
     def plug_vifs(self, instance, network_info):
@@ -501,6 +519,7 @@ class LibvirtDriver(driver.ComputeDriver):
         self._cleanup(instance, network_info, block_device_info)
 
     def _undefine_domain(self, instance):
+        self._forget_domain_tree(instance['name'])
         try:
             virt_dom = self._lookup_by_name(instance['name'])
         except exception.NotFound:
@@ -533,6 +552,7 @@ class LibvirtDriver(driver.ComputeDriver):
 
     def _cleanup(self, instance, network_info, block_device_info):
         self._undefine_domain(instance)
+        self._forget_disk_over_commit(instance)
         self.unplug_vifs(instance, network_info)
         try:
             self.firewall_driver.unfilter_instance(instance,
@@ -638,6 +658,7 @@ class LibvirtDriver(driver.ComputeDriver):
     @exception.wrap_exception()
     def attach_volume(self, connection_info, instance_name, mountpoint):
         virt_dom = self._lookup_by_name(instance_name)
+        self._forget_domain_tree(instance_name)
         mount_device = mountpoint.rpartition("/")[2]
         conf = self.volume_driver_method('connect_volume',
                                          connection_info,
@@ -651,6 +672,7 @@ class LibvirtDriver(driver.ComputeDriver):
             # attachDevice()
             domxml = virt_dom.XMLDesc(libvirt.VIR_DOMAIN_XML_SECURE)
             self._conn.defineXML(domxml)
+            self._forget_domain_tree(instance_name)
         else:
             try:
                 # NOTE(vish): We can always affect config because our
@@ -674,6 +696,8 @@ class LibvirtDriver(driver.ComputeDriver):
                     self.volume_driver_method('disconnect_volume',
                                                connection_info,
                                                mount_device)
+            finally:
+                self._forget_domain_tree(instance_name)
 
     @staticmethod
     def _get_disk_xml(xml, device):
@@ -701,6 +725,7 @@ class LibvirtDriver(driver.ComputeDriver):
     @exception.wrap_exception()
     def detach_volume(self, connection_info, instance_name, mountpoint):
         mount_device = mountpoint.rpartition("/")[2]
+        self._forget_domain_tree(instance_name)
         try:
             virt_dom = self._lookup_by_name(instance_name)
             xml = self._get_disk_xml(virt_dom.XMLDesc(0), mount_device)
@@ -733,6 +758,8 @@ class LibvirtDriver(driver.ComputeDriver):
                 LOG.warn(_("During detach_volume, instance disappeared."))
             else:
                 raise
+        finally:
+            self._forget_domain_tree(instance_name)
 
         self.volume_driver_method('disconnect_volume',
                                   connection_info,
@@ -863,6 +890,27 @@ class LibvirtDriver(driver.ComputeDriver):
 
         snapshot.create()
 
+        # NOTE(pnavarro): a snapshot that is already in the wanted format
+        #                 can be cloned and handed to the image service as
+        #                 it is, so no local copy of the whole disk is
+        #                 written and the instance runs during the upload.
+        image_file = None
+        if CONF.libvirt_snapshot_streaming:
+            try:
+                image_file = snapshot.stream(image_format)
+            except Exception:
+                with excutils.save_and_reraise_exception():
+                    self._finish_snapshot(snapshot, virt_dom, state)
+
+        if image_file is not None:
+            with image_file as data:
+                self._finish_snapshot(snapshot, virt_dom, state)
+                image_service.update(context,
+                                     image_href,
+                                     metadata,
+                                     data)
+            return
+
         # Export the snapshot to a raw image
         snapshot_directory = CONF.libvirt_snapshots_directory
         fileutils.ensure_tree(snapshot_directory)
@@ -871,12 +919,7 @@ class LibvirtDriver(driver.ComputeDriver):
                 out_path = os.path.join(tmpdir, snapshot_name)
                 snapshot.extract(out_path, image_format)
             finally:
-                snapshot.delete()
-                # NOTE(dkang): because previous managedSave is not called
-                #              for LXC, _create_domain must not be called.
-                if CONF.libvirt_type != 'lxc':
-                    if state == power_state.RUNNING:
-                        self._create_domain(domain=virt_dom)
+                self._finish_snapshot(snapshot, virt_dom, state)
 
             # Upload that image to the image service
             with libvirt_utils.file_open(out_path) as image_file:
@@ -885,6 +928,15 @@ class LibvirtDriver(driver.ComputeDriver):
                                      metadata,
                                      image_file)
 
+    def _finish_snapshot(self, snapshot, virt_dom, state):
+        """Drop the snapshot and resume a domain suspended for it."""
+        snapshot.delete()
+        # NOTE(dkang): because previous managedSave is not called
+        #              for LXC, _create_domain must not be called.
+        if CONF.libvirt_type != 'lxc':
+            if state == power_state.RUNNING:
+                self._create_domain(domain=virt_dom)
+
     @exception.wrap_exception()
     def reboot(self, instance, network_info, reboot_type='SOFT',
                block_device_info=None):
@@ -1127,8 +1179,7 @@ class LibvirtDriver(driver.ComputeDriver):
     @exception.wrap_exception()
     def get_console_output(self, instance):
         virt_dom = self._lookup_by_name(instance['name'])
-        xml = virt_dom.XMLDesc(0)
-        tree = etree.fromstring(xml)
+        tree = self._get_domain_tree(instance['name'], virt_dom)
 
         console_types = {}
 
@@ -1195,13 +1246,11 @@ class LibvirtDriver(driver.ComputeDriver):
     def get_vnc_console(self, instance):
         def get_vnc_port_for_instance(instance_name):
             virt_dom = self._lookup_by_name(instance_name)
-            xml = virt_dom.XMLDesc(0)
-            # TODO(sleepsonthefloor): use etree instead of minidom
-            dom = minidom.parseString(xml)
+            tree = self._get_domain_tree(instance_name, virt_dom)
 
-            for graphic in dom.getElementsByTagName('graphics'):
-                if graphic.getAttribute('type') == 'vnc':
-                    return graphic.getAttribute('port')
+            for graphic in tree.getiterator('graphics'):
+                if graphic.get('type') == 'vnc':
+                    return graphic.get('port')
 
         port = get_vnc_port_for_instance(instance['name'])
         host = CONF.vncserver_proxyclient_address
@@ -1901,6 +1950,7 @@ class LibvirtDriver(driver.ComputeDriver):
         """
         if xml:
             domain = self._conn.defineXML(xml)
+        self._forget_domain_tree(domain.name())
         domain.createWithFlags(launch_flags)
         self._enable_hairpin(domain.XMLDesc(0))
         return domain
@@ -1923,9 +1973,39 @@ class LibvirtDriver(driver.ComputeDriver):
         self.firewall_driver.setup_basic_filtering(instance, network_info)
         self.firewall_driver.prepare_instance_filter(instance, network_info)
         domain = self._create_domain(xml)
+        self._forget_disk_over_commit(instance)
         self.firewall_driver.apply_instance_filter(instance, network_info)
         return domain
 
+    def _get_domain_tree(self, instance_name, virt_dom):
+        """Return the parsed XML description of a domain.
+
+        The tree of a running domain is reused until the domain gets a
+        new id, or is defined, started, or has a device attached or
+        detached through this driver, so callers must not modify it.
+        Domains that are not running can be redefined at any time, so
+        their trees are never reused.
+        """
+        dom_id = virt_dom.ID()
+        cached = self._domain_trees.get(instance_name)
+        if cached is not None and cached[0] == dom_id:
+            return cached[1]
+
+        tree = etree.fromstring(virt_dom.XMLDesc(0))
+        if dom_id == -1:
+            self._forget_domain_tree(instance_name)
+        else:
+            self._domain_trees[instance_name] = (dom_id, tree)
+        return tree
+
+    def _forget_domain_tree(self, instance_name):
+        self._domain_trees.pop(instance_name, None)
+
+    def _prune_domain_trees(self, running_names):
+        """Drop the trees of domains that are no longer running."""
+        for instance_name in set(self._domain_trees) - set(running_names):
+            self._forget_domain_tree(instance_name)
+
     def get_all_block_devices(self):
         """
         Return all block devices in use on this node.
@@ -1953,10 +2033,9 @@ class LibvirtDriver(driver.ComputeDriver):
         Returns a list of all block devices for this domain.
         """
         domain = self._lookup_by_name(instance_name)
-        xml = domain.XMLDesc(0)
 
         try:
-            doc = etree.fromstring(xml)
+            doc = self._get_domain_tree(instance_name, domain)
         except Exception:
             return []
 
@@ -2668,6 +2747,7 @@ class LibvirtDriver(driver.ComputeDriver):
             # included in to_xml() result.
             dom = self._lookup_by_name(instance_ref["name"])
             self._conn.defineXML(dom.XMLDesc(0))
+            self._forget_domain_tree(instance_ref["name"])
 
     def get_instance_disk_info(self, instance_name):
         """Preparation block migration.
@@ -2688,8 +2768,7 @@ class LibvirtDriver(driver.ComputeDriver):
         disk_info = []
 
         virt_dom = self._lookup_by_name(instance_name)
-        xml = virt_dom.XMLDesc(0)
-        doc = etree.fromstring(xml)
+        doc = self._get_domain_tree(instance_name, virt_dom)
         disk_nodes = doc.findall('.//devices/disk')
         path_nodes = doc.findall('.//devices/disk/source')
         driver_nodes = doc.findall('.//devices/disk/driver')
@@ -2735,32 +2814,64 @@ class LibvirtDriver(driver.ComputeDriver):
         # available size of the disk
         dk_sz_gb = self.get_local_gb_total() - self.get_local_gb_used()
 
+        # NOTE(pnavarro): the over commit of each instance is cached and
+        #                 only recomputed for instances that changed, plus
+        #                 a full rescan every
+        #                 disk_available_least_refresh_interval seconds.
+        #                 Guests only ever fill their disks in between, so
+        #                 a stale value errs on the side of less space.
+        now = time.time()
+        interval = CONF.disk_available_least_refresh_interval
+        if now - self._disk_over_commit_refreshed >= interval:
+            self._disk_over_commit = {}
+            self._disk_over_commit_refreshed = now
+
         # Disk size that all instance uses : virtual_size - disk_size
         instances_name = self.list_instances()
         instances_sz = 0
         for i_name in instances_name:
-            try:
-                disk_infos = jsonutils.loads(
-                        self.get_instance_disk_info(i_name))
-                for info in disk_infos:
-                    i_vt_sz = int(info['virt_disk_size'])
-                    i_dk_sz = int(info['disk_size'])
-                    instances_sz += i_vt_sz - i_dk_sz
-            except OSError as e:
-                if e.errno == errno.ENOENT:
-                    LOG.error(_("Getting disk size of %(i_name)s: %(e)s") %
-                              locals())
-                else:
-                    raise
-            except exception.InstanceNotFound:
-                # Instance was deleted during the check so ignore it
-                pass
-            # NOTE(gtt116): give change to do other task.
-            greenthread.sleep(0)
+            if i_name not in self._disk_over_commit:
+                over_commit = self._get_instance_disk_over_commit(i_name)
+                if over_commit is None:
+                    continue
+                self._disk_over_commit[i_name] = over_commit
+                # NOTE(gtt116): give change to do other task.
+                greenthread.sleep(0)
+            instances_sz += self._disk_over_commit[i_name]
+
+        for i_name in set(self._disk_over_commit) - set(instances_name):
+            del self._disk_over_commit[i_name]
+
         # Disk available least size
         available_least_size = dk_sz_gb * (1024 ** 3) - instances_sz
         return (available_least_size / 1024 / 1024 / 1024)
 
+    def _get_instance_disk_over_commit(self, i_name):
+        """Return virtual minus actual disk size of an instance in bytes.
+
+        Returns None if the instance or its disks disappeared meanwhile.
+        """
+        try:
+            disk_infos = jsonutils.loads(self.get_instance_disk_info(i_name))
+        except OSError as e:
+            if e.errno == errno.ENOENT:
+                LOG.error(_("Getting disk size of %(i_name)s: %(e)s") %
+                          locals())
+                return None
+            raise
+        except exception.InstanceNotFound:
+            # Instance was deleted during the check so ignore it
+            return None
+
+        over_commit = 0
+        for info in disk_infos:
+            over_commit += int(info['virt_disk_size']) - int(info['disk_size'])
+        return over_commit
+
+    def _forget_disk_over_commit(self, instance):
+        """Have the next disk_available_least pass rescan an instance."""
+        self._disk_over_commit.pop(instance['name'], None)
+
     def unfilter_instance(self, instance_ref, network_info):
         """See comments of same method in firewall_driver."""
         self.firewall_driver.unfilter_instance(instance_ref,
@@ -2796,6 +2907,19 @@ class LibvirtDriver(driver.ComputeDriver):
         """Manage the local cache of images."""
         self.image_cache_manager.verify_base_images(context, all_instances)
 
+    def prefetch_images(self, context, image_ids):
+        """Download images into the local image cache."""
+        for image_id in image_ids:
+            try:
+                if self.image_cache_manager.prefetch_image(context, image_id):
+                    LOG.info(_('Prefetched image %s'), image_id)
+            except Exception:
+                LOG.exception(_('Failed to prefetch image %s'), image_id)
+
+    def get_cached_images(self):
+        """Return the fingerprints of the images in the local image cache."""
+        return self.image_cache_manager.list_cached_images()
+
     def _cleanup_remote_migration(self, dest, inst_base, inst_base_resize):
         """Used only for cleanup in case migrate_disk_and_power_off fails"""
         try:
@@ -2816,6 +2940,7 @@ class LibvirtDriver(driver.ComputeDriver):
         disk_info = jsonutils.loads(disk_info_text)
 
         self.power_off(instance)
+        self._forget_disk_over_commit(instance)
 
         block_device_mapping = driver.block_device_info_get_mapping(
             block_device_info)
@@ -2947,12 +3072,12 @@ class LibvirtDriver(driver.ComputeDriver):
         self._cleanup_resize(instance, network_info)
 
     def get_diagnostics(self, instance):
-        def get_io_devices(xml_doc):
+        def get_io_devices(instance_name, domain):
             """ get the list of io devices from the
             xml document."""
             result = {"volumes": [], "ifaces": []}
             try:
-                doc = etree.fromstring(xml_doc)
+                doc = self._get_domain_tree(instance_name, domain)
             except Exception:
                 return result
             blocks = [('./devices/disk', 'volumes'),
@@ -2977,8 +3102,7 @@ class LibvirtDriver(driver.ComputeDriver):
         except libvirt.libvirtError:
             pass
         # get io status
-        xml = domain.XMLDesc(0)
-        dom_io = get_io_devices(xml)
+        dom_io = get_io_devices(instance['name'], domain)
         for disk in dom_io["volumes"]:
             try:
                 # blockStats might launch an exception if the method
@@ -3073,6 +3197,7 @@ class HostState(object):
         data["hypervisor_hostname"] = self.connection.get_hypervisor_hostname()
         data["supported_instances"] = \
             self.connection.get_instance_capabilities()
+        data["cached_images"] = self.connection.get_cached_images()
 
         self._stats = data
 
@@ -27,12 +27,16 @@ import os
 import re
 import time
 
+from eventlet import greenpool
+from eventlet import patcher
+from eventlet import tpool
+
 from nova.compute import task_states
 from nova.compute import vm_states
 from nova.openstack.common import cfg
+from nova.openstack.common import fileutils
 from nova.openstack.common import lockutils
 from nova.openstack.common import log as logging
-from nova import utils
 from nova.virt.libvirt import utils as virtutils
 
 
@@ -56,6 +60,14 @@ imagecache_opts = [
     cfg.IntOpt('checksum_interval_seconds',
                default=3600,
                help='How frequently to checksum base images'),
+    cfg.IntOpt('checksum_workers',
+               default=2,
+               help='Number of base images to checksum concurrently'),
+    cfg.IntOpt('checksum_max_bytes_per_second',
+               default=0,
+               help='Maximum total rate at which base images are read when '
+                    'checksumming them, in bytes per second. 0 means '
+                    'unlimited'),
     ]
 
 CONF = cfg.CONF
@@ -64,6 +76,42 @@ CONF.import_opt('host', 'nova.config')
 CONF.import_opt('instances_path', 'nova.compute.manager')
 CONF.import_opt('base_dir_name', 'nova.compute.manager')
 
+# NOTE(pnavarro): checksums are computed in native threads, where a monkey
+# patched time.sleep() would try to switch greenthreads.
+_native_time = patcher.original('time')
+
+
+def _hash_file(path, max_rate=0):
+    """Generate a sha1 hash of a file, reading at most max_rate bytes/sec.
+
+    This blocks the calling thread, callers should use hash_file() instead.
+    """
+    checksum = hashlib.sha1()
+    start = _native_time.time()
+    read = 0
+    with open(path, 'r') as f:
+        for chunk in iter(lambda: f.read(32768), ''):
+            checksum.update(chunk)
+            if max_rate > 0:
+                read += len(chunk)
+                delay = (float(read) / max_rate -
+                         (_native_time.time() - start))
+                if delay > 0:
+                    _native_time.sleep(delay)
+    return checksum.hexdigest()
+
+
+def hash_file(path):
+    """Generate a sha1 hash of a base image in a native thread.
+
+    The checksum_max_bytes_per_second budget is shared between the
+    checksum_workers which may be hashing at the same time.
+    """
+    max_rate = CONF.checksum_max_bytes_per_second
+    if max_rate > 0:
+        max_rate = max(1, max_rate // max(1, CONF.checksum_workers))
+    return tpool.execute(_hash_file, path, max_rate)
+
 
 def read_stored_checksum(target, timestamped=True):
     """Read the checksum.
@@ -77,8 +125,7 @@ def read_stored_checksum(target, timestamped=True):
 def write_stored_checksum(target):
     """Write a checksum to disk for a file in _base."""
 
-    with open(target, 'r') as img_file:
-        checksum = utils.hash_file(img_file)
+    checksum = hash_file(target)
     virtutils.write_stored_info(target, field='sha1', value=checksum)
 
 
@@ -219,6 +266,45 @@ class ImageCacheManager(object):
             if m:
                 yield img, False, True
 
+    def prefetch_image(self, context, image_id):
+        """Download an image into _base unless it is already cached.
+
+        This takes the same lock as imagebackend.Image.cache(), so an image
+        being prefetched is never downloaded a second time by a spawn.
+
+        Returns True if the image was downloaded.
+        """
+        base_dir = os.path.join(CONF.instances_path, CONF.base_dir_name)
+        if not os.path.exists(base_dir):
+            fileutils.ensure_tree(base_dir)
+        filename = hashlib.sha1(str(image_id)).hexdigest()
+        target = os.path.join(base_dir, filename)
+
+        @lockutils.synchronized(filename, 'nova-', external=True,
+                                lock_path=self.lock_path)
+        def fetch_if_not_exists():
+            if os.path.exists(target):
+                return False
+            virtutils.fetch_image(context, target, image_id,
+                                  context.user_id, context.project_id)
+            return True
+
+        return fetch_if_not_exists()
+
+    def list_cached_images(self):
+        """Return the fingerprints of the original images in _base.
+
+        A fingerprint is the sha1 hash of the image id, which is how base
+        images are named.
+        """
+        base_dir = os.path.join(CONF.instances_path, CONF.base_dir_name)
+        if not os.path.exists(base_dir):
+            return []
+
+        digest_size = hashlib.sha1().digestsize * 2
+        return sorted(ent for ent in os.listdir(base_dir)
+                      if len(ent) == digest_size)
+
     def _verify_checksum(self, img_id, base_file, create_if_missing=True):
         """Compare the checksum stored on disk with the current file.
 
@@ -254,8 +340,7 @@ class ImageCacheManager(object):
                     virtutils.write_stored_info(base_file, field='sha1',
                                                 value=stored_checksum)
 
-                with open(base_file, 'r') as f:
-                    current_checksum = utils.hash_file(f)
+                current_checksum = hash_file(base_file)
 
                 if current_checksum != stored_checksum:
                     LOG.error(_('image %(id)s at (%(base_file)s): image '
@@ -274,8 +359,9 @@ class ImageCacheManager(object):
                           'base_file': base_file})
 
                 # NOTE(mikal): If the checksum file is missing, then we should
-                # create one. We don't create checksums when we download images
-                # from glance because that would delay VM startup.
+                # create one. Images fetched as raw from glance get their
+                # checksum computed while downloading, but converted images,
+                # resized copies and files from older releases do not.
                 if CONF.checksum_base_images and create_if_missing:
                     LOG.info(_('%(id)s (%(base_file)s): generating checksum'),
                              {'id': img_id,
@@ -319,8 +405,31 @@ class ImageCacheManager(object):
                           {'base_file': base_file,
                            'error': e})
 
-    def _handle_base_image(self, img_id, base_file):
-        """Handle the checks for a single base image."""
+    def _verify_checksums(self, base_images):
+        """Verify the checksums of several base images concurrently.
+
+        base_images is a list of (img_id, base_file) tuples. Returns a dict
+        mapping each base file present on disk to the result of
+        _verify_checksum.
+        """
+        candidates = []
+        for img_id, base_file in base_images:
+            if (base_file and os.path.exists(base_file)
+                and os.path.isfile(base_file)):
+                candidates.append((img_id, base_file))
+
+        pool = greenpool.GreenPool(max(1, CONF.checksum_workers))
+        results = pool.imap(lambda args: self._verify_checksum(*args),
+                            candidates)
+        return dict((base_file, result) for (_, base_file), result
+                    in zip(candidates, results))
+
+    def _handle_base_image(self, img_id, base_file, checksums=None):
+        """Handle the checks for a single base image.
+
+        checksums optionally holds the results of _verify_checksums, in
+        which case the checksum is not verified again here.
+        """
 
         image_bad = False
         image_in_use = False
@@ -336,7 +445,10 @@ class ImageCacheManager(object):
             and os.path.isfile(base_file)):
             # _verify_checksum returns True if the checksum is ok, and None if
             # there is no checksum file
-            checksum_result = self._verify_checksum(img_id, base_file)
+            if checksums is not None:
+                checksum_result = checksums.get(base_file)
+            else:
+                checksum_result = self._verify_checksum(img_id, base_file)
             if not checksum_result is None:
                 image_bad = not checksum_result
 
@@ -412,15 +524,31 @@ class ImageCacheManager(object):
         self._list_base_images(base_dir)
         self._list_running_instances(context, all_instances)
 
-        # Determine what images are on disk because they're in use
+        fingerprints = {}
         for img in self.used_images:
             fingerprint = hashlib.sha1(img).hexdigest()
             LOG.debug(_('Image id %(id)s yields fingerprint %(fingerprint)s'),
                       {'id': img,
                        'fingerprint': fingerprint})
+            fingerprints[img] = fingerprint
+
+        # NOTE(pnavarro): checksumming is the slow part of a pass, so it is
+        # done for all the base images up front by a pool of workers. The
+        # hashing itself happens in native threads so that it does not block
+        # the hub, and is rate limited so that it does not starve instances
+        # of disk bandwidth.
+        base_images = []
+        for img, fingerprint in fingerprints.iteritems():
+            for result in self._find_base_file(base_dir, fingerprint):
+                base_images.append((img, result[0]))
+        checksums = self._verify_checksums(base_images)
+
+        # Determine what images are on disk because they're in use
+        for img in self.used_images:
+            fingerprint = fingerprints[img]
             for result in self._find_base_file(base_dir, fingerprint):
                 base_file, image_small, image_resized = result
-                self._handle_base_image(img, base_file)
+                self._handle_base_image(img, base_file, checksums=checksums)
 
                 if not image_small and not image_resized:
                     self.originals.append(base_file)
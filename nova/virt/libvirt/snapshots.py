@@ -16,7 +16,10 @@
 #    under the License.
 
 import abc
+import contextlib
 
+from nova import exception
+from nova import utils
 from nova.virt import images
 from nova.virt.libvirt import utils as libvirt_utils
 
@@ -36,6 +39,19 @@ class Snapshot(object):
         """
         pass
 
+    @abc.abstractmethod
+    def stream(self, out_format):
+        """Open snapshot content for reading without extracting it
+
+        :out_format: format the content is wanted in (raw, qcow2, ...)
+
+        Returns a file context manager, or None if the snapshot has to
+        be extracted to a file first. The content is a point-in-time
+        copy that outlives delete(), so the instance may be resumed
+        while it is read.
+        """
+        pass
+
     @abc.abstractmethod
     def delete(self):
         """Delete snapshot"""
@@ -53,6 +69,19 @@ class RawSnapshot(object):
     def extract(self, target, out_format):
         images.convert_image(self.path, target, out_format)
 
+    def stream(self, out_format):
+        if out_format != 'raw':
+            return None
+        clone = '%s.%s' % (self.path, self.name)
+        try:
+            libvirt_utils.clone_image(self.path, clone)
+        except exception.ProcessExecutionError:
+            # NOTE(pnavarro): cp leaves an empty destination behind when
+            #                 the filesystem cannot clone files
+            utils.delete_if_exists(clone)
+            return None
+        return _open_and_delete(clone)
+
     def delete(self):
         pass
 
@@ -70,10 +99,24 @@ class Qcow2Snapshot(object):
                                        self.name, target,
                                        out_format)
 
+    def stream(self, out_format):
+        # NOTE(pnavarro): qemu-img can only write to seekable targets, so
+        #                 internal snapshots always go through extract().
+        return None
+
     def delete(self):
         libvirt_utils.delete_snapshot(self.path, self.name)
 
 
+@contextlib.contextmanager
+def _open_and_delete(path):
+    try:
+        with libvirt_utils.file_open(path) as image_file:
+            yield image_file
+    finally:
+        libvirt_utils.file_delete(path)
+
+
 class LvmSnapshot(object):
     def __init__(self, path, name):
         self.path = path
@@ -85,5 +128,8 @@ class LvmSnapshot(object):
     def extract(self, target, out_format):
         raise NotImplementedError(_("LVM snapshots not implemented"))
 
+    def stream(self, out_format):
+        raise NotImplementedError(_("LVM snapshots not implemented"))
+
     def delete(self):
         raise NotImplementedError(_("LVM snapshots not implemented"))
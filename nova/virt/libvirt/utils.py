@@ -22,6 +22,7 @@
 import hashlib
 import json
 import os
+import random
 import re
 import time
 
@@ -44,13 +45,26 @@ util_opts = [
     cfg.StrOpt('image_info_filename_pattern',
                default='$instances_path/$base_dir_name/%(image)s.info',
                help='Allows image information files to be stored in '
-                    'non-standard locations')
+                    'non-standard locations'),
+    cfg.ListOpt('image_peers',
+                default=[],
+                help='Compute hosts which serve their base images over HTTP '
+                     'and are asked for an image before the image service'),
+    cfg.StrOpt('image_peer_url_template',
+               default='http://%(host)s/%(image)s',
+               help='URL of a base image on a peer. %(host)s is replaced '
+                    'by the peer and %(image)s by the base image file name'),
+    cfg.IntOpt('image_peer_attempts',
+               default=3,
+               help='Number of randomly chosen peers to try before '
+                    'downloading an image from the image service'),
     ]
 
 CONF = cfg.CONF
 CONF.register_opts(util_opts)
 CONF.import_opt('instances_path', 'nova.compute.manager')
 CONF.import_opt('base_dir_name', 'nova.compute.manager')
+CONF.import_opt('host', 'nova.config')
 
 
 def execute(*args, **kwargs):
@@ -253,14 +267,26 @@ def copy_image(src, dest, host=None):
     :param src: Source image
     :param dest: Destination path
     :param host: Remote host
+    :returns: Number of bytes written for a local copy
     """
 
     if not host:
-        # We shell out to cp because that will intelligently copy
-        # sparse files.  I.E. holes will not be written to DEST,
-        # rather recreated efficiently.  In addition, since
-        # coreutils 8.11, holes can be read efficiently too.
-        execute('cp', src, dest)
+        # NOTE(pnavarro): on filesystems that support it (btrfs, XFS with
+        #                 reflink) the copy can share the blocks of the
+        #                 source (FICLONE) instead of writing any data.
+        try:
+            clone_image(src, dest)
+            written = 0
+        except exception.ProcessExecutionError:
+            # We shell out to cp because that will intelligently copy
+            # sparse files.  I.E. holes will not be written to DEST,
+            # rather recreated efficiently.  In addition, since
+            # coreutils 8.11, holes can be read efficiently too.
+            execute('cp', src, dest)
+            written = os.stat(dest).st_blocks * 512
+        LOG.debug(_('Copied %(src)s to %(dest)s, %(written)d bytes written')
+                  % locals())
+        return written
     else:
         dest = "%s:%s" % (host, dest)
         # Try rsync first as that can compress and create sparse dest files.
@@ -278,6 +304,17 @@ def copy_image(src, dest, host=None):
             execute('rsync', '--sparse', '--compress', src, dest)
 
 
+def clone_image(src, dest):
+    """Make dest a copy-on-write clone of the disk image src
+
+    The clone shares the blocks of src, so it takes no time or space
+    until either file is written. Raises ProcessExecutionError if the
+    filesystem cannot clone files (it needs reflink support, such as
+    btrfs or XFS with reflink).
+    """
+    execute('cp', '--reflink=always', src, dest)
+
+
 def write_to_file(path, contents, umask=None):
     """Write the given contents to a file
 
@@ -438,9 +475,38 @@ def get_fs_info(path):
             'used': used}
 
 
+def _image_peer_urls(base_file):
+    """Return the URLs of a base image on a random subset of the peers."""
+    peers = [peer for peer in CONF.image_peers if peer != CONF.host]
+    random.shuffle(peers)
+    return [CONF.image_peer_url_template % {'host': peer,
+                                            'image': base_file}
+            for peer in peers[:CONF.image_peer_attempts]]
+
+
 def fetch_image(context, target, image_id, user_id, project_id):
     """Grab image"""
-    images.fetch_to_raw(context, image_id, target, user_id, project_id)
+    base_dir = os.path.join(CONF.instances_path, CONF.base_dir_name)
+    in_base_dir = (os.path.dirname(os.path.abspath(target)) ==
+                   os.path.abspath(base_dir))
+
+    # NOTE(pnavarro): base images have the same name on every host, so
+    #                 they can be fetched from peers which already have
+    #                 them instead of every host hitting the image service.
+    peer_urls = None
+    if in_base_dir and CONF.image_peers:
+        peer_urls = _image_peer_urls(os.path.basename(target))
+
+    checksum = images.fetch_to_raw(context, image_id, target,
+                                   user_id, project_id, peer_urls=peer_urls)
+
+    # NOTE(pnavarro): store the checksum computed during the download for
+    #                 base images, so the image cache manager does not have
+    #                 to read the whole file back to generate it. The option
+    #                 is imported here as the image cache imports this module.
+    CONF.import_opt('checksum_base_images', 'nova.virt.libvirt.imagecache')
+    if checksum and in_base_dir and CONF.checksum_base_images:
+        write_stored_info(target, field='sha1', value=checksum)
 
 
 def get_info_filename(base_path):